@@ -11,12 +11,15 @@ import os
 from datetime import datetime
 from database import Database
 from auto_scraper import AutoScraper
+from precompress import PageVariants, page_response
+from renderer import register_stylesheet_route, render_stored_article
 
 # 获取当前文件的目录
 current_dir = os.path.dirname(os.path.abspath(__file__))
 template_dir = os.path.join(current_dir, 'templates')
 
 app = Flask(__name__, template_folder=template_dir)
+register_stylesheet_route(app)
 
 # 全局变量
 auto_scraper = AutoScraper()
@@ -64,14 +67,49 @@ def delete_keyword(keyword_id):
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
 
+def article_list_response(format_page):
+    """按查询参数（keyword_id、limit、cursor）读取一页文章，交给 format_page 生成响应；游标无效时返回400"""
+    keyword_id = request.args.get('keyword_id', type=int)
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+    cursor = request.args.get('cursor')
+    
+    try:
+        page = auto_scraper.db.list_articles(keyword_id, limit, cursor)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return format_page(page)
+
 @app.route('/api/articles')
 def get_articles():
     """获取文章列表"""
-    keyword_id = request.args.get('keyword_id', type=int)
-    limit = request.args.get('limit', 50, type=int)
+    def respond(page):
+        # 保持返回数组，下一页游标放在响应头中
+        response = jsonify(page['articles'])
+        if page['next_cursor']:
+            response.headers['X-Next-Cursor'] = page['next_cursor']
+        return response
+    
+    return article_list_response(respond)
+
+@app.route('/api/articles/page')
+def get_articles_page():
+    """分页获取文章列表"""
+    return article_list_response(jsonify)
+
+@app.route('/api/search')
+def search_articles():
+    """全文检索文章"""
+    query = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    page_size = min(max(request.args.get('page_size', 20, type=int), 1), 100)
+    
+    if not query:
+        return jsonify({'success': False, 'message': '请输入检索词'}), 400
     
-    articles = auto_scraper.db.get_articles(keyword_id, limit)
-    return jsonify(articles)
+    try:
+        return jsonify(auto_scraper.db.search_articles(query, page, page_size))
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
 
 @app.route('/api/tasks')
 def get_tasks():
@@ -148,9 +186,11 @@ def set_auto_scraper_settings():
     data = request.get_json()
     batch_size = data.get('batch_size', 100)
     rest_minutes = data.get('rest_minutes', 5)
+    workers = data.get('workers')
+    parse_workers = data.get('parse_workers')
     
     try:
-        auto_scraper.set_batch_settings(batch_size, rest_minutes)
+        auto_scraper.set_batch_settings(batch_size, rest_minutes, workers, parse_workers)
         return jsonify({'success': True, 'message': f'批量采集设置已更新: 每{batch_size}篇休息{rest_minutes}分钟'})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
@@ -171,6 +211,19 @@ def get_stats():
     stats = auto_scraper.db.get_stats()
     return jsonify(stats)
 
+@app.route('/api/stats/buckets')
+def get_stats_buckets():
+    """获取按天或按小时统计的文章数量"""
+    granularity = request.args.get('granularity', 'day')
+    limit = min(max(request.args.get('limit', 30, type=int), 1), 366)
+    
+    try:
+        buckets = auto_scraper.db.get_article_time_buckets(granularity, limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify(buckets)
+
 @app.route('/api/download/<filename>')
 def download_file(filename):
     """下载文件"""
@@ -183,10 +236,15 @@ def download_file(filename):
 @app.route('/api/view/<filename>')
 def view_html(filename):
     """查看HTML文件"""
+    # 关闭HTML文件写出时按数据库中的文章直接渲染
+    if not os.path.exists(filename):
+        url_number = auto_scraper.db.get_url_number_by_html_file(filename)
+        content = render_stored_article(auto_scraper.db, url_number) if url_number is not None else None
+        if content is not None:
+            return page_response(PageVariants.from_content(content))
+
     try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            content = f.read()
-        return content
+        return page_response(PageVariants.load(filename))
     except Exception as e:
         return f"文件读取失败: {str(e)}", 404
 
@@ -4,19 +4,22 @@
 简洁的微信公众号文章采集Web应用
 """
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, redirect
 import threading
 import time
 import os
 from datetime import datetime
-from scraper import WeChatScraper
 from database import Database
+from page_cache import PageCache
+from precompress import PageVariants, page_response
+from renderer import register_stylesheet_route, render_stored_article
 
 # 获取当前文件的目录
 current_dir = os.path.dirname(os.path.abspath(__file__))
 template_dir = os.path.join(current_dir, 'templates')
 
 app = Flask(__name__, template_folder=template_dir)
+register_stylesheet_route(app)
 
 # 全局状态
 scraping_status = {
@@ -30,6 +33,19 @@ scraping_status = {
 # 数据库实例
 db = Database()
 
+# 文章页面由数据库中的文章按需渲染；关闭后读取采集时写出的HTML文件
+RENDER_ON_DEMAND = True
+
+# 已渲染页面缓存（按原文和压缩副本的总字节数限制），到期后重新渲染以刷新推荐阅读
+PAGE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+PAGE_CACHE_TTL_SECONDS = 10 * 60
+page_cache = PageCache(PAGE_CACHE_MAX_BYTES, PAGE_CACHE_TTL_SECONDS)
+
+def render_variants(url_number):
+    """按需渲染文章，压缩副本在协商选中时生成"""
+    content = render_stored_article(db, url_number)
+    return PageVariants.from_content(content) if content is not None else None
+
 def scrape_article_async(url):
     """异步采集文章"""
     global scraping_status
@@ -40,7 +56,9 @@ def scrape_article_async(url):
         scraping_status['message'] = '正在连接...'
         scraping_status['error'] = None
         
-        scraper = WeChatScraper()
+        # 采集器依赖较重（requests、bs4等），第一次采集时才加载，不拖慢启动
+        from scraper import get_scraper
+        scraper = get_scraper()
         
         scraping_status['progress'] = 50
         scraping_status['message'] = '正在解析内容...'
@@ -52,6 +70,10 @@ def scrape_article_async(url):
             scraping_status['message'] = '采集完成'
             scraping_status['result'] = result
             
+            # 同一篇文章重新采集时会覆盖旧记录，旧编号随之失效；
+            # 临时链接按页面中的永久链接计算规范键，不能用采集的链接查找
+            replaced_number = db.get_url_number_by_key(result['canonical_key'])
+            
             # 获取下一个URL编号
             url_number = db.get_next_url_number()
             
@@ -62,10 +84,13 @@ def scrape_article_async(url):
             result['url_number'] = url_number
             
             # 保存到数据库
-            db.add_article(result)
+            result['id'] = db.add_article(result)
             
             # 生成HTML文件
             scraper.save_html(result, html_filename, db, url_number)
+            if replaced_number is not None:
+                # 新编号不会有缓存；被覆盖的旧编号已查不到文章，释放它占用的缓存
+                page_cache.invalidate(replaced_number)
             scraping_status['html_file'] = html_filename
             scraping_status['url_number'] = url_number
         else:
@@ -140,10 +165,14 @@ def download_file(filename):
 @app.route('/api/view/<filename>')
 def view_html(filename):
     """查看HTML文件API"""
+    # 按需渲染模式下跳转到文章页面，采集时可能并未写出文件
+    if RENDER_ON_DEMAND or not os.path.exists(filename):
+        url_number = db.get_url_number_by_html_file(filename)
+        if url_number is not None:
+            return redirect(f'/new/{url_number}')
+
     try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            content = f.read()
-        return content
+        return page_response(PageVariants.load(filename))
     except Exception as e:
         return f"文件读取失败: {str(e)}", 404
 
@@ -151,22 +180,27 @@ def view_html(filename):
 def view_by_number(url_number):
     """通过URL编号查看文章"""
     try:
-        # 从数据库查找对应的文章
-        articles = db.get_articles()
-        target_article = None
-        
-        for article in articles:
-            if article.get('url_number') == url_number:
-                target_article = article
-                break
-        
-        if not target_article or not target_article.get('html_file'):
+        # 按编号索引查找对应的文章
+        target_article = db.get_article_by_url_number(url_number)
+        if not target_article:
             return f"文章 {url_number} 不存在", 404
         
-        # 读取HTML文件
-        with open(target_article['html_file'], 'r', encoding='utf-8') as f:
-            content = f.read()
-        return content
+        if RENDER_ON_DEMAND:
+            # 文章重新采集或重新提取后scrape_time/revision会变化，缓存随之失效
+            version = (target_article['scrape_time'], target_article['revision'])
+            variants = page_cache.get_or_render(url_number, version, lambda: render_variants(url_number))
+            if variants is None:
+                return f"文章 {url_number} 不存在", 404
+        else:
+            if not target_article.get('html_file'):
+                return f"文章 {url_number} 不存在", 404
+            version = (target_article['html_file'], target_article['scrape_time'], target_article['revision'])
+            variants = page_cache.get(url_number, version)
+            if variants is None:
+                variants = PageVariants.load(target_article['html_file'])
+                page_cache.put(url_number, variants, version)
+        
+        return page_response(variants)
     except Exception as e:
         return f"文件读取失败: {str(e)}", 404
 
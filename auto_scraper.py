@@ -4,34 +4,47 @@
 自动采集系统
 """
 
-import requests
 import json
 import re
 import time
 import random
 import threading
+import urllib.parse
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 from bs4 import BeautifulSoup
-from fake_useragent import UserAgent
 from database import Database
-from scraper import WeChatScraper
+from fetch_engine import FetchEngine
+from http_client import get_http_client, is_blocked
+from link_cache import LinkResolveCache
+from parse_pool import get_parse_pool
+from scraper import get_scraper
+from url_canonical import canonical_key
+from user_agents import random_user_agent
 
 class AutoScraper:
     def __init__(self, db_path: str = "articles.db"):
         self.db = Database(db_path)
-        self.scraper = WeChatScraper()
-        self.ua = UserAgent()
-        self.session = requests.Session()
+        self.http = get_http_client()  # 与手动采集共用连接池、Cookie和主机配额
+        self.rate_limiter = self.http.rate_limiter
+        self.fetch_engine = FetchEngine()
+        self.parse_pool = get_parse_pool()
+        self.scraper = get_scraper()
+        self.link_cache = LinkResolveCache(self.db)
+        self.link_keys = {}  # 搜索得到的文章URL -> 来源搜狗链接的 url 参数，保存文章时记录为别名
+        self.session = self.http.session
         self.is_running = False
         self.batch_size = 100  # 每批采集100篇
         self.rest_minutes = 5   # 休息5分钟
         self.current_batch_count = 0  # 当前批次计数
+        self.rest_until = 0.0  # 批量休息的截止时间（time.monotonic），只暂停本采集器的文章请求
+        self.flush_size = 10  # 攒够10篇写一次数据库
+        self.flush_interval = 60  # 或距上次写入超过60秒
         
     def get_headers(self):
         """获取随机请求头"""
         return {
-            'User-Agent': self.ua.random,
+            'User-Agent': random_user_agent(),
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
             'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
             'Accept-Encoding': 'gzip, deflate, br',
@@ -46,10 +59,45 @@ class AutoScraper:
             'Referer': 'https://weixin.sogou.com/weixin?type=2&query=test&ie=utf8',
             'Sec-Ch-Ua': '"Google Chrome";v="119", "Chromium";v="119", "Not?A_Brand";v="24"',
             'Sec-Ch-Ua-Mobile': '?0',
-            'Sec-Ch-Ua-Platform': '"macOS"',
-            'Cookie': 'ABTEST=0|1757730654|v17; IPLOC=CN1100; SUID=1234567890ABCDEF; SUV=1757730654; SNUID=1234567890ABCDEF; JSESSIONID=1234567890ABCDEF'
+            'Sec-Ch-Ua-Platform': '"macOS"'
         }
     
+    def resolve_sogou_link(self, href: str, link_key: str) -> Optional[str]:
+        """把搜狗跳转链接解析为微信文章URL，失败返回None
+
+        link_key 是链接中解码后的 url 参数，解析结果按它缓存，命中时不发请求。
+        """
+        cached = self.link_cache.get(link_key)
+        if cached:
+            print(f"💾 命中链接解析缓存: {cached}")
+            return cached
+        
+        redirect_url = urllib.parse.urljoin('https://weixin.sogou.com', href)
+        print(f"🔍 尝试访问重定向链接: {redirect_url}")
+        
+        try:
+            started = time.monotonic()
+            # 复用共享会话的连接和cookies，按搜狗主机配额限速
+            response = self.http.get(redirect_url, headers=self.get_headers(), timeout=15, allow_redirects=True)
+            elapsed = time.monotonic() - started
+        except Exception as e:
+            print(f"❌ 重定向访问失败: {e}")
+            return None
+        
+        final_url = response.url
+        print(f"🔍 重定向最终URL: {final_url[:100]}...")
+        
+        if 'mp.weixin.qq.com' in final_url and '/s?' in final_url:
+            print(f"✅ 通过重定向找到微信文章链接: {final_url}")
+            self.link_cache.put(link_key, final_url, elapsed)
+            return final_url
+        elif 'antispider' in final_url:
+            # 客户端已按拦截信号降低搜狗速率并暂停
+            print(f"⚠️ 触发反爬虫检测，跳过")
+        else:
+            print(f"❌ 重定向后不是微信文章链接，跳过")
+        return None
+    
     def search_wechat_articles(self, keyword: str, max_pages: int = 3) -> List[str]:
         """搜索微信公众号文章链接"""
         print(f"🔍 搜索关键词: {keyword}")
@@ -62,18 +110,16 @@ class AutoScraper:
         ]
         
         article_urls = []
+        seen_keys = set()  # 已收集链接的规范键，同一文章的不同链接只保留一个
+        self.link_keys.clear()
+        cache_before = self.link_cache.get_stats()
         
         for i, url in enumerate(search_sources[:max_pages]):
             try:
                 print(f"📄 搜索页面 {i+1}: {url}")
-                # 增加延迟
-                delay = random.uniform(3, 6)
-                print(f"⏳ 等待 {delay:.1f} 秒...")
-                time.sleep(delay)
-                
-                # 发送请求
+                # 发送请求（共享连接池，按搜狗主机配额限速）
                 headers = self.get_headers()
-                response = requests.get(url, headers=headers, timeout=30)
+                response = self.http.get(url, headers=headers, timeout=30)
                 print(f"📄 页面响应状态: {response.status_code}")
                 print(f"📄 页面内容长度: {len(response.content)} 字节")
                 
@@ -81,10 +127,9 @@ class AutoScraper:
                     print(f"❌ 请求失败，状态码: {response.status_code}")
                     continue
                 
-                # 检查是否有验证码
-                if "验证码" in response.text or "VerifyCode" in response.text:
-                    print("⚠️ 检测到验证码页面，等待2分钟后重试...")
-                    time.sleep(120)
+                # 验证码或反爬页面：客户端已按拦截信号降低搜狗速率并暂停
+                if is_blocked(response):
+                    print("⚠️ 检测到验证码页面，跳过")
                     continue
                 
                 soup = BeautifulSoup(response.text, 'html.parser')
@@ -115,7 +160,6 @@ class AutoScraper:
                             print(f"🔍 处理搜狗链接: {href[:100]}...")
                             
                             # 提取重定向的真实URL
-                            import urllib.parse
                             parsed = urllib.parse.parse_qs(urllib.parse.urlparse(href).query)
                             if 'url' in parsed and parsed['url']:
                                 real_url = parsed['url'][0]
@@ -123,41 +167,30 @@ class AutoScraper:
                                 
                                 # URL解码
                                 real_url = urllib.parse.unquote(real_url)
+                                link_key = real_url
                                 print(f"🔍 URL解码后: {real_url[:100]}...")
                                 
-                                # 尝试直接访问重定向链接获取真实URL
-                                try:
-                                    redirect_url = f"https://weixin.sogou.com{href}"
-                                    print(f"🔍 尝试访问重定向链接: {redirect_url}")
-                                    
-                                    # 增加随机延迟，模拟人类行为
-                                    import time
-                                    time.sleep(random.uniform(2, 5))
-                                    
-                                    # 使用会话保持cookies
-                                    session = requests.Session()
-                                    response = session.get(redirect_url, headers=self.get_headers(), timeout=15, allow_redirects=True)
-                                    final_url = response.url
-                                    print(f"🔍 重定向最终URL: {final_url[:100]}...")
-                                    
-                                    if 'mp.weixin.qq.com' in final_url and '/s?' in final_url:
-                                        real_url = final_url
-                                        print(f"✅ 通过重定向找到微信文章链接: {real_url}")
-                                    elif 'antispider' in final_url:
-                                        print(f"⚠️ 触发反爬虫检测，增加延迟...")
-                                        time.sleep(random.uniform(30, 60))
-                                        continue
-                                    else:
-                                        print(f"❌ 重定向后不是微信文章链接，跳过")
-                                        continue
-                                except Exception as e:
-                                    print(f"❌ 重定向访问失败: {e}")
+                                # 参数中已是微信文章链接时先去重，省掉重定向请求
+                                if 'mp.weixin.qq.com' in real_url and self.db.is_article_exists(real_url):
+                                    print(f"⏭️ 跳过已采集文章: {real_url}")
+                                    continue
+                                
+                                # 以前从同一链接采集过的文章按别名跳过，不再解析跳转
+                                if self.db.is_link_stored(link_key):
+                                    print(f"⏭️ 跳过已采集文章: {real_url[:100]}")
+                                    continue
+                                
+                                # 先查解析缓存，未命中再访问重定向链接获取真实URL
+                                real_url = self.resolve_sogou_link(href, link_key)
+                                if not real_url:
                                     continue
                                 
                                 # 检查是否已经采集过这篇文章
                                 if not self.db.is_article_exists(real_url):
-                                    if real_url not in wechat_links:
+                                    if canonical_key(real_url) not in seen_keys:
+                                        seen_keys.add(canonical_key(real_url))
                                         wechat_links.append(real_url)
+                                        self.link_keys[real_url] = link_key
                                         print(f"🔗 找到新文章链接: {real_url}")
                                 else:
                                     print(f"⏭️ 跳过已采集文章: {real_url}")
@@ -174,7 +207,8 @@ class AutoScraper:
                         
                         # 检查是否已经采集过
                         if not self.db.is_article_exists(href):
-                            if href not in wechat_links:
+                            if canonical_key(href) not in seen_keys:
+                                seen_keys.add(canonical_key(href))
                                 wechat_links.append(href)
                                 print(f"🔗 找到直接链接: {href}")
                         else:
@@ -186,7 +220,6 @@ class AutoScraper:
                             print(f"🔍 处理搜狗link链接: {href[:100]}...")
                             
                             # 提取重定向的真实URL
-                            import urllib.parse
                             parsed = urllib.parse.parse_qs(urllib.parse.urlparse(href).query)
                             if 'url' in parsed and parsed['url']:
                                 real_url = parsed['url'][0]
@@ -194,41 +227,30 @@ class AutoScraper:
                                 
                                 # URL解码
                                 real_url = urllib.parse.unquote(real_url)
+                                link_key = real_url
                                 print(f"🔍 URL解码后: {real_url[:100]}...")
                                 
-                                # 尝试直接访问重定向链接获取真实URL
-                                try:
-                                    redirect_url = f"https://weixin.sogou.com{href}"
-                                    print(f"🔍 尝试访问重定向链接: {redirect_url}")
-                                    
-                                    # 增加随机延迟，模拟人类行为
-                                    import time
-                                    time.sleep(random.uniform(2, 5))
-                                    
-                                    # 使用会话保持cookies
-                                    session = requests.Session()
-                                    response = session.get(redirect_url, headers=self.get_headers(), timeout=15, allow_redirects=True)
-                                    final_url = response.url
-                                    print(f"🔍 重定向最终URL: {final_url[:100]}...")
-                                    
-                                    if 'mp.weixin.qq.com' in final_url and '/s?' in final_url:
-                                        real_url = final_url
-                                        print(f"✅ 通过重定向找到微信文章链接: {real_url}")
-                                    elif 'antispider' in final_url:
-                                        print(f"⚠️ 触发反爬虫检测，增加延迟...")
-                                        time.sleep(random.uniform(30, 60))
-                                        continue
-                                    else:
-                                        print(f"❌ 重定向后不是微信文章链接，跳过")
-                                        continue
-                                except Exception as e:
-                                    print(f"❌ 重定向访问失败: {e}")
+                                # 参数中已是微信文章链接时先去重，省掉重定向请求
+                                if 'mp.weixin.qq.com' in real_url and self.db.is_article_exists(real_url):
+                                    print(f"⏭️ 跳过已采集文章: {real_url}")
+                                    continue
+                                
+                                # 以前从同一链接采集过的文章按别名跳过，不再解析跳转
+                                if self.db.is_link_stored(link_key):
+                                    print(f"⏭️ 跳过已采集文章: {real_url[:100]}")
+                                    continue
+                                
+                                # 先查解析缓存，未命中再访问重定向链接获取真实URL
+                                real_url = self.resolve_sogou_link(href, link_key)
+                                if not real_url:
                                     continue
                                 
                                 # 检查是否已经采集过这篇文章
                                 if not self.db.is_article_exists(real_url):
-                                    if real_url not in wechat_links:
+                                    if canonical_key(real_url) not in seen_keys:
+                                        seen_keys.add(canonical_key(real_url))
                                         wechat_links.append(real_url)
+                                        self.link_keys[real_url] = link_key
                                         print(f"🔗 找到新文章链接: {real_url}")
                                 else:
                                     print(f"⏭️ 跳过已采集文章: {real_url}")
@@ -247,6 +269,12 @@ class AutoScraper:
         unique_urls = list(set(article_urls))
         print(f"🎯 总共找到 {len(unique_urls)} 个唯一文章链接")
         
+        cache_after = self.link_cache.get_stats()
+        saved = cache_after['hits'] - cache_before['hits']
+        if saved or cache_after['misses'] > cache_before['misses']:
+            print(f"💾 链接解析缓存: 命中 {saved} 次, 未命中 {cache_after['misses'] - cache_before['misses']} 次, "
+                  f"约节省 {saved * cache_after['avg_resolve_seconds']:.0f} 秒")
+        
         return unique_urls
     
     def search_wechat_articles_old(self, keyword: str, max_pages: int = 3) -> List[str]:
@@ -565,58 +593,72 @@ class AutoScraper:
             
             scraped_count = 0
             failed_count = 0
+            duplicate_count = 0
+            pending = []  # 待写入数据库的文章
+            last_flush = time.time()
+            
+            def flush():
+                """写入待写入的文章，写入成功后才计入采集数，批内重复的单独计数"""
+                nonlocal pending, last_flush, scraped_count, failed_count, duplicate_count
+                batch, pending = pending, []
+                last_flush = time.time()
+                saved_count, duplicates = self.flush_articles(batch, keyword_id, task_id)
+                scraped_count += saved_count
+                duplicate_count += duplicates
+                failed_count += len(batch) - saved_count - duplicates
+            
+            def flush_if_due():
+                """距上次写入超过间隔时写入（等待抓取结果期间也会检查）"""
+                if pending and time.time() - last_flush >= self.flush_interval:
+                    flush()
             
-            for i, url in enumerate(article_urls, 1):
+            # 并发采集，限速由主机自适应令牌桶控制
+            fetched = self.fetch_engine.map(self.fetch_article, article_urls, on_idle=flush_if_due)
+            for i, (url, result) in enumerate(fetched, 1):
                 try:
-                    print(f"📰 采集第 {i}/{len(article_urls)} 篇文章")
-                    
-                    # 采集文章
-                    result = self.scraper.scrape_article(url)
+                    print(f"📰 完成第 {i}/{len(article_urls)} 篇文章")
                     
                     if result:
-                        # 获取下一个URL编号
-                        url_number = self.db.get_next_url_number()
-                        
                         # 生成HTML文件名
                         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
                         safe_title = re.sub(r'[^\w\s-]', '', result['title'])[:50]
                         html_filename = f"{safe_title}_{timestamp}.html"
                         
                         result['html_file'] = html_filename
-                        result['url_number'] = url_number
-                        
-                        # 保存到数据库
-                        self.db.add_article(result, keyword_id)
-                        
-                        # 生成HTML文件
-                        self.scraper.save_html(result, html_filename, self.db, url_number)
-                        scraped_count += 1
+                        result['link_key'] = self.link_keys.pop(url, None)
+                        pending.append(result)
                         self.current_batch_count += 1
                         
                         print(f"✅ 采集成功: {result['title']} (累计: {self.current_batch_count})")
                         
-                        # 检查是否达到批量休息条件
-                        if self.current_batch_count >= self.batch_size:
-                            print(f"🛌 已采集 {self.current_batch_count} 篇文章，休息 {self.rest_minutes} 分钟...")
-                            time.sleep(self.rest_minutes * 60)  # 休息5分钟
+                        # 按数量或时间批量写入
+                        if len(pending) >= self.flush_size:
+                            flush()
+                        else:
+                            flush_if_due()
+                        
+                        # 达到批量休息条件时，之后的文章请求等到休息结束再发出
+                        if self.rest_minutes and self.current_batch_count >= self.batch_size:
+                            print(f"🛌 已采集 {self.current_batch_count} 篇文章，文章请求暂停 {self.rest_minutes} 分钟...")
+                            self.rest_until = time.monotonic() + self.rest_minutes * 60
                             self.current_batch_count = 0  # 重置计数
-                            print("⏰ 休息结束，继续采集...")
                     else:
                         failed_count += 1
                         print(f"❌ 采集失败: {url}")
                     
-                    # 随机延迟，避免被封
-                    time.sleep(random.uniform(3, 6))
-                    
                 except Exception as e:
                     failed_count += 1
                     print(f"❌ 采集异常: {str(e)}")
                     continue
             
+            # 写入剩余文章
+            flush()
+            
             # 更新任务状态
             result_data = {
                 'scraped_count': scraped_count,
                 'failed_count': failed_count,
+                'duplicate_count': duplicate_count,
                 'total_urls': len(article_urls)
             }
             
@@ -624,7 +666,7 @@ class AutoScraper:
             
             return {
                 'success': True,
-                'message': f'采集完成: 成功 {scraped_count} 篇，失败 {failed_count} 篇',
+                'message': f'采集完成: 成功 {scraped_count} 篇，失败 {failed_count} 篇，重复 {duplicate_count} 篇',
                 'data': result_data
             }
             
@@ -632,6 +674,46 @@ class AutoScraper:
             self.db.update_task_status(task_id, 'failed', error=str(e))
             return {'success': False, 'message': str(e)}
     
+    def fetch_article(self, url: str) -> Optional[Dict]:
+        """采集一篇文章，批量休息期间先等待（在抓取线程中执行）
+
+        休息只作用于本采集器，不暂停共享的主机限速配额，手动采集等其他请求不受影响。
+        """
+        delay = self.rest_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        return self.scraper.scrape_article(url)
+    
+    def flush_articles(self, articles: List[Dict], keyword_id: int, task_id: int = None) -> Tuple[int, int]:
+        """批量写入文章并生成HTML文件，返回 (写入的文章数, 批内重复丢弃的文章数)
+
+        同一批中指向同一篇文章的只写入最后一篇，其余计为重复而不是失败。
+        整批写入失败时逐篇重试，只丢弃本身无法写入的文章，不会中断采集。
+        """
+        unique = self.db.dedup_batch(articles)
+        duplicates = len(articles) - len(unique)
+        if duplicates:
+            print(f"🔁 批内重复 {duplicates} 篇文章，只保留最后一篇")
+        if not unique:
+            return 0, duplicates
+        
+        try:
+            saved = self.db.add_articles_bulk(unique, keyword_id, task_id)
+            print(f"💾 批量写入 {len(saved)} 篇文章")
+        except Exception as e:
+            print(f"⚠️ 批量写入失败，逐篇重试: {str(e)}")
+            saved = []
+            for article in unique:
+                try:
+                    saved.extend(self.db.add_articles_bulk([article], keyword_id, task_id))
+                except Exception as e:
+                    print(f"❌ 文章写入失败: {article.get('title')} ({str(e)})")
+            print(f"💾 逐篇写入 {len(saved)}/{len(unique)} 篇文章")
+        
+        for article in saved:
+            self.scraper.save_html(article, article['html_file'], self.db, article['url_number'])
+        return len(saved), duplicates
+    
     def batch_scrape_keywords(self, keywords: List[str], max_articles_per_keyword: int = 5):
         """批量采集多个关键词"""
         print(f"🔄 开始批量采集 {len(keywords)} 个关键词")
@@ -645,12 +727,6 @@ class AutoScraper:
                 'keyword': keyword,
                 'result': result
             })
-            
-            # 关键词间延迟
-            if i < len(keywords):
-                delay = random.uniform(10, 20)
-                print(f"⏳ 等待 {delay:.1f} 秒后处理下一个关键词...")
-                time.sleep(delay)
         
         return results
     
@@ -697,12 +773,19 @@ class AutoScraper:
         self.is_running = False
         return {'success': True, 'message': '自动采集服务已停止'}
     
-    def set_batch_settings(self, batch_size: int = 100, rest_minutes: int = 5):
+    def set_batch_settings(self, batch_size: int = 100, rest_minutes: int = 5, workers: int = None,
+                           parse_workers: int = None):
         """设置批量采集参数"""
         self.batch_size = batch_size
         self.rest_minutes = rest_minutes
         self.current_batch_count = 0  # 重置计数
-        print(f"📊 批量采集设置已更新: 每 {batch_size} 篇休息 {rest_minutes} 分钟")
+        self.rest_until = 0.0
+        if workers:
+            self.fetch_engine.workers = workers
+        if parse_workers is not None and parse_workers != self.parse_pool.workers:
+            self.parse_pool.resize(parse_workers)
+        print(f"📊 批量采集设置已更新: 每 {batch_size} 篇休息 {rest_minutes} 分钟, 并发 {self.fetch_engine.workers}, "
+              f"解析进程 {self.parse_pool.workers}")
     
     def get_scraping_status(self):
         """获取采集状态"""
@@ -713,11 +796,17 @@ class AutoScraper:
             'is_running': self.is_running,
             'stats': stats,
             'recent_tasks': recent_tasks,
+            'dedup': self.db.url_index.get_stats(),
             'batch_settings': {
                 'batch_size': self.batch_size,
                 'rest_minutes': self.rest_minutes,
-                'current_count': self.current_batch_count
-            }
+                'current_count': self.current_batch_count,
+                'workers': self.fetch_engine.workers,
+                'parse_workers': self.parse_pool.workers
+            },
+            'rate_limits': self.rate_limiter.get_stats(),
+            'http': self.http.get_stats(),
+            'link_cache': self.link_cache.get_stats()
         }
 
 
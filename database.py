@@ -5,18 +5,187 @@
 """
 
 import sqlite3
+import base64
 import json
+import random
+import threading
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Dict, Iterable, List, Optional
+from search_index import (BM25_WEIGHTS, build_match_query, create_search_index, make_snippet,
+                          rebuild_search_index, register_functions)
+from related_index import create_related_index, rebuild_related_index
+from index_queue import create_index_queue, process_index_queue
+from url_canonical import canonical_key
+from url_dedup import DEFAULT_MEMORY_BYTES, UrlDedupIndex
+
+# 连接参数
+BUSY_TIMEOUT_MS = 5000           # 遇到写锁时最多等待5秒
+CACHE_SIZE_KB = 20000            # 每个连接约20MB页缓存
+MMAP_SIZE = 256 * 1024 * 1024    # 256MB内存映射
+POOL_SIZE = 8                    # 空闲连接池上限
+
+# 随机推荐抽样参数
+RANDOM_SCAN_FACTOR = 4           # id区间不超过 limit*4 时直接全量抽样
+RANDOM_PROBE_FACTOR = 5          # 最多探测 limit*5 次
+
+# UPDATE ... RETURNING 需要 SQLite 3.35+
+HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+
+# 统计计数由触发器在写入文章、关键词、任务的同一事务内维护
+STATS_DAY_EXPR = "COALESCE(DATE({row}.scrape_time), 'unknown')"
+STATS_HOUR_EXPR = "COALESCE(STRFTIME('%Y-%m-%d %H', {row}.scrape_time), 'unknown')"
+ARTICLES_COUNTER = "'articles'"
+
+
+def _counter_add(name_expr: str, delta: int) -> str:
+    return (f"INSERT INTO stats_counters (name, value) VALUES ({name_expr}, {delta}) "
+            f"ON CONFLICT(name) DO UPDATE SET value = value + ({delta});")
+
+
+def _bucket_add(row: str, delta: int) -> str:
+    return ''.join(
+        f"INSERT INTO article_time_buckets (granularity, bucket, count) VALUES ('{granularity}', {expr.format(row=row)}, {delta}) "
+        f"ON CONFLICT(granularity, bucket) DO UPDATE SET count = count + ({delta});"
+        for granularity, expr in (('day', STATS_DAY_EXPR), ('hour', STATS_HOUR_EXPR))
+    )
+
+
+def _status_triggers(table: str, prefix: str) -> List[str]:
+    new_name = f"'{prefix}' || COALESCE(NEW.status, '')"
+    old_name = f"'{prefix}' || COALESCE(OLD.status, '')"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS trg_stats_{table}_insert AFTER INSERT ON {table} "
+        f"BEGIN {_counter_add(new_name, 1)} END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_stats_{table}_delete AFTER DELETE ON {table} "
+        f"BEGIN {_counter_add(old_name, -1)} END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_stats_{table}_status AFTER UPDATE OF status ON {table} "
+        f"WHEN OLD.status IS NOT NEW.status "
+        f"BEGIN {_counter_add(old_name, -1)} {_counter_add(new_name, 1)} END",
+    ]
+
+
+STATS_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS trg_stats_articles_insert AFTER INSERT ON articles "
+    f"BEGIN {_counter_add(ARTICLES_COUNTER, 1)} {_bucket_add('NEW', 1)} END",
+    "CREATE TRIGGER IF NOT EXISTS trg_stats_articles_delete AFTER DELETE ON articles "
+    f"BEGIN {_counter_add(ARTICLES_COUNTER, -1)} {_bucket_add('OLD', -1)} END",
+    "CREATE TRIGGER IF NOT EXISTS trg_stats_articles_time AFTER UPDATE OF scrape_time ON articles "
+    "WHEN OLD.scrape_time IS NOT NEW.scrape_time "
+    f"BEGIN {_bucket_add('OLD', -1)} {_bucket_add('NEW', 1)} END",
+] + _status_triggers('keywords', 'keywords:') + _status_triggers('tasks', 'tasks:')
+
+
+def encode_cursor(scrape_time: str, article_id: int) -> str:
+    """生成分页游标"""
+    raw = json.dumps([scrape_time, article_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor: str):
+    """解析分页游标，格式错误时抛出ValueError"""
+    try:
+        scrape_time, article_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return scrape_time, int(article_id)
+    except Exception:
+        raise ValueError(f"无效的分页游标: {cursor}")
+
+
+class ConnectionPool:
+    """SQLite连接池
+
+    每个线程在一次调用期间独占一个连接，同一线程内嵌套获取会复用该连接；
+    调用结束后连接归还到空闲池，供后续线程（如Flask的请求线程）复用，
+    避免每次操作都重新打开数据库文件。
+    """
+
+    def __init__(self, db_path: str, pool_size: int = POOL_SIZE):
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self._idle = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        """创建新连接并设置PRAGMA"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False
+        )
+        conn.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}')
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        conn.execute(f'PRAGMA cache_size = -{CACHE_SIZE_KB}')
+        conn.execute(f'PRAGMA mmap_size = {MMAP_SIZE}')
+        conn.execute('PRAGMA temp_store = MEMORY')
+        # INSERT OR REPLACE 删除旧行时也要触发统计和索引队列的触发器
+        conn.execute('PRAGMA recursive_triggers = ON')
+        # 全量重建全文索引时用到的切分函数
+        register_functions(conn)
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """获取当前线程的连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.depth += 1
+            return conn
+
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._connect()
+
+        self._local.conn = conn
+        self._local.depth = 1
+        return conn
+
+    def release(self, conn: sqlite3.Connection):
+        """归还连接，最外层释放时放回空闲池"""
+        if getattr(self._local, 'conn', None) is not conn:
+            conn.close()
+            return
+
+        self._local.depth -= 1
+        if self._local.depth > 0:
+            return
+
+        self._local.conn = None
+        # 未提交的事务不能带回池中
+        if conn.in_transaction:
+            conn.rollback()
+
+        with self._lock:
+            if len(self._idle) < self.pool_size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close_all(self):
+        """关闭所有空闲连接"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
 
 class Database:
-    def __init__(self, db_path: str = "articles.db"):
+    def __init__(self, db_path: str = "articles.db", dedup_memory_bytes: int = DEFAULT_MEMORY_BYTES):
         self.db_path = db_path
+        self.pool = ConnectionPool(db_path)
+        self.url_index = UrlDedupIndex(
+            self._iter_canonical_keys, self._count_articles, self._canonical_key_exists, dedup_memory_bytes
+        )
         self.init_database()
     
+    def close(self):
+        """关闭连接池"""
+        self.pool.close_all()
+    
     def init_database(self):
         """初始化数据库表"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.pool.acquire()
         cursor = conn.cursor()
         
         # 创建关键词表
@@ -53,7 +222,60 @@ class Database:
         columns = [column[1] for column in cursor.fetchall()]
         if 'url_number' not in columns:
             cursor.execute('ALTER TABLE articles ADD COLUMN url_number INTEGER')
-        
+
+        # 重新提取正文后递增，页面缓存以此判断文章内容是否变化
+        if 'revision' not in columns:
+            cursor.execute('ALTER TABLE articles ADD COLUMN revision INTEGER DEFAULT 0')
+
+        # 规范键：同一篇文章的不同链接形式对应同一个键
+        if 'canonical_key' not in columns:
+            cursor.execute('ALTER TABLE articles ADD COLUMN canonical_key TEXT')
+        self._backfill_canonical_keys(cursor)
+        try:
+            cursor.execute('''
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_articles_canonical_key ON articles (canonical_key)
+            ''')
+        except sqlite3.IntegrityError:
+            print("⚠️ 已有数据中存在重复文章，创建普通规范键索引")
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_articles_canonical_key_dup ON articles (canonical_key)
+            ''')
+
+        # 文章列表覆盖索引，分页查询不需要回表读取正文
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_articles_listing ON articles
+            (scrape_time, id, title, author, keyword_id, word_count, html_file, url_number, status)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_articles_keyword_listing ON articles
+            (keyword_id, scrape_time, id, title, author, word_count, html_file, url_number, status)
+        ''')
+
+        # url_number唯一索引，/new/<url_number> 按编号直接定位
+        try:
+            cursor.execute('''
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_articles_url_number ON articles (url_number)
+            ''')
+        except sqlite3.IntegrityError:
+            # 旧数据中存在重复编号时退化为普通索引
+            print("⚠️ url_number存在重复值，创建普通索引")
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_articles_url_number_dup ON articles (url_number)
+            ''')
+
+        # 按需渲染时 /api/view/<filename> 通过文件名找到文章
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_articles_html_file ON articles (html_file)
+        ''')
+
+        # 搜狗链接别名：链接中的 url 参数 -> 文章规范键，已采集的搜索结果不必再解析跳转
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS url_aliases (
+                link_key TEXT PRIMARY KEY,
+                canonical_key TEXT NOT NULL
+            )
+        ''')
+
         # 创建采集任务表
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS tasks (
@@ -84,12 +306,73 @@ class Database:
         if cursor.fetchone()[0] == 0:
             cursor.execute('INSERT INTO url_counter (current_count) VALUES (0)')
         
+        # 统计计数表和按天/小时的文章分桶
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS stats_counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS article_time_buckets (
+                granularity TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (granularity, bucket)
+            )
+        ''')
+        for trigger_sql in STATS_TRIGGERS:
+            cursor.execute(trigger_sql)
+        
+        # 首次创建时从现有数据计算
+        cursor.execute("SELECT COUNT(*) FROM stats_counters")
+        if cursor.fetchone()[0] == 0:
+            self._rebuild_stats(cursor)
+        
+        # 全文索引。索引不保存原文，删除和更新触发器需要索引中已有旧行，
+        # 因此在已有数据的库上新建时必须立即为已有文章建立索引
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'articles_fts'")
+        fts_existed = cursor.fetchone() is not None
+        self.fts_enabled = create_search_index(cursor)
+        if self.fts_enabled and not fts_existed:
+            cursor.execute('SELECT EXISTS (SELECT 1 FROM articles)')
+            if cursor.fetchone()[0]:
+                print("🔍 全文索引为新建，正在索引已有文章...")
+                count = rebuild_search_index(cursor)
+                print(f"✅ 已索引 {count} 篇文章")
+
+        # 相关文章索引；已有数据的库需要运行 python manage.py rebuild-related
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'related_df'")
+        related_existed = cursor.fetchone() is not None
+        create_related_index(cursor)
+        if not related_existed:
+            cursor.execute('SELECT EXISTS (SELECT 1 FROM articles)')
+            if cursor.fetchone()[0]:
+                print("⚠️ 相关文章索引为新建，请运行 python manage.py rebuild-related 索引已有文章")
+
+        # 补做其他连接写入文章表后留在队列中的索引变更；新建的全文索引已包含这些变更
+        create_index_queue(cursor)
+        pending = process_index_queue(cursor, self.fts_enabled and fts_existed)
+        if pending:
+            print(f"🔍 已补做其他连接写入的 {pending} 条文章变更的索引")
+        
         conn.commit()
-        conn.close()
+        self.pool.release(conn)
+    
+    def _backfill_canonical_keys(self, cursor: sqlite3.Cursor):
+        """为旧数据补算规范键"""
+        cursor.execute('SELECT id, url FROM articles WHERE canonical_key IS NULL')
+        rows = cursor.fetchall()
+        if rows:
+            cursor.executemany(
+                'UPDATE articles SET canonical_key = ? WHERE id = ?',
+                [(canonical_key(url), article_id) for article_id, url in rows]
+            )
+            print(f"🔑 已为 {len(rows)} 篇文章补算规范键")
     
     def add_keyword(self, keyword: str) -> int:
         """添加关键词"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.pool.acquire()
         cursor = conn.cursor()
         
         try:
@@ -109,26 +392,75 @@ class Database:
             conn.rollback()
             raise e
         finally:
-            conn.close()
+            self.pool.release(conn)
     
     def is_article_exists(self, url: str) -> bool:
-        """检查文章是否已存在"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+        """检查文章是否已存在（按规范键判断，同一文章的不同链接视为同一篇）"""
         try:
-            cursor.execute('SELECT COUNT(*) FROM articles WHERE url = ?', (url,))
-            count = cursor.fetchone()[0]
-            return count > 0
+            return self.url_index.contains(canonical_key(url))
         except Exception as e:
             print(f"检查文章存在性失败: {e}")
             return False
+    
+    def is_link_stored(self, link_key: str) -> bool:
+        """检查搜狗链接（按 url 参数）指向的文章是否已采集，不需要先解析跳转"""
+        conn = self.pool.acquire()
+        try:
+            row = conn.execute('''
+                SELECT 1 FROM url_aliases a JOIN articles ar ON ar.canonical_key = a.canonical_key
+                WHERE a.link_key = ? LIMIT 1
+            ''', (link_key,)).fetchone()
+            return row is not None
+        except Exception as e:
+            print(f"检查链接别名失败: {e}")
+            return False
         finally:
-            conn.close()
+            self.pool.release(conn)
+    
+    @staticmethod
+    def _save_link_alias(cursor: sqlite3.Cursor, article: Dict, key: str):
+        """记录文章来源搜狗链接的别名（文章中带有 link_key 时）"""
+        if article.get('link_key'):
+            cursor.execute('''
+                INSERT OR REPLACE INTO url_aliases (link_key, canonical_key) VALUES (?, ?)
+            ''', (article['link_key'], key))
+    
+    def _canonical_key_exists(self, key: str) -> bool:
+        """在数据库中精确检查规范键"""
+        conn = self.pool.acquire()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute('SELECT 1 FROM articles WHERE canonical_key = ? LIMIT 1', (key,))
+            return cursor.fetchone() is not None
+        finally:
+            self.pool.release(conn)
+    
+    def _count_articles(self) -> int:
+        """文章总数（用于估算去重索引容量）"""
+        conn = self.pool.acquire()
+        try:
+            return conn.execute('SELECT COUNT(*) FROM articles').fetchone()[0]
+        finally:
+            self.pool.release(conn)
+    
+    def _iter_canonical_keys(self):
+        """流式读取全部规范键"""
+        conn = self.pool.acquire()
+        try:
+            cursor = conn.execute('SELECT canonical_key FROM articles WHERE canonical_key IS NOT NULL')
+            while True:
+                rows = cursor.fetchmany(10000)
+                if not rows:
+                    break
+                for row in rows:
+                    yield row[0]
+        finally:
+            self.pool.release(conn)
     
     def get_keywords(self, status: str = 'active') -> List[Dict]:
         """获取关键词列表"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.pool.acquire()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -137,7 +469,7 @@ class Database:
         ''', (status,))
         
         results = cursor.fetchall()
-        conn.close()
+        self.pool.release(conn)
         
         return [
             {
@@ -151,14 +483,15 @@ class Database:
     
     def add_article(self, article_data: Dict, keyword_id: Optional[int] = None) -> int:
         """添加文章"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.pool.acquire()
         cursor = conn.cursor()
         
         try:
+            key = article_data.get('canonical_key') or canonical_key(article_data['url'])
             cursor.execute('''
                 INSERT OR REPLACE INTO articles 
-                (title, author, content, url, keyword_id, word_count, html_file, url_number, scrape_time)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                (title, author, content, url, keyword_id, word_count, html_file, url_number, scrape_time, canonical_key)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 article_data['title'],
                 article_data['author'],
@@ -168,76 +501,281 @@ class Database:
                 article_data['word_count'],
                 article_data.get('html_file'),
                 article_data.get('url_number'),
-                article_data['scrape_time']
+                article_data['scrape_time'],
+                key
             ))
             
             article_id = cursor.lastrowid
+            process_index_queue(cursor, self.fts_enabled)
+            self._save_link_alias(cursor, article_data, key)
             conn.commit()
+            self.url_index.add(key)
             return article_id
             
         except Exception as e:
             conn.rollback()
             raise e
         finally:
-            conn.close()
+            self.pool.release(conn)
     
-    def is_article_exists(self, url: str) -> bool:
-        """检查文章是否已存在"""
-        conn = sqlite3.connect(self.db_path)
+    def add_articles_bulk(self, articles: Iterable[Dict], keyword_id: Optional[int] = None,
+                          task_id: Optional[int] = None) -> List[Dict]:
+        """批量添加文章
+
+        在同一个事务内为缺少编号的文章分配url_number、批量写入文章并更新任务进度，
+        整批只提交一次。返回写入的文章（已填入id和url_number）。
+        同一批中规范键或URL重复的文章（如两个搜狗临时链接指向同一篇文章）只保留最后一篇。
+        文章带有 link_key（来源搜狗链接的 url 参数）时一并记录为别名。
+        """
+        articles = self.dedup_batch(dict(article) for article in articles)
+        if not articles:
+            return []
+        
+        conn = self.pool.acquire()
         cursor = conn.cursor()
         
         try:
-            cursor.execute('SELECT COUNT(*) FROM articles WHERE url = ?', (url,))
-            count = cursor.fetchone()[0]
-            return count > 0
+            missing = [article for article in articles if not article.get('url_number')]
+            if missing:
+                numbers = self._increment_url_counter(cursor, len(missing))
+                for article, number in zip(missing, numbers):
+                    article['url_number'] = number
+            
+            # 逐条写入以取得每篇文章的id
+            for article in articles:
+                cursor.execute('''
+                    INSERT OR REPLACE INTO articles 
+                    (title, author, content, url, keyword_id, word_count, html_file, url_number, scrape_time, canonical_key)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    article['title'],
+                    article['author'],
+                    article['content'],
+                    article['url'],
+                    keyword_id,
+                    article['word_count'],
+                    article.get('html_file'),
+                    article['url_number'],
+                    article['scrape_time'],
+                    article['canonical_key']
+                ))
+                article['id'] = cursor.lastrowid
+                self._save_link_alias(cursor, article, article['canonical_key'])
+            # 在同一事务内更新全文索引和相关文章索引
+            process_index_queue(cursor, self.fts_enabled)
+            
+            if task_id:
+                # 任务结果中累计已保存的文章数
+                cursor.execute('SELECT result FROM tasks WHERE id = ?', (task_id,))
+                row = cursor.fetchone()
+                progress = json.loads(row[0]) if row and row[0] else {}
+                progress['saved_count'] = progress.get('saved_count', 0) + len(articles)
+                cursor.execute('UPDATE tasks SET result = ? WHERE id = ?', (json.dumps(progress), task_id))
+            
+            conn.commit()
+            for article in articles:
+                self.url_index.add(article['canonical_key'])
+            return articles
+            
         except Exception as e:
-            print(f"检查文章存在性失败: {e}")
-            return False
+            conn.rollback()
+            raise e
         finally:
-            conn.close()
+            self.pool.release(conn)
+    
+    @staticmethod
+    def dedup_batch(articles: Iterable[Dict]) -> List[Dict]:
+        """去掉批内规范键或URL重复的文章，保留最后出现的（与逐条覆盖写入的结果一致）"""
+        articles = list(articles)
+        for article in articles:
+            article.setdefault('canonical_key', canonical_key(article['url']))
+
+        seen_keys, seen_urls, kept = set(), set(), []
+        for article in reversed(articles):
+            if article['canonical_key'] in seen_keys or article['url'] in seen_urls:
+                continue
+            seen_keys.add(article['canonical_key'])
+            seen_urls.add(article['url'])
+            kept.append(article)
+        kept.reverse()
+        return kept
     
     def get_articles(self, keyword_id: Optional[int] = None, limit: int = 50) -> List[Dict]:
-        """获取文章列表"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+        """获取文章列表（最新一页，仅元数据）"""
+        return self.list_articles(keyword_id, limit)['articles']
+    
+    def list_articles(self, keyword_id: Optional[int] = None, limit: int = 50,
+                      cursor: Optional[str] = None) -> Dict:
+        """分页获取文章元数据
+
+        按 (scrape_time, id) 倒序做游标分页，只读取覆盖索引中的列，不读取正文。
+        返回本页文章和下一页游标（没有更多数据时为None）。
+        """
+        conditions = []
+        params = []
         if keyword_id:
-            cursor.execute('''
-                SELECT a.*, k.keyword FROM articles a
-                LEFT JOIN keywords k ON a.keyword_id = k.id
-                WHERE a.keyword_id = ? ORDER BY a.scrape_time DESC LIMIT ?
-            ''', (keyword_id, limit))
-        else:
-            cursor.execute('''
-                SELECT a.*, k.keyword FROM articles a
-                LEFT JOIN keywords k ON a.keyword_id = k.id
-                ORDER BY a.scrape_time DESC LIMIT ?
-            ''', (limit,))
+            conditions.append('a.keyword_id = ?')
+            params.append(keyword_id)
+        if cursor:
+            last_time, last_id = decode_cursor(cursor)
+            conditions.append('(a.scrape_time, a.id) < (?, ?)')
+            params.extend([last_time, last_id])
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
         
-        results = cursor.fetchall()
-        conn.close()
+        conn = self.pool.acquire()
+        try:
+            results = conn.execute(f'''
+                SELECT a.id, a.title, a.author, a.keyword_id, a.scrape_time, a.word_count,
+                       a.html_file, a.url_number, a.status, k.keyword
+                FROM articles a
+                LEFT JOIN keywords k ON a.keyword_id = k.id
+                {where}
+                ORDER BY a.scrape_time DESC, a.id DESC LIMIT ?
+            ''', params + [limit]).fetchall()
+        finally:
+            self.pool.release(conn)
         
-        return [
+        articles = [
             {
                 'id': row[0],
                 'title': row[1],
                 'author': row[2],
-                'content': row[3],
-                'url': row[4],
-                'keyword_id': row[5],
-                'scrape_time': row[6],
-                'word_count': row[7],
-                'html_file': row[8],
-                'status': row[9],
-                'url_number': row[10],
-                'keyword': row[11]
+                'keyword_id': row[3],
+                'scrape_time': row[4],
+                'word_count': row[5],
+                'html_file': row[6],
+                'url_number': row[7],
+                'status': row[8],
+                'keyword': row[9]
             }
             for row in results
         ]
+        
+        next_cursor = None
+        if len(articles) == limit:
+            last = articles[-1]
+            next_cursor = encode_cursor(last['scrape_time'], last['id'])
+        
+        return {'articles': articles, 'next_cursor': next_cursor}
     
+    def get_article_by_url_number(self, url_number: int, include_content: bool = False) -> Optional[Dict]:
+        """根据URL编号获取文章，include_content为True时同时读取正文"""
+        conn = self.pool.acquire()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute(f'''
+                SELECT id, title, author, url, keyword_id, scrape_time, word_count, html_file, url_number, status,
+                       revision{', content' if include_content else ''}
+                FROM articles WHERE url_number = ? LIMIT 1
+            ''', (url_number,))
+            row = cursor.fetchone()
+        finally:
+            self.pool.release(conn)
+
+        if not row:
+            return None
+
+        article = {
+            'id': row[0],
+            'title': row[1],
+            'author': row[2],
+            'url': row[3],
+            'keyword_id': row[4],
+            'scrape_time': row[5],
+            'word_count': row[6],
+            'html_file': row[7],
+            'url_number': row[8],
+            'status': row[9],
+            'revision': row[10] or 0
+        }
+        if include_content:
+            article['content'] = row[11] or ''
+        return article
+
+    def get_url_number_by_url(self, url: str) -> Optional[int]:
+        """根据文章链接（按规范键）查找已保存文章的URL编号"""
+        return self.get_url_number_by_key(canonical_key(url))
+
+    def get_url_number_by_key(self, key: str) -> Optional[int]:
+        """根据规范键查找已保存文章的URL编号
+
+        临时链接的规范键由页面中的永久链接计算，采集结果应按 result['canonical_key'] 查找。
+        """
+        conn = self.pool.acquire()
+        try:
+            row = conn.execute('SELECT url_number FROM articles WHERE canonical_key = ? LIMIT 1', (key,)).fetchone()
+            return row[0] if row else None
+        finally:
+            self.pool.release(conn)
+
+    def get_url_number_by_html_file(self, html_file: str) -> Optional[int]:
+        """根据HTML文件名查找文章的URL编号"""
+        conn = self.pool.acquire()
+        try:
+            row = conn.execute(
+                'SELECT url_number FROM articles WHERE html_file = ? LIMIT 1', (html_file,)
+            ).fetchone()
+        finally:
+            self.pool.release(conn)
+        return row[0] if row else None
+
+    def update_extracted_articles(self, extracted: Iterable[Dict]) -> List[Dict]:
+        """用重新提取的标题、作者、正文更新文章
+
+        extracted 中每项包含 canonical_key、title、author、content，
+        只更新内容确有变化的文章，返回这些文章更新后的完整记录（用于重新生成HTML）。
+        """
+        conn = self.pool.acquire()
+        cursor = conn.cursor()
+
+        try:
+            changed = []
+            for article in extracted:
+                cursor.execute('''
+                    UPDATE articles SET title = ?, author = ?, content = ?, word_count = ?,
+                        revision = COALESCE(revision, 0) + 1
+                    WHERE canonical_key = ? AND (title IS NOT ? OR author IS NOT ? OR content IS NOT ?)
+                ''', (
+                    article['title'], article['author'], article['content'], len(article['content']),
+                    article['canonical_key'], article['title'], article['author'], article['content']
+                ))
+                if cursor.rowcount:
+                    changed.append(article['canonical_key'])
+
+            rows = []
+            for key in changed:
+                cursor.execute('''
+                    SELECT title, author, content, url, scrape_time, word_count, html_file, url_number, id
+                    FROM articles WHERE canonical_key = ?
+                ''', (key,))
+                rows.extend(cursor.fetchall())
+            process_index_queue(cursor, self.fts_enabled)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            self.pool.release(conn)
+
+        return [
+            {
+                'title': row[0],
+                'author': row[1],
+                'content': row[2],
+                'url': row[3],
+                'scrape_time': row[4],
+                'word_count': row[5],
+                'html_file': row[6],
+                'url_number': row[7],
+                'id': row[8]
+            }
+            for row in rows
+        ]
+
     def add_task(self, keyword_id: int, task_type: str = 'search') -> int:
         """添加任务"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.pool.acquire()
         cursor = conn.cursor()
         
         try:
@@ -253,26 +791,11 @@ class Database:
             conn.rollback()
             raise e
         finally:
-            conn.close()
-    
-    def is_article_exists(self, url: str) -> bool:
-        """检查文章是否已存在"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute('SELECT COUNT(*) FROM articles WHERE url = ?', (url,))
-            count = cursor.fetchone()[0]
-            return count > 0
-        except Exception as e:
-            print(f"检查文章存在性失败: {e}")
-            return False
-        finally:
-            conn.close()
+            self.pool.release(conn)
     
     def update_task_status(self, task_id: int, status: str, result: str = None, error: str = None):
         """更新任务状态"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.pool.acquire()
         cursor = conn.cursor()
         
         try:
@@ -297,26 +820,11 @@ class Database:
             conn.rollback()
             raise e
         finally:
-            conn.close()
-    
-    def is_article_exists(self, url: str) -> bool:
-        """检查文章是否已存在"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute('SELECT COUNT(*) FROM articles WHERE url = ?', (url,))
-            count = cursor.fetchone()[0]
-            return count > 0
-        except Exception as e:
-            print(f"检查文章存在性失败: {e}")
-            return False
-        finally:
-            conn.close()
+            self.pool.release(conn)
     
     def get_tasks(self, status: Optional[str] = None, limit: int = 50) -> List[Dict]:
         """获取任务列表"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.pool.acquire()
         cursor = conn.cursor()
         
         if status:
@@ -333,7 +841,7 @@ class Database:
             ''', (limit,))
         
         results = cursor.fetchall()
-        conn.close()
+        self.pool.release(conn)
         
         return [
             {
@@ -351,18 +859,65 @@ class Database:
             for row in results
         ]
     
-    def get_random_articles(self, limit: int = 15) -> List[Dict]:
-        """获取随机文章列表"""
-        conn = sqlite3.connect(self.db_path)
+    def get_random_articles(self, limit: int = 15, exclude_url_number: Optional[int] = None) -> List[Dict]:
+        """获取随机文章列表
+
+        按rowid区间随机探测，每次探测是一次主键查找，开销只与limit有关，
+        不随文章总数增长；id区间较小时直接读取整个区间再抽样。
+        """
+        conn = self.pool.acquire()
         cursor = conn.cursor()
+        columns = 'id, title, author, scrape_time, html_file, url_number'
         
-        cursor.execute('''
-            SELECT id, title, author, scrape_time, html_file, url_number FROM articles 
-            ORDER BY RANDOM() LIMIT ?
-        ''', (limit,))
-        
-        results = cursor.fetchall()
-        conn.close()
+        try:
+            # 分开写两个子查询，SQLite才会直接读主键B树两端
+            cursor.execute('SELECT (SELECT MIN(id) FROM articles), (SELECT MAX(id) FROM articles)')
+            min_id, max_id = cursor.fetchone()
+            if min_id is None or limit <= 0:
+                return []
+            
+            if max_id - min_id + 1 <= limit * RANDOM_SCAN_FACTOR:
+                cursor.execute(f'SELECT {columns} FROM articles WHERE id BETWEEN ? AND ?', (min_id, max_id))
+                candidates = [row for row in cursor.fetchall() if row[5] is None or row[5] != exclude_url_number]
+                results = random.sample(candidates, min(limit, len(candidates)))
+            else:
+                results = []
+                seen = set()
+                for _ in range(limit * RANDOM_PROBE_FACTOR):
+                    if len(results) >= limit:
+                        break
+                    cursor.execute(
+                        f'SELECT {columns} FROM articles WHERE id >= ? ORDER BY id LIMIT 1',
+                        (random.randint(min_id, max_id),)
+                    )
+                    row = cursor.fetchone()
+                    if not row or row[0] in seen:
+                        continue
+                    seen.add(row[0])
+                    if exclude_url_number is not None and row[5] == exclude_url_number:
+                        continue
+                    results.append(row)
+                
+                if len(results) < limit:
+                    # 空洞较多时探测会反复落到空洞后的同一篇文章，从随机位置起顺序补足：
+                    # 一次查询读取 start 之后、不够时再从头读取的文章，已抽到的文章在SQL中跳过。
+                    # 外层 LIMIT 已满时SQLite不再执行 UNION ALL 的第二个查询
+                    start = random.randint(min_id, max_id)
+                    need = limit - len(results)
+                    filters = f"id NOT IN ({','.join('?' * len(seen))})"
+                    filter_params = list(seen)
+                    if exclude_url_number is not None:
+                        filters += ' AND url_number IS NOT ?'
+                        filter_params.append(exclude_url_number)
+                    cursor.execute(f'''
+                        SELECT * FROM (SELECT {columns} FROM articles WHERE id >= ? AND {filters} ORDER BY id LIMIT ?)
+                        UNION ALL
+                        SELECT * FROM (SELECT {columns} FROM articles WHERE id < ? AND {filters} ORDER BY id LIMIT ?)
+                        LIMIT ?
+                    ''', [start, *filter_params, need, start, *filter_params, need, need])
+                    results.extend(cursor.fetchall())
+        finally:
+            self.pool.release(conn)
         
         return [
             {
@@ -376,78 +931,261 @@ class Database:
             for row in results
         ]
     
+    def get_related_articles(self, article_id: int, limit: int = 15) -> List[Dict]:
+        """读取预计算的相关文章，按相似度从高到低"""
+        conn = self.pool.acquire()
+        try:
+            rows = conn.execute('''
+                SELECT a.id, a.title, a.author, a.scrape_time, a.html_file, a.url_number
+                FROM related_articles r JOIN articles a ON a.id = r.related_id
+                WHERE r.article_id = ?
+                ORDER BY r.score DESC
+                LIMIT ?
+            ''', (article_id, limit)).fetchall()
+        finally:
+            self.pool.release(conn)
+
+        return [
+            {
+                'id': row[0],
+                'title': row[1],
+                'author': row[2],
+                'scrape_time': row[3],
+                'html_file': row[4],
+                'url_number': row[5]
+            }
+            for row in rows
+        ]
+    
     def get_stats(self) -> Dict:
-        """获取统计信息"""
-        conn = sqlite3.connect(self.db_path)
+        """获取统计信息（读取触发器维护的计数）"""
+        conn = self.pool.acquire()
         cursor = conn.cursor()
         
-        # 关键词数量
-        cursor.execute('SELECT COUNT(*) FROM keywords WHERE status = "active"')
-        keyword_count = cursor.fetchone()[0]
+        try:
+            cursor.execute('''
+                SELECT name, value FROM stats_counters
+                UNION ALL
+                SELECT 'today', count FROM article_time_buckets
+                WHERE granularity = 'day' AND bucket = ?
+            ''', (datetime.now().strftime('%Y-%m-%d'),))  # scrape_time 是本地时间，DATE('now') 是UTC日期
+            counters = dict(cursor.fetchall())
+        finally:
+            self.pool.release(conn)
         
-        # 文章数量
-        cursor.execute('SELECT COUNT(*) FROM articles')
-        article_count = cursor.fetchone()[0]
+        return {
+            'keyword_count': counters.get('keywords:active', 0),
+            'article_count': counters.get('articles', 0),
+            'today_articles': counters.get('today', 0),
+            'task_stats': {
+                name[len('tasks:'):]: value
+                for name, value in counters.items()
+                if name.startswith('tasks:') and value > 0
+            }
+        }
+    
+    def get_article_time_buckets(self, granularity: str = 'day', limit: int = 30) -> List[Dict]:
+        """获取按天或按小时统计的文章数量（最近的在前）"""
+        if granularity not in ('day', 'hour'):
+            raise ValueError("granularity必须是day或hour")
+        
+        conn = self.pool.acquire()
+        try:
+            results = conn.execute('''
+                SELECT bucket, count FROM article_time_buckets
+                WHERE granularity = ? AND count > 0
+                ORDER BY bucket DESC LIMIT ?
+            ''', (granularity, limit)).fetchall()
+        finally:
+            self.pool.release(conn)
+        
+        return [{'bucket': row[0], 'count': row[1]} for row in results]
+    
+    def rebuild_stats(self) -> Dict:
+        """从头重算统计计数，返回与原计数不一致的项"""
+        conn = self.pool.acquire()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('SELECT name, value FROM stats_counters')
+            before = dict(cursor.fetchall())
+            cursor.execute("SELECT granularity || ':' || bucket, count FROM article_time_buckets")
+            before.update(cursor.fetchall())
+            
+            self._rebuild_stats(cursor)
+            
+            cursor.execute('SELECT name, value FROM stats_counters')
+            after = dict(cursor.fetchall())
+            cursor.execute("SELECT granularity || ':' || bucket, count FROM article_time_buckets")
+            after.update(cursor.fetchall())
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            self.pool.release(conn)
         
-        # 今日文章数量
+        return {
+            name: {'before': before.get(name, 0), 'after': after.get(name, 0)}
+            for name in set(before) | set(after)
+            if before.get(name, 0) != after.get(name, 0)
+        }
+    
+    def _rebuild_stats(self, cursor: sqlite3.Cursor):
+        """在当前事务内重算统计计数"""
+        cursor.execute('DELETE FROM stats_counters')
+        cursor.execute('DELETE FROM article_time_buckets')
+        cursor.execute("INSERT INTO stats_counters (name, value) SELECT 'articles', COUNT(*) FROM articles")
+        cursor.execute('''
+            INSERT INTO stats_counters (name, value)
+            SELECT 'keywords:' || COALESCE(status, ''), COUNT(*) FROM keywords GROUP BY 1
+        ''')
         cursor.execute('''
-            SELECT COUNT(*) FROM articles 
-            WHERE DATE(scrape_time) = DATE('now')
+            INSERT INTO stats_counters (name, value)
+            SELECT 'tasks:' || COALESCE(status, ''), COUNT(*) FROM tasks GROUP BY 1
         ''')
-        today_articles = cursor.fetchone()[0]
+        for granularity, expr in (('day', STATS_DAY_EXPR), ('hour', STATS_HOUR_EXPR)):
+            cursor.execute(f'''
+                INSERT INTO article_time_buckets (granularity, bucket, count)
+                SELECT '{granularity}', {expr.format(row='articles')}, COUNT(*) FROM articles GROUP BY 2
+            ''')
+    
+    def search_articles(self, query: str, page: int = 1, page_size: int = 20) -> Dict:
+        """全文检索文章，按相关度排序分页返回"""
+        if not self.fts_enabled:
+            raise RuntimeError("当前SQLite不支持FTS5，全文检索不可用")
         
-        # 任务统计
-        cursor.execute('SELECT status, COUNT(*) FROM tasks GROUP BY status')
-        task_stats = dict(cursor.fetchall())
+        match = build_match_query(query)
+        if not match:
+            return {'query': query, 'total': 0, 'page': page, 'page_size': page_size, 'results': []}
         
-        conn.close()
+        conn = self.pool.acquire()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute('SELECT COUNT(*) FROM articles_fts WHERE articles_fts MATCH ?', (match,))
+            total = cursor.fetchone()[0]
+            
+            cursor.execute('''
+                SELECT a.id, a.title, a.author, a.scrape_time, a.url_number, a.html_file, a.content,
+                       bm25(articles_fts, ?, ?, ?) AS score
+                FROM articles_fts
+                JOIN articles a ON a.id = articles_fts.rowid
+                WHERE articles_fts MATCH ?
+                ORDER BY score LIMIT ? OFFSET ?
+            ''', (*BM25_WEIGHTS, match, page_size, (page - 1) * page_size))
+            results = cursor.fetchall()
+        finally:
+            self.pool.release(conn)
         
         return {
-            'keyword_count': keyword_count,
-            'article_count': article_count,
-            'today_articles': today_articles,
-            'task_stats': task_stats
+            'query': query,
+            'total': total,
+            'page': page,
+            'page_size': page_size,
+            'results': [
+                {
+                    'id': row[0],
+                    'title': row[1],
+                    'author': row[2],
+                    'scrape_time': row[3],
+                    'url_number': row[4],
+                    'html_file': row[5],
+                    'snippet': make_snippet(row[6], query),
+                    'score': -row[7]
+                }
+                for row in results
+            ]
         }
     
-    def get_next_url_number(self) -> int:
-        """获取下一个URL编号"""
-        conn = sqlite3.connect(self.db_path)
+    def process_index_queue(self) -> int:
+        """处理其他连接写入文章表后留在队列中的索引变更，返回处理的条数"""
+        conn = self.pool.acquire()
+        try:
+            count = process_index_queue(conn.cursor(), self.fts_enabled)
+            conn.commit()
+            return count
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            self.pool.release(conn)
+    
+    def rebuild_search_index(self) -> int:
+        """重建全文索引，返回索引的文章数"""
+        if not self.fts_enabled:
+            raise RuntimeError("当前SQLite不支持FTS5，全文检索不可用")
+        
+        conn = self.pool.acquire()
         cursor = conn.cursor()
         
         try:
-            # 获取当前计数并递增
-            cursor.execute('SELECT current_count FROM url_counter ORDER BY id DESC LIMIT 1')
-            result = cursor.fetchone()
-            
-            if result:
-                current_count = result[0]
-                next_count = current_count + 1
-            else:
-                next_count = 1
-            
-            # 更新计数器
-            cursor.execute('UPDATE url_counter SET current_count = ?, updated_at = CURRENT_TIMESTAMP WHERE id = (SELECT id FROM url_counter ORDER BY id DESC LIMIT 1)', (next_count,))
-            
+            # 队列中的其他变更照常处理，全文索引部分由重建覆盖
+            process_index_queue(cursor, search_index=False)
+            count = rebuild_search_index(cursor)
             conn.commit()
-            return next_count
-            
+            return count
         except Exception as e:
             conn.rollback()
             raise e
         finally:
-            conn.close()
+            self.pool.release(conn)
     
-    def is_article_exists(self, url: str) -> bool:
-        """检查文章是否已存在"""
-        conn = sqlite3.connect(self.db_path)
+    def rebuild_related_index(self) -> int:
+        """重新计算相关文章索引，返回索引的文章数"""
+        conn = self.pool.acquire()
+        try:
+            process_index_queue(conn.cursor(), self.fts_enabled)
+            count = rebuild_related_index(conn)
+            conn.commit()
+            return count
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            self.pool.release(conn)
+    
+    def get_next_url_number(self) -> int:
+        """获取下一个URL编号"""
+        return self.reserve_url_numbers(1).start
+    
+    def reserve_url_numbers(self, count: int) -> range:
+        """原子地预留一段连续的URL编号"""
+        if count < 1:
+            raise ValueError("count必须大于0")
+        
+        conn = self.pool.acquire()
         cursor = conn.cursor()
         
         try:
-            cursor.execute('SELECT COUNT(*) FROM articles WHERE url = ?', (url,))
-            count = cursor.fetchone()[0]
-            return count > 0
+            numbers = self._increment_url_counter(cursor, count)
+            conn.commit()
+            return numbers
+            
         except Exception as e:
-            print(f"检查文章存在性失败: {e}")
-            return False
+            conn.rollback()
+            raise e
         finally:
-            conn.close()
+            self.pool.release(conn)
+    
+    def _increment_url_counter(self, cursor: sqlite3.Cursor, count: int) -> range:
+        """在当前事务内递增计数器，返回预留的编号区间"""
+        if HAS_RETURNING:
+            # 单条语句完成读取和递增，并发调用不会拿到重复编号
+            cursor.execute('''
+                UPDATE url_counter SET current_count = current_count + ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = (SELECT MAX(id) FROM url_counter)
+                RETURNING current_count
+            ''', (count,))
+            end = cursor.fetchone()[0]
+        else:
+            # 旧版SQLite不支持RETURNING；UPDATE后本事务已持有写锁，随后读取的就是自己写入的值
+            cursor.execute('''
+                UPDATE url_counter SET current_count = current_count + ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = (SELECT MAX(id) FROM url_counter)
+            ''', (count,))
+            cursor.execute('SELECT current_count FROM url_counter ORDER BY id DESC LIMIT 1')
+            end = cursor.fetchone()[0]
+        
+        return range(end - count + 1, end + 1)
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文章正文提取：只解析需要的节点，一次遍历取出标题、作者和正文
+"""
+
+import codecs
+import re
+from typing import Dict, Optional
+
+from bs4 import BeautifulSoup
+from bs4.filter import ElementFilter
+
+from url_canonical import extract_permanent_link
+
+try:
+    import lxml  # noqa: F401
+    PARSER = 'lxml'
+except ImportError:
+    PARSER = 'html.parser'
+
+# 各字段的候选节点，按优先级排列: (标签名, id, class, 属性)，None表示不限
+TITLE_RULES = [
+    ('h1', 'activity-name', None, None),
+    ('h1', None, 'rich_media_title', None),
+    ('title', None, None, None),
+    ('h1', None, None, None),
+]
+AUTHOR_RULES = [
+    (None, None, 'rich_media_meta_text', None),
+    (None, None, 'author', None),
+    (None, None, None, 'data-author'),
+]
+CONTENT_RULES = [
+    (None, 'js_content', None, None),
+    (None, None, 'rich_media_content', None),
+    (None, None, 'content', None),
+    ('article', None, None, None),
+    ('main', None, None, None),
+]
+FIELD_RULES = {
+    'title': TITLE_RULES,
+    'author': AUTHOR_RULES,
+    'content': CONTENT_RULES,
+}
+
+# 流式下载的提前截止：正文容器闭合、且页面中的永久链接已读到后即可停止
+# 注释、脚本和样式中的标签不计入嵌套，扫描到它们的开始时跳到对应的结束标记
+RAW_TEXT_START = rb'(?P<raw><!--|<script[\s>]|<style[\s>])'
+RAW_TEXT_END = {
+    b'<!--': re.compile(rb'-->'),
+    b'<scr': re.compile(rb'</script\s*>', re.IGNORECASE),
+    b'<sty': re.compile(rb'</style\s*>', re.IGNORECASE),
+}
+CONTENT_START_PATTERN = re.compile(RAW_TEXT_START + rb'|id=["\']js_content["\'][^>]*>', re.IGNORECASE)
+DIV_TAG_PATTERN = re.compile(RAW_TEXT_START + rb'|<(?P<close>/?)div[\s>/]', re.IGNORECASE)
+MSG_LINK_MARKER = re.compile(rb'var\s+msg_link\s*=\s*"[^"]*"')
+MSG_LINK_WINDOW = 512 * 1024   # 正文结束后最多再读这么多字节寻找永久链接
+
+# 页面内声明的编码：<meta charset="..."> 或 <meta http-equiv="Content-Type" content="...; charset=...">
+META_CHARSET_PATTERN = re.compile(rb'<meta[^>]+?charset\s*=\s*["\']?\s*([A-Za-z0-9_.:-]+)', re.IGNORECASE)
+META_SCAN_BYTES = 4096
+# 响应头没有charset时 requests 对 text/* 返回的默认编码，不代表服务器的声明
+HTTP_DEFAULT_CHARSETS = {'iso-8859-1', 'latin-1', 'latin1'}
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+# 文章结尾的推广内容，从最先出现的标记处截断
+TRAILER_PATTERN = re.compile(r'跳转二维码|作者头像|长按识别|扫码关注|点击阅读')
+
+
+def clean_text(text: Optional[str]) -> str:
+    """合并空白并去掉结尾推广内容"""
+    if not text:
+        return ""
+    match = TRAILER_PATTERN.search(text)
+    if match:
+        text = text[:match.start()]
+    return WHITESPACE_PATTERN.sub(' ', text).strip()
+
+
+def _classes(value) -> tuple:
+    if not value:
+        return ()
+    return tuple(value.split()) if isinstance(value, str) else tuple(value)
+
+
+def _matches(rule, name: str, attrs) -> bool:
+    tag, tag_id, css_class, attr = rule
+    return ((tag is None or tag == name)
+            and (tag_id is None or attrs.get('id') == tag_id)
+            and (css_class is None or css_class in _classes(attrs.get('class')))
+            and (attr is None or attr in attrs))
+
+
+class ArticleFilter(ElementFilter):
+    """解析时只保留候选节点及其子树，页面其余部分（脚本、样式、推荐区等）不建树"""
+
+    def __init__(self):
+        super().__init__()
+        rules = [rule for field_rules in FIELD_RULES.values() for rule in field_rules]
+        # 候选节点只要满足任一条件即可，先用集合粗筛
+        self.names = {tag for tag, tag_id, css_class, attr in rules if tag and not (tag_id or css_class or attr)}
+        self.ids = {tag_id for _, tag_id, _, _ in rules if tag_id}
+        self.classes = {css_class for _, _, css_class, _ in rules if css_class}
+        self.attrs = {attr for _, _, _, attr in rules if attr}
+
+    def allow_tag_creation(self, nsprefix, name, attrs) -> bool:
+        if name in self.names:
+            return True
+        if not attrs:
+            return False
+        return (attrs.get('id') in self.ids
+                or not self.classes.isdisjoint(_classes(attrs.get('class')))
+                or any(attr in attrs for attr in self.attrs))
+
+    def allow_string_creation(self, string: str) -> bool:
+        return False
+
+
+ARTICLE_FILTER = ArticleFilter()
+
+
+def extract_article(html: str, parser: str = PARSER) -> Dict[str, str]:
+    """提取标题、作者和正文，找不到时分别返回"未知标题"、"未知作者"、空字符串"""
+    # class保持原始字符串，不拆分成列表
+    soup = BeautifulSoup(html, parser, parse_only=ARTICLE_FILTER, multi_valued_attributes=None)
+
+    # 一次遍历，为每个字段记录优先级最高的第一个节点
+    best = {field: (len(rules), None) for field, rules in FIELD_RULES.items()}
+    for element in soup.find_all(True):
+        if all(rank == 0 for rank, _ in best.values()):
+            break
+        for field, rules in FIELD_RULES.items():
+            rank = best[field][0]
+            for i in range(rank):
+                if _matches(rules[i], element.name, element.attrs):
+                    best[field] = (i, element)
+                    break
+
+    title = best['title'][1]
+    author = best['author'][1]
+    content = best['content'][1]
+    return {
+        'title': title.get_text().strip() if title else "未知标题",
+        'author': author.get_text().strip() if author else "未知作者",
+        'content': clean_text(content.get_text()) if content else "",
+    }
+
+
+class ContentCutoff:
+    """流式下载的停止条件，作为 HttpClient.get_streamed 的 stop 参数
+
+    跟踪 #js_content 之后 div 的嵌套深度（跳过注释、脚本和样式），找到与之配对的闭合标签后，
+    再等到 msg_link（计算规范键用）在页面中出现，或正文结束后已多读 MSG_LINK_WINDOW 字节。
+    """
+
+    OVERLAP = 16        # 闭合标签扫描时末尾保留的字节数，避免标签被分块截断
+    START_OVERLAP = 512  # 正文起始标签（可能带较长的style等属性）跨块时回退的字节数
+    TOKEN_BYTES = 8     # 嵌套扫描匹配的最长标记（<script + 一个字符）
+
+    LINK_OVERLAP = 2048  # msg_link 跨块时回退的字节数（包含整个链接）
+
+    def __init__(self):
+        self.pos = 0
+        self.depth = 0
+        self.raw_end = None  # 正在跳过的注释或脚本的结束标记
+        self.content_end = None
+        self.link_pos = 0
+
+    def __call__(self, buffer: bytearray) -> bool:
+        if self.content_end is None and not self._scan_content(buffer):
+            return False
+        # msg_link 可能出现在正文之前，从页面开头查找，之后每块只查新读到的部分
+        if MSG_LINK_MARKER.search(buffer, self.link_pos):
+            return True
+        self.link_pos = max(self.link_pos, len(buffer) - self.LINK_OVERLAP)
+        return len(buffer) - self.content_end >= MSG_LINK_WINDOW
+
+    def _skip_raw_text(self, buffer: bytearray) -> bool:
+        """跳到注释或脚本的结束标记之后，结束标记还没读到时返回False"""
+        match = self.raw_end.search(buffer, self.pos)
+        if not match:
+            self.pos = max(self.pos, len(buffer) - self.OVERLAP)
+            return False
+        self.pos = match.end()
+        self.raw_end = None
+        return True
+
+    def _scan_content(self, buffer: bytearray) -> bool:
+        while True:
+            if self.raw_end is not None and not self._skip_raw_text(buffer):
+                return False
+
+            if self.depth:
+                # 只扫描完整出现的标签，末尾可能被截断的部分留到下一块
+                limit = len(buffer) - self.OVERLAP
+                match = DIV_TAG_PATTERN.search(buffer, self.pos, max(self.pos, limit))
+                if not match:
+                    # 跨越扫描边界的标记下次从它的开头重新匹配
+                    self.pos = max(self.pos, limit - self.TOKEN_BYTES)
+                    return False
+            else:
+                match = CONTENT_START_PATTERN.search(buffer, self.pos)
+                if not match:
+                    self.pos = max(self.pos, len(buffer) - self.START_OVERLAP)
+                    return False
+
+            self.pos = match.end()
+            if match.group('raw'):
+                self.raw_end = RAW_TEXT_END[bytes(match.group('raw')[:4]).lower()]
+            elif not self.depth:
+                self.depth = 1
+            else:
+                self.depth += -1 if match.group('close') else 1
+                if self.depth == 0:
+                    self.content_end = match.end()
+                    return True
+
+
+def detect_encoding(content: bytes, encoding: Optional[str] = None) -> str:
+    """确定页面编码：响应头声明的编码 > 页面 meta 声明 > UTF-8
+
+    响应头没有charset时 requests 给出的 ISO-8859-1（旧归档中也记录了这个值）视为未声明，
+    没有 meta 声明时，内容是合法UTF-8就按UTF-8解码。
+    """
+    if encoding and encoding.lower() not in HTTP_DEFAULT_CHARSETS:
+        return encoding
+
+    match = META_CHARSET_PATTERN.search(content, 0, META_SCAN_BYTES)
+    if match:
+        declared = match.group(1).decode('ascii')
+        try:
+            codecs.lookup(declared)
+            return declared
+        except LookupError:
+            pass
+
+    if encoding:
+        try:
+            content.decode('utf-8')
+            return 'utf-8'
+        except UnicodeDecodeError:
+            return encoding
+    return 'utf-8'
+
+
+def parse_page(content: bytes, encoding: Optional[str] = None) -> Dict[str, str]:
+    """从原始响应字节解析文章，附带页面中的永久链接
+
+    解码也在这里完成，放到解析进程中执行时主线程只需传递字节。
+    """
+    html = content.decode(detect_encoding(content, encoding), errors='replace')
+    article = extract_article(html)
+    article['permanent_link'] = extract_permanent_link(html)
+    return article
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+并发抓取引擎：有界线程池 + 按主机的自适应令牌桶限速
+"""
+
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+# 每个主机的限速配置: (每秒请求数, 突发容量)
+HOST_RATE_LIMITS = {
+    'mp.weixin.qq.com': (0.5, 3),
+    'weixin.sogou.com': (0.2, 1),
+}
+DEFAULT_RATE_LIMIT = (1.0, 2)
+DEFAULT_WORKERS = 4
+
+# 自适应限速（AIMD）：响应正常时按步长加速，遇到验证码/反爬时速率减半并暂停
+# 每个主机的速率范围: (最低, 最高) 每秒请求数
+HOST_RATE_BOUNDS = {
+    'mp.weixin.qq.com': (0.05, 2.0),
+    'weixin.sogou.com': (0.02, 0.5),
+}
+DEFAULT_RATE_BOUNDS = (0.1, 5.0)
+INCREASE_STEP = 0.01        # 每个正常响应增加的速率
+DECREASE_FACTOR = 0.5       # 被拦截时速率乘以该系数
+BLOCK_PAUSE_SECONDS = 30    # 被拦截后暂停时间，连续拦截时翻倍
+MAX_PAUSE_SECONDS = 600
+
+
+class TokenBucket:
+    """令牌桶，按固定速率补充令牌（clock 可替换，便于测试）"""
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.updated_at = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self) -> float:
+        """预订一个令牌，返回需要等待的秒数"""
+        with self.lock:
+            now = self.clock()
+            self._refill(now)
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def set_rate(self, rate: float):
+        """调整补充速率"""
+        with self.lock:
+            self._refill(self.clock())
+            self.rate = rate
+
+    def pause(self, seconds: float):
+        """取消突发配额并预扣 seconds 秒的令牌，下一个请求在正常间隔之外再等待这么久"""
+        with self.lock:
+            self._refill(self.clock())
+            self.tokens = min(self.tokens, 1) - seconds * self.rate
+
+
+class HostRateLimiter:
+    """按主机名分别限速，每个主机一个令牌桶
+
+    速率按AIMD自适应：record_success() 加性提速，record_blocked() 乘性降速并暂停，
+    每个主机的速率限制在 bounds 给出的范围内。
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[float, float]]] = None,
+                 default: Tuple[float, float] = DEFAULT_RATE_LIMIT,
+                 bounds: Optional[Dict[str, Tuple[float, float]]] = None,
+                 default_bounds: Tuple[float, float] = DEFAULT_RATE_BOUNDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.limits = dict(HOST_RATE_LIMITS if limits is None else limits)
+        self.default = default
+        self.bounds = dict(HOST_RATE_BOUNDS if bounds is None else bounds)
+        self.default_bounds = default_bounds
+        self.clock = clock
+        self.buckets = {}
+        self.blocks = {}          # 主机 -> 连续被拦截次数
+        self.block_counts = {}    # 主机 -> 累计被拦截次数
+        self.waited_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        return urllib.parse.urlsplit(url).netloc.lower()
+
+    def bucket(self, host: str) -> TokenBucket:
+        """获取主机对应的令牌桶"""
+        with self._lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                rate, capacity = self.limits.get(host, self.default)
+                bucket = self.buckets[host] = TokenBucket(rate, capacity, self.clock)
+            return bucket
+
+    def acquire(self, url: str) -> float:
+        """请求前调用，必要时阻塞等待，返回实际等待的秒数"""
+        delay = self.bucket(self.host_of(url)).reserve()
+        if delay > 0:
+            time.sleep(delay)
+            with self._lock:
+                self.waited_seconds += delay
+        return delay
+
+    def record_success(self, url: str):
+        """响应正常：速率加性增加"""
+        host = self.host_of(url)
+        bucket = self.bucket(host)
+        max_rate = self.bounds.get(host, self.default_bounds)[1]
+        with self._lock:
+            self.blocks[host] = 0
+        if bucket.rate < max_rate:
+            bucket.set_rate(min(max_rate, bucket.rate + INCREASE_STEP))
+
+    def record_blocked(self, url: str) -> float:
+        """遇到验证码或反爬：速率乘性降低并暂停该主机，返回暂停秒数"""
+        host = self.host_of(url)
+        bucket = self.bucket(host)
+        min_rate = self.bounds.get(host, self.default_bounds)[0]
+        with self._lock:
+            strikes = self.blocks.get(host, 0) + 1
+            self.blocks[host] = strikes
+            self.block_counts[host] = self.block_counts.get(host, 0) + 1
+
+        bucket.set_rate(max(min_rate, bucket.rate * DECREASE_FACTOR))
+        pause = min(MAX_PAUSE_SECONDS, BLOCK_PAUSE_SECONDS * 2 ** (strikes - 1))
+        bucket.pause(pause)
+        print(f"🐢 {host} 被拦截（连续 {strikes} 次），速率降至 {bucket.rate:.3f}/秒，暂停 {pause} 秒")
+        return pause
+
+    def get_stats(self) -> Dict:
+        """各主机当前速率"""
+        with self._lock:
+            buckets = dict(self.buckets)
+            blocks = dict(self.blocks)
+            block_counts = dict(self.block_counts)
+            waited = self.waited_seconds
+        return {
+            'waited_seconds': round(waited, 1),
+            'hosts': {
+                host: {
+                    'rate': round(bucket.rate, 3),
+                    'capacity': bucket.capacity,
+                    'bounds': self.bounds.get(host, self.default_bounds),
+                    'consecutive_blocks': blocks.get(host, 0),
+                    'blocked': block_counts.get(host, 0)
+                }
+                for host, bucket in buckets.items()
+            }
+        }
+
+
+# 进程内共享的限速器，所有采集器共用同一组主机配额
+host_limiter = HostRateLimiter()
+
+
+class FetchEngine:
+    """有界并发抓取
+
+    最多 workers 个任务同时执行，未提交的URL留在输入迭代器中（背压），
+    结果按完成顺序返回。限速由 fetch 函数内部调用限速器完成。
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS):
+        self.workers = workers
+
+    def map(self, fetch: Callable[[str], object], urls: Iterable[str],
+            on_idle: Optional[Callable[[], None]] = None,
+            idle_interval: float = 1.0) -> Iterator[Tuple[str, object]]:
+        """并发执行 fetch(url)，逐个返回 (url, 结果)；异常时结果为None
+
+        给出 on_idle 时，等待结果期间每隔 idle_interval 秒在调用方线程中调用一次，
+        用于处理不应等到下一个结果返回才做的工作（如按时间写库）。
+        """
+        urls = iter(urls)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            running = {}
+
+            def submit_next() -> bool:
+                url = next(urls, None)
+                if url is None:
+                    return False
+                running[executor.submit(fetch, url)] = url
+                return True
+
+            for _ in range(self.workers):
+                if not submit_next():
+                    break
+
+            while running:
+                done, _ = wait(running, timeout=idle_interval if on_idle else None,
+                               return_when=FIRST_COMPLETED)
+                if not done:
+                    try:
+                        on_idle()
+                    except Exception as e:
+                        print(f"❌ 空闲回调异常: {e}")
+                    continue
+                for future in done:
+                    url = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        print(f"❌ 抓取异常: {url} {e}")
+                        result = None
+                    submit_next()
+                    yield url, result
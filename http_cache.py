@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP条件请求缓存：保存ETag/Last-Modified和响应正文，重新采集时服务器返回304即复用
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from precompress import write_atomic
+
+CACHE_DIR = 'http_cache'
+CACHE_MAX_BYTES = 256 * 1024 * 1024   # 正文文件总大小上限，超出按最近使用时间淘汰
+
+INDEX_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS entries (
+        url TEXT PRIMARY KEY,
+        etag TEXT,
+        last_modified TEXT,
+        encoding TEXT,
+        filename TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        last_used_at REAL NOT NULL,
+        partial INTEGER NOT NULL DEFAULT 0
+    )
+'''
+INDEX_LRU_SQL = '''
+    CREATE INDEX IF NOT EXISTS idx_entries_last_used ON entries (last_used_at)
+'''
+
+
+class HttpCache:
+    """磁盘上的HTTP条件请求缓存
+
+    只缓存带有 ETag 或 Last-Modified 的响应；再次请求同一URL时附带
+    If-None-Match / If-Modified-Since，服务器返回304时直接使用缓存的正文。
+    提前停止下载的正文作为部分条目保存，只用于同样会提前停止的请求。
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.requests = 0
+        self.conditional = 0
+        self.hits = 0
+        self.stored = 0
+        self.evicted = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(directory, 'index.db'), check_same_thread=False, timeout=5)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(INDEX_TABLE_SQL)
+        columns = [row[1] for row in self._conn.execute('PRAGMA table_info(entries)')]
+        if 'partial' not in columns:
+            # 旧版本只缓存完整正文
+            self._conn.execute('ALTER TABLE entries ADD COLUMN partial INTEGER NOT NULL DEFAULT 0')
+        self._conn.execute(INDEX_LRU_SQL)
+        self._conn.commit()
+        self.total_bytes = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+
+    @staticmethod
+    def _filename(url: str) -> str:
+        return hashlib.sha1(url.encode('utf-8')).hexdigest() + '.body'
+
+    def conditional_headers(self, url: str, allow_partial: bool = False) -> Dict[str, str]:
+        """为请求生成条件头，没有缓存（或只有部分正文而调用方需要完整正文）时返回空字典"""
+        with self._lock:
+            self.requests += 1
+            row = self._conn.execute('SELECT etag, last_modified, partial FROM entries WHERE url = ?',
+                                     (url,)).fetchone()
+            if row and row[2] and not allow_partial:
+                row = None
+            if row:
+                self.conditional += 1
+        if not row:
+            return {}
+
+        headers = {}
+        if row[0]:
+            headers['If-None-Match'] = row[0]
+        if row[1]:
+            headers['If-Modified-Since'] = row[1]
+        return headers
+
+    def load(self, url: str) -> Optional[Tuple[bytes, Optional[str], bool]]:
+        """服务器返回304后读取缓存正文，返回 (正文, 编码, 是否部分正文)"""
+        with self._lock:
+            row = self._conn.execute('SELECT filename, encoding, partial FROM entries WHERE url = ?',
+                                     (url,)).fetchone()
+            if not row:
+                return None
+            self._conn.execute('UPDATE entries SET last_used_at = ? WHERE url = ?', (time.time(), url))
+            self._conn.commit()
+
+        try:
+            with open(os.path.join(self.directory, row[0]), 'rb') as f:
+                content = f.read()
+        except OSError:
+            self.discard(url)
+            return None
+
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += len(content)
+        return content, row[1], bool(row[2])
+
+    def store(self, url: str, content: bytes, etag: Optional[str], last_modified: Optional[str],
+              encoding: Optional[str] = None, partial: bool = False):
+        """保存带校验信息的响应；没有ETag和Last-Modified时删除旧条目
+
+        partial 表示正文是提前停止下载的前缀。
+        """
+        if not etag and not last_modified:
+            self.discard(url)
+            return
+        if len(content) > self.max_bytes:
+            return
+
+        filename = self._filename(url)
+        write_atomic(os.path.join(self.directory, filename), content)
+
+        with self._lock:
+            row = self._conn.execute('SELECT size FROM entries WHERE url = ?', (url,)).fetchone()
+            self._conn.execute('''
+                INSERT OR REPLACE INTO entries (url, etag, last_modified, encoding, filename, size, last_used_at, partial)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (url, etag, last_modified, encoding, filename, len(content), time.time(), int(partial)))
+            self.total_bytes += len(content) - (row[0] if row else 0)
+            self.stored += 1
+            self._evict()
+            self._conn.commit()
+
+    def discard(self, url: str):
+        """删除一个条目"""
+        with self._lock:
+            row = self._conn.execute('SELECT filename, size FROM entries WHERE url = ?', (url,)).fetchone()
+            if not row:
+                return
+            self._conn.execute('DELETE FROM entries WHERE url = ?', (url,))
+            self._conn.commit()
+            self.total_bytes -= row[1]
+        self._remove_file(row[0])
+
+    def _evict(self):
+        """超出容量时删除最久未使用的条目（调用方持有锁）"""
+        while self.total_bytes > self.max_bytes:
+            row = self._conn.execute(
+                'SELECT url, filename, size FROM entries ORDER BY last_used_at LIMIT 1'
+            ).fetchone()
+            if not row:
+                break
+            self._conn.execute('DELETE FROM entries WHERE url = ?', (row[0],))
+            self._remove_file(row[1])
+            self.total_bytes -= row[2]
+            self.evicted += 1
+
+    def _remove_file(self, filename: str):
+        try:
+            os.remove(os.path.join(self.directory, filename))
+        except OSError:
+            pass
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            entries = self._conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+            return {
+                'entries': entries,
+                'total_bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'requests': self.requests,
+                'conditional_requests': self.conditional,
+                'hits': self.hits,
+                'hit_ratio': round(self.hits / self.requests, 3) if self.requests else 0.0,
+                'stored': self.stored,
+                'evicted': self.evicted,
+                'bytes_saved': self.bytes_saved
+            }
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享HTTP客户端：长连接池、持久化Cookie、主机自适应限速
+"""
+
+import atexit
+import os
+import threading
+from http.cookiejar import LWPCookieJar
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from fetch_engine import HostRateLimiter, host_limiter
+from http_cache import CACHE_DIR, HttpCache
+
+# 每个主机的连接池大小
+HOST_POOL_SIZES = {
+    'weixin.sogou.com': 2,
+    'mp.weixin.qq.com': 8,
+}
+DEFAULT_POOL_SIZE = 4
+COOKIE_FILE = 'cookies.txt'
+COOKIE_SAVE_EVERY = 20  # 每20个请求保存一次Cookie
+
+# 流式下载：按块读取，超过上限即停止
+STREAM_CHUNK_BYTES = 64 * 1024
+MAX_RESPONSE_BYTES = 8 * 1024 * 1024
+
+# 被拦截的信号：状态码，跳转到的反爬/验证码页面，或原地返回（状态码200）的验证码页面
+BLOCKED_STATUS = (429, 503)
+BLOCKED_URL_MARKERS = ('antispider', 'wappoc_appmsgcaptcha')
+# 按主机检查的页面文字；文章页正文可能包含这些词，只检查搜索页
+BLOCKED_TEXT_MARKERS = {
+    'weixin.sogou.com': ('验证码', 'VerifyCode'),
+}
+
+
+def is_blocked(response: requests.Response, check_text: bool = True) -> bool:
+    """响应是否为限流、反爬或验证码页面
+
+    check_text 为False时不检查页面文字（流式响应的正文还没有读取）。
+    """
+    if response.status_code in BLOCKED_STATUS:
+        return True
+    if any(marker in response.url for marker in BLOCKED_URL_MARKERS):
+        return True
+    markers = BLOCKED_TEXT_MARKERS.get(HostRateLimiter.host_of(response.url)) if check_text else None
+    return bool(markers) and any(marker in response.text for marker in markers)
+
+
+def _stream_exhausted(response: requests.Response, chunks: Iterator[bytes]) -> bool:
+    """停止读取时正文是否已经读完
+
+    有 Content-Length 时比较线路上已读取的字节数；分块传输时再取一块，取不到即已读完。
+    """
+    total = response.headers.get('Content-Length')
+    if total and total.isdigit():
+        return response.raw.tell() >= int(total)
+    return next(chunks, None) is None
+
+
+class HttpClient:
+    """进程内共享的HTTP客户端
+
+    同一主机的请求复用keep-alive连接，Cookie在请求间保持并持久化到文件，
+    所有请求在发出前先经过主机限速器，响应被拦截时降低该主机速率，正常时逐步提速。
+    """
+
+    def __init__(self, rate_limiter: Optional[HostRateLimiter] = None,
+                 pool_sizes: Optional[Dict[str, int]] = None, cookie_file: Optional[str] = COOKIE_FILE,
+                 cache_dir: Optional[str] = CACHE_DIR):
+        self.rate_limiter = rate_limiter or host_limiter
+        self.cache_dir = cache_dir
+        self.cache = None  # 条件请求缓存，第一次流式下载时创建
+        self.session = requests.Session()
+        self.request_count = 0
+        self.stream_stats = {'responses': 0, 'early_stops': 0, 'capped': 0, 'rejected': 0,
+                             'bytes_read': 0, 'bytes_saved': 0}
+        self._lock = threading.Lock()
+
+        self.session.mount('http://', HTTPAdapter(pool_maxsize=DEFAULT_POOL_SIZE))
+        self.session.mount('https://', HTTPAdapter(pool_maxsize=DEFAULT_POOL_SIZE))
+        for host, size in (HOST_POOL_SIZES if pool_sizes is None else pool_sizes).items():
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size)
+            self.session.mount(f'https://{host}', adapter)
+            self.session.mount(f'http://{host}', adapter)
+
+        self.cookie_file = cookie_file
+        if cookie_file and os.path.exists(cookie_file):
+            jar = LWPCookieJar(cookie_file)
+            try:
+                jar.load(ignore_discard=True)
+                self.session.cookies.update(jar)
+            except Exception as e:
+                print(f"⚠️ 加载Cookie失败: {e}")
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """限速后发送请求，并按响应是否被拦截调整该主机的速率
+
+        每个响应只记录一次结果，调用方用 is_blocked() 判断是否跳过，不再另行记录。
+        """
+        self.rate_limiter.acquire(url)
+        response = self.session.request(method, url, **kwargs)
+
+        if is_blocked(response, check_text=not kwargs.get('stream')):
+            self.rate_limiter.record_blocked(url)
+        elif response.ok:
+            self.rate_limiter.record_success(url)
+
+        with self._lock:
+            self.request_count += 1
+            should_save = self.request_count % COOKIE_SAVE_EVERY == 0
+        if should_save:
+            self.save_cookies()
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def get_streamed(self, url: str, max_bytes: int = MAX_RESPONSE_BYTES,
+                     stop: Optional[Callable[[bytearray], bool]] = None,
+                     **kwargs) -> Tuple[requests.Response, bytes]:
+        """流式GET，返回 (响应, 已读取的正文)
+
+        按块读取正文，读满 max_bytes 或 stop(已读内容) 返回True时停止并关闭连接；
+        非HTML响应不读取正文。提前停止的连接不能复用，但省下了剩余部分的流量和内存。
+        提前停止或截断（还有未读取的正文）时 response.truncated 为True。
+        有缓存的URL发送条件请求，服务器返回304时直接返回缓存的正文。提前停止的正文作为部分条目缓存，
+        只有同样带 stop 的请求会用它发送条件请求；超过大小上限的正文不缓存。
+        """
+        cache = self._get_cache()
+        headers = dict(kwargs.pop('headers', None) or {})
+        if cache:
+            headers.update(cache.conditional_headers(url, allow_partial=stop is not None))
+
+        response = self.get(url, stream=True, headers=headers, **kwargs)
+        if response.status_code == 304 and cache:
+            response.close()
+            cached = cache.load(url)
+            if cached:
+                content, response.encoding, response.truncated = cached
+                return response, content
+            # 缓存条目已被淘汰，重新完整请求
+            headers.pop('If-None-Match', None)
+            headers.pop('If-Modified-Since', None)
+            response = self.get(url, stream=True, headers=headers, **kwargs)
+
+        content_type = response.headers.get('Content-Type', 'text/html')
+        if 'html' not in content_type and 'text' not in content_type:
+            response.close()
+            with self._lock:
+                self.stream_stats['rejected'] += 1
+            raise requests.RequestException(f"不是HTML页面: {content_type}")
+
+        buffer = bytearray()
+        stopped = capped = False
+        try:
+            chunks = response.iter_content(STREAM_CHUNK_BYTES)
+            for chunk in chunks:
+                buffer += chunk
+                if len(buffer) > max_bytes:
+                    del buffer[max_bytes:]
+                    capped = True
+                    break
+                # 在最后一块上停止时正文已经完整读取，不算截断
+                if len(buffer) == max_bytes:
+                    capped = not _stream_exhausted(response, chunks)
+                    break
+                if stop and stop(buffer):
+                    stopped = not _stream_exhausted(response, chunks)
+                    break
+            # 线路上实际读取的字节数（压缩传输时小于正文长度）
+            wire_bytes = response.raw.tell()
+        finally:
+            response.close()
+
+        saved = 0
+        total = response.headers.get('Content-Length')
+        if (stopped or capped) and total and total.isdigit():
+            saved = max(0, int(total) - wire_bytes)
+
+        with self._lock:
+            self.stream_stats['responses'] += 1
+            self.stream_stats['early_stops'] += stopped
+            self.stream_stats['capped'] += capped
+            self.stream_stats['bytes_read'] += wire_bytes
+            self.stream_stats['bytes_saved'] += saved
+        response.truncated = stopped or capped
+        if capped:
+            print(f"⚠️ 页面超过 {max_bytes // 1024} KB，已截断: {url}")
+        elif cache and response.status_code == 200:
+            # 提前停止的前缀已包含停止条件需要的全部内容，标记为部分条目缓存
+            cache.store(url, bytes(buffer), response.headers.get('ETag'),
+                        response.headers.get('Last-Modified'), response.encoding, partial=stopped)
+        return response, bytes(buffer)
+
+    def _get_cache(self) -> Optional[HttpCache]:
+        if self.cache is None and self.cache_dir:
+            with self._lock:
+                if self.cache is None:
+                    self.cache = HttpCache(self.cache_dir)
+        return self.cache
+
+    def save_cookies(self):
+        """保存Cookie到文件"""
+        if not self.cookie_file:
+            return
+        with self._lock:
+            jar = LWPCookieJar(self.cookie_file)
+            for cookie in self.session.cookies:
+                jar.set_cookie(cookie)
+            try:
+                jar.save(ignore_discard=True)
+            except Exception as e:
+                print(f"⚠️ 保存Cookie失败: {e}")
+
+    def get_stats(self) -> Dict:
+        """连接复用统计：每个主机的请求数与新建连接数"""
+        hosts = {}
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                stats = hosts.setdefault(pool.host, {'requests': 0, 'connections': 0})
+                stats['requests'] += pool.num_requests
+                stats['connections'] += pool.num_connections
+
+        for stats in hosts.values():
+            stats['reuse_ratio'] = round(1 - stats['connections'] / stats['requests'], 3) if stats['requests'] else 0.0
+
+        with self._lock:
+            streaming = dict(self.stream_stats)
+        return {'requests': self.request_count, 'hosts': hosts, 'streaming': streaming,
+                'cache': self.cache.get_stats() if self.cache else None}
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """获取进程内共享的HTTP客户端"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+                atexit.register(_client.save_cookies)
+    return _client
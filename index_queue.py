@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+全文索引和相关文章文档频率的变更队列
+
+文章表上的触发器只用内置SQL把每次写入、修改、删除的内容记入 index_queue，
+再由 Database 在同一事务内按顺序处理（切分和计算词频在Python中完成）。
+这样用 sqlite3 命令行或自己的脚本写文章表也不会报 no such function，
+这些连接写入的变更留在队列中，下次打开数据库（启动服务或运行任一 manage.py 命令）时补做。
+
+其他连接需要开启 PRAGMA recursive_triggers（Database 连接池已设置），
+否则 INSERT OR REPLACE 删除旧行时不触发删除触发器，旧内容留在全文索引和统计中，且不会报错；
+已经这样写过时，用 python manage.py rebuild-search（以及 rebuild-stats、rebuild-related）重建。
+"""
+
+import sqlite3
+
+from related_index import add_document_terms, index_article, remove_document_terms
+from search_index import add_to_search_index, remove_from_search_index
+
+INDEX_QUEUE_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS index_queue (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        op TEXT NOT NULL,
+        article_id INTEGER NOT NULL,
+        title TEXT,
+        author TEXT,
+        content TEXT,
+        old_title TEXT,
+        old_author TEXT,
+        old_content TEXT
+    )
+'''
+
+INDEX_QUEUE_TRIGGERS = [
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_index_queue_insert AFTER INSERT ON articles BEGIN
+        INSERT INTO index_queue (op, article_id, title, author, content)
+        VALUES ('insert', NEW.id, NEW.title, NEW.author, NEW.content);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_index_queue_delete AFTER DELETE ON articles BEGIN
+        INSERT INTO index_queue (op, article_id, old_title, old_author, old_content)
+        VALUES ('delete', OLD.id, OLD.title, OLD.author, OLD.content);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_index_queue_update AFTER UPDATE OF title, author, content ON articles
+    WHEN OLD.title IS NOT NEW.title OR OLD.author IS NOT NEW.author OR OLD.content IS NOT NEW.content BEGIN
+        INSERT INTO index_queue (op, article_id, title, author, content, old_title, old_author, old_content)
+        VALUES ('update', NEW.id, NEW.title, NEW.author, NEW.content, OLD.title, OLD.author, OLD.content);
+    END
+    ''',
+]
+
+
+def create_index_queue(cursor: sqlite3.Cursor):
+    """创建变更队列和文章表上的触发器"""
+    cursor.execute(INDEX_QUEUE_TABLE_SQL)
+    for trigger_sql in INDEX_QUEUE_TRIGGERS:
+        cursor.execute(trigger_sql)
+
+
+def process_index_queue(cursor: sqlite3.Cursor, search_index: bool = True) -> int:
+    """按顺序处理队列中的变更（在调用方的事务内执行），返回处理的条数
+
+    先按记录的新旧内容更新全文索引和文档频率，再为新写入或内容变化、且仍然存在的文章
+    重新计算向量和近邻。search_index 为 False 时跳过全文索引（不支持FTS5或随后会全量重建）。
+    """
+    cursor.execute('''
+        SELECT id, op, article_id, title, author, content, old_title, old_author, old_content
+        FROM index_queue ORDER BY id
+    ''')
+    rows = cursor.fetchall()
+    if not rows:
+        return 0
+
+    changed = {}
+    for _, op, article_id, title, author, content, old_title, old_author, old_content in rows:
+        terms_changed = op != 'update' or title != old_title or content != old_content
+        if op != 'insert':
+            if search_index:
+                remove_from_search_index(cursor, article_id, old_title, old_author, old_content)
+            if terms_changed:
+                remove_document_terms(cursor, old_title, old_content, removed_document=op == 'delete')
+        if op != 'delete':
+            if search_index:
+                add_to_search_index(cursor, article_id, title, author, content)
+            if terms_changed:
+                add_document_terms(cursor, title, content, new_document=op == 'insert')
+            changed[article_id] = True
+
+    for article_id in changed:
+        cursor.execute('SELECT title, content FROM articles WHERE id = ?', (article_id,))
+        row = cursor.fetchone()
+        if row:
+            index_article(cursor, article_id, row[0], row[1], new_document=False)
+
+    cursor.execute('DELETE FROM index_queue WHERE id <= ?', (rows[-1][0],))
+    return len(rows)
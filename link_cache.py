@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+搜狗跳转链接解析缓存（SQLite持久化，TTL + 容量淘汰）
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600   # 解析结果保留30天
+DEFAULT_MAX_ENTRIES = 50000            # 超过后按最近使用时间淘汰
+EVICT_EVERY = 200                      # 每写入200条检查一次过期和容量
+
+LINK_CACHE_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS sogou_link_cache (
+        link_key TEXT PRIMARY KEY,
+        article_url TEXT NOT NULL,
+        resolved_at REAL NOT NULL,
+        last_used_at REAL NOT NULL,
+        hits INTEGER NOT NULL DEFAULT 0
+    )
+'''
+LINK_CACHE_INDEX_SQL = '''
+    CREATE INDEX IF NOT EXISTS idx_sogou_link_cache_last_used ON sogou_link_cache (last_used_at)
+'''
+
+
+class LinkResolveCache:
+    """搜狗 /link?url=... 到微信文章URL的解析缓存
+
+    以链接中的 url 参数（解码后）为键，搜狗给同一篇文章生成的链接在该参数上保持不变，
+    其余参数（k、h、token等）每次刷新都会变化，不参与缓存键。
+    只缓存成功解析到文章的结果，触发反爬或跳转到非文章页面的结果不缓存。
+    """
+
+    def __init__(self, db, ttl_seconds: int = DEFAULT_TTL_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.db = db
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self.resolved = 0
+        self.resolve_seconds = 0.0   # 实际发生的解析请求耗时（含限速等待）
+        self._lock = threading.Lock()
+
+        conn = self.db.pool.acquire()
+        try:
+            conn.execute(LINK_CACHE_TABLE_SQL)
+            conn.execute(LINK_CACHE_INDEX_SQL)
+            conn.commit()
+        finally:
+            self.db.pool.release(conn)
+
+    def get(self, link_key: str) -> Optional[str]:
+        """查询解析结果，未命中或已过期返回None"""
+        now = time.time()
+        conn = self.db.pool.acquire()
+        try:
+            row = conn.execute(
+                'SELECT article_url, resolved_at FROM sogou_link_cache WHERE link_key = ?', (link_key,)
+            ).fetchone()
+
+            if row and now - row[1] <= self.ttl_seconds:
+                conn.execute(
+                    'UPDATE sogou_link_cache SET last_used_at = ?, hits = hits + 1 WHERE link_key = ?',
+                    (now, link_key)
+                )
+                conn.commit()
+                with self._lock:
+                    self.hits += 1
+                return row[0]
+
+            with self._lock:
+                self.misses += 1
+                if row:
+                    self.expired += 1
+            return None
+        finally:
+            self.db.pool.release(conn)
+
+    def put(self, link_key: str, article_url: str, elapsed: float = 0.0):
+        """记录一次网络解析的结果和耗时"""
+        now = time.time()
+        with self._lock:
+            self.resolved += 1
+            self.resolve_seconds += elapsed
+            should_evict = self.resolved % EVICT_EVERY == 0
+
+        conn = self.db.pool.acquire()
+        try:
+            conn.execute('''
+                INSERT INTO sogou_link_cache (link_key, article_url, resolved_at, last_used_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (link_key) DO UPDATE SET
+                    article_url = excluded.article_url,
+                    resolved_at = excluded.resolved_at,
+                    last_used_at = excluded.last_used_at
+            ''', (link_key, article_url, now, now))
+            if should_evict:
+                self._evict(conn, now)
+            conn.commit()
+        finally:
+            self.db.pool.release(conn)
+
+    def _evict(self, conn, now: float):
+        """删除过期条目，超出容量时淘汰最久未使用的条目"""
+        removed = conn.execute(
+            'DELETE FROM sogou_link_cache WHERE resolved_at < ?', (now - self.ttl_seconds,)
+        ).rowcount
+
+        overflow = conn.execute('SELECT COUNT(*) FROM sogou_link_cache').fetchone()[0] - self.max_entries
+        if overflow > 0:
+            removed += conn.execute('''
+                DELETE FROM sogou_link_cache WHERE link_key IN (
+                    SELECT link_key FROM sogou_link_cache ORDER BY last_used_at LIMIT ?
+                )
+            ''', (overflow,)).rowcount
+
+        with self._lock:
+            self.evicted += removed
+
+    def get_stats(self) -> Dict:
+        """命中统计；节省的耗时按未命中时的平均解析耗时估算"""
+        conn = self.db.pool.acquire()
+        try:
+            entries = conn.execute('SELECT COUNT(*) FROM sogou_link_cache').fetchone()[0]
+        finally:
+            self.db.pool.release(conn)
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            avg_resolve = self.resolve_seconds / self.resolved if self.resolved else 0.0
+            return {
+                'entries': entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'expired': self.expired,
+                'evicted': self.evicted,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0,
+                'avg_resolve_seconds': round(avg_resolve, 2),
+                'saved_requests': self.hits,
+                'saved_seconds': round(self.hits * avg_resolve, 1)
+            }
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+维护命令
+
+用法:
+    python manage.py rebuild-stats      # 校验并重算统计计数
+    python manage.py rebuild-search     # 重建全文索引
+    python manage.py rebuild-related    # 重算相关文章索引
+    python manage.py reextract          # 用归档的原始响应重新提取正文并重新生成HTML（不访问网络）
+    python manage.py rebuild            # 重新生成有变化的静态HTML页面（模板或推荐变化后）
+"""
+
+import argparse
+import itertools
+import time
+from database import Database
+from parse_pool import ParsePool
+from response_archive import ARCHIVE_DIR, ResponseArchive
+from scraper import WeChatScraper
+from site_builder import SiteBuilder
+
+REEXTRACT_BATCH = 200  # 每批解析并写入的页面数
+
+
+def rebuild_stats(db: Database, args):
+    """校验并重算统计计数"""
+    print("🔍 重算统计计数...")
+    drift = db.rebuild_stats()
+
+    if not drift:
+        print("✅ 统计计数一致")
+        return
+
+    print(f"⚠️ 发现 {len(drift)} 项不一致，已修正:")
+    for name in sorted(drift):
+        print(f"  {name}: {drift[name]['before']} -> {drift[name]['after']}")
+
+
+def rebuild_search(db: Database, args):
+    """重建全文索引"""
+    print("🔍 重建全文索引...")
+    count = db.rebuild_search_index()
+    print(f"✅ 已索引 {count} 篇文章")
+
+
+def rebuild_related(db: Database, args):
+    """重算相关文章索引"""
+    print("🔍 重算相关文章索引...")
+    started = time.perf_counter()
+    count = db.rebuild_related_index()
+    print(f"✅ 已索引 {count} 篇文章，耗时 {time.perf_counter() - started:.1f} 秒")
+
+
+def reextract(db: Database, args):
+    """用归档的原始响应重新提取正文，更新文章并重新生成HTML"""
+    archive = ResponseArchive(args.archive)
+    pool = ParsePool(args.workers)
+    scraper = WeChatScraper(parse_pool=pool, archive=archive)
+    print(f"🔍 重新提取归档页面（解析进程 {args.workers}）...")
+
+    scanned = updated = truncated = 0
+    started = time.perf_counter()
+    try:
+        entries = archive.iter_latest()
+        while True:
+            batch = list(itertools.islice(entries, REEXTRACT_BATCH))
+            if not batch:
+                break
+
+            parsed = pool.map((entry['content'], entry['encoding']) for entry in batch)
+            extracted = [dict(article, canonical_key=entry['canonical_key'])
+                         for entry, article in zip(batch, parsed)]
+            changed = db.update_extracted_articles(extracted)
+
+            for article in changed:
+                if article['html_file']:
+                    scraper.save_html(article, article['html_file'], db, article['url_number'])
+
+            scanned += len(batch)
+            updated += len(changed)
+            truncated += sum(entry['truncated'] for entry in batch)
+            print(f"  已处理 {scanned} 页，更新 {updated} 篇")
+    finally:
+        pool.shutdown()
+        archive.close()
+
+    elapsed = time.perf_counter() - started
+    rate = scanned / elapsed if elapsed else 0.0
+    print(f"✅ 重新提取完成: {scanned} 页，{updated} 篇有变化，{rate:.1f} 页/秒")
+    if truncated:
+        print(f"⚠️ 其中 {truncated} 页是提前停止下载的部分页面（正文区之后的内容未归档），"
+              f"依赖页面后半部分的提取规则对它们无效")
+
+
+def rebuild(db: Database, args):
+    """重新生成静态HTML页面，跳过输入未变化的页面"""
+    print(f"🔍 重建静态页面（渲染进程 {args.workers}{'，全部重新生成' if args.force else ''}）...")
+    stats = SiteBuilder(db, workers=args.workers, output_dir=args.output, force=args.force).rebuild()
+    print(f"✅ 重建完成: 检查 {stats['scanned']} 页，生成 {stats['rendered']}，跳过 {stats['skipped']}，"
+          f"写入 {stats['bytes'] / 1024 / 1024:.1f} MB，耗时 {stats['seconds']} 秒，"
+          f"{stats['pages_per_second']} 页/秒（生成 {stats['rendered_per_second']} 页/秒）")
+
+
+COMMANDS = {
+    'rebuild-stats': rebuild_stats,
+    'rebuild-search': rebuild_search,
+    'rebuild-related': rebuild_related,
+    'reextract': reextract,
+    'rebuild': rebuild,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='维护命令',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='其他连接写入文章表的变更由触发器记入 index_queue，运行任一命令打开数据库时补做全文索引和相关文章索引。\n'
+               'rebuild-search: 其他连接未开启 PRAGMA recursive_triggers 时覆盖写入的旧内容会留在索引中，\n'
+               '  用本命令重建索引，并用 rebuild-stats、rebuild-related 校正统计和相关文章索引。'
+    )
+    parser.add_argument('command', choices=sorted(COMMANDS))
+    parser.add_argument('--db', default='articles.db', help='数据库文件路径')
+    parser.add_argument('--archive', default=ARCHIVE_DIR, help='原始响应归档目录（reextract）')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='解析/渲染进程数，0表示在主进程执行（reextract、rebuild）')
+    parser.add_argument('--output', default='.', help='HTML文件所在目录（rebuild）')
+    parser.add_argument('--force', action='store_true', help='忽略输入指纹，全部重新生成（rebuild）')
+    args = parser.parse_args()
+
+    db = Database(args.db)
+    try:
+        COMMANDS[args.command](db, args)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+渲染页面的进程内LRU缓存
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class PageCache:
+    """按字节数限制容量的LRU缓存
+
+    每个条目附带一个版本标记（如文章的html_file与scrape_time），
+    读取时版本不一致即视为失效，这样其他进程重新采集文章后也能及时刷新。
+    设置 ttl_seconds 后条目到期也视为失效（按需渲染的页面借此刷新推荐阅读）。
+    条目大小按 len() 计算，除bytes外也可以缓存 PageVariants 等实现了 __len__ 的对象；
+    带 on_grow 属性的对象（PageVariants）之后按需生成压缩副本时通过它通知缓存重新计算大小。
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: Optional[float] = None):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.renders = 0
+        self.coalesced = 0
+        self._entries = OrderedDict()
+        self._inflight = {}  # (key, version) -> Future，同一页面同时未命中时只渲染一次
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: Any = None) -> Optional[bytes]:
+        """读取缓存，版本不匹配时返回None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] != version or self._is_expired(entry):
+                if entry is not None:
+                    self.expired += entry[1] == version
+                    self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, content: bytes, version: Any = None):
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        size = len(content)
+        if size > self.max_bytes:
+            return
+        if hasattr(content, 'on_grow'):
+            content.on_grow = lambda: self._update_size(key, content)
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (content, version, time.monotonic(), size)
+            self.current_bytes += size
+            self._evict()
+
+    def _update_size(self, key: Hashable, content: Any):
+        """条目内容变大后重新计算大小，超出容量时淘汰"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] is not content:
+                return
+            size = len(content)
+            self.current_bytes += size - entry[3]
+            self._entries[key] = entry[:3] + (size,)
+            self._evict()
+
+    def get_or_render(self, key: Hashable, version: Any, render: Callable[[], Optional[bytes]]) -> Optional[bytes]:
+        """读取缓存，未命中时调用 render 生成并写入
+
+        多个线程同时请求同一个未缓存的页面时，只有第一个线程执行 render，
+        其余线程等待并共用它的结果（或异常）。render 返回None表示页面不存在，不缓存。
+        """
+        content = self.get(key, version)
+        if content is not None:
+            return content
+
+        with self._lock:
+            # 上一个渲染线程可能在本次未命中之后刚写入缓存
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == version and not self._is_expired(entry):
+                self._entries.move_to_end(key)
+                self.misses -= 1
+                self.hits += 1
+                return entry[0]
+
+            flight = self._inflight.get((key, version))
+            leader = flight is None
+            if leader:
+                flight = self._inflight[(key, version)] = Future()
+                self.renders += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return flight.result()
+
+        try:
+            content = render()
+            if content is not None:
+                self.put(key, content, version)
+            flight.set_result(content)
+            return content
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[(key, version)]
+
+    def invalidate(self, key: Hashable):
+        """删除指定条目"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def _evict(self):
+        """超出容量时淘汰最久未使用的条目（调用方持有锁）"""
+        while self.current_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def _is_expired(self, entry) -> bool:
+        return self.ttl_seconds is not None and time.monotonic() - entry[2] > self.ttl_seconds
+
+    def _remove(self, key: Hashable):
+        self.current_bytes -= self._entries.pop(key)[3]
+
+    def get_stats(self) -> Dict:
+        """获取缓存统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'expired': self.expired,
+                'renders': self.renders,
+                'coalesced': self.coalesced,
+                'hit_ratio': self.hits / total if total else 0.0
+            }
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+解析进程池：把HTML解析和文本清理放到独立进程，绕开GIL
+"""
+
+import itertools
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from extractor import parse_page
+
+DEFAULT_PARSE_WORKERS = 0   # 0表示在调用线程内解析，不启动进程池
+PENDING_PER_WORKER = 2      # 每个解析进程最多排队的页面数，超出时提交方阻塞
+
+
+class _Executor:
+    """一代进程池及其在途配额，resize 后仍在使用它的调用结束时才关闭"""
+
+    def __init__(self, workers: int):
+        self.limit = workers * PENDING_PER_WORKER
+        # 用spawn启动，避免在多线程进程中fork
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        self.slots = threading.BoundedSemaphore(self.limit)
+        self.users = 0
+        self.retired = False
+
+
+class ParsePool:
+    """可选的解析进程池
+
+    workers 为0时直接在调用线程解析；大于0时交给进程池，同时在途的页面数
+    不超过 workers * PENDING_PER_WORKER，抓取线程提交时会被阻塞（背压），
+    避免下载速度快于解析时原始页面在内存中堆积。
+    """
+
+    def __init__(self, workers: int = DEFAULT_PARSE_WORKERS):
+        self.workers = 0
+        self.current = None
+        self.parsed_count = 0
+        self._lock = threading.Lock()
+        self.resize(workers)
+
+    def resize(self, workers: int):
+        """调整解析进程数，正在使用旧进程池的 parse/map 结束后旧进程池才关闭"""
+        with self._lock:
+            old = self.current
+            self.workers = max(0, workers)
+            self.current = _Executor(self.workers) if self.workers else None
+            if old:
+                old.retired = True
+                if old.users:
+                    old = None  # 由最后一个使用者关闭
+        if old:
+            old.executor.shutdown(wait=False)
+
+    def _checkout(self) -> Optional[_Executor]:
+        with self._lock:
+            current = self.current
+            if current:
+                current.users += 1
+            return current
+
+    def _checkin(self, current: _Executor):
+        with self._lock:
+            current.users -= 1
+            close = current.retired and not current.users
+        if close:
+            current.executor.shutdown(wait=False)
+
+    def _count(self):
+        with self._lock:
+            self.parsed_count += 1
+
+    def parse(self, content: bytes, encoding: Optional[str] = None) -> Dict[str, str]:
+        """解析一个页面，返回 extract_article 的结果和 permanent_link"""
+        current = self._checkout()
+        if current is None:
+            result = parse_page(content, encoding)
+        else:
+            try:
+                with current.slots:
+                    result = current.executor.submit(parse_page, content, encoding).result()
+            finally:
+                self._checkin(current)
+        self._count()
+        return result
+
+    def map(self, pages: Iterable[Tuple[bytes, Optional[str]]]) -> Iterator[Dict[str, str]]:
+        """按输入顺序批量解析 (content, encoding)，最多 workers * PENDING_PER_WORKER 个在途"""
+        current = self._checkout()
+        if current is None:
+            for content, encoding in pages:
+                yield self.parse(content, encoding)
+            return
+
+        try:
+            window = deque()
+            pages = iter(pages)
+            while True:
+                for content, encoding in itertools.islice(pages, current.limit - len(window)):
+                    window.append(current.executor.submit(parse_page, content, encoding))
+                if not window:
+                    break
+                result = window.popleft().result()
+                self._count()
+                yield result
+        finally:
+            self._checkin(current)
+
+    def shutdown(self):
+        self.resize(0)
+
+    def get_stats(self) -> Dict:
+        return {'workers': self.workers, 'parsed': self.parsed_count}
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_parse_pool() -> ParsePool:
+    """获取进程内共享的解析池"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ParsePool()
+    return _pool
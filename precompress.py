@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+预压缩页面：发布时在页面旁写出压缩副本，请求时按 Accept-Encoding 选择
+
+标准库的 lzma、bz2 不是浏览器支持的 Content-Encoding，因此只使用 gzip；
+安装了 brotli 时额外生成 .br 副本，压缩率比 gzip 更高。
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 发布时只压缩一次，使用最高压缩率
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+# 请求时现场压缩的页面使用中等压缩率，brotli 11 比 5 慢数十倍而体积相差不大
+ONDEMAND_GZIP_LEVEL = 6
+ONDEMAND_BROTLI_QUALITY = 5
+
+# (Content-Encoding, 文件后缀)，按优先级排列
+ENCODINGS = ([('br', '.br')] if brotli else []) + [('gzip', '.gz')]
+ALL_SUFFIXES = ('.br', '.gz')
+
+
+def compress(data: bytes, encoding: str, ondemand: bool = False) -> bytes:
+    """压缩页面，ondemand=True 时使用请求时压缩的中等压缩率"""
+    if encoding == 'gzip':
+        # mtime固定为0，相同内容的压缩结果相同
+        return gzip.compress(data, ONDEMAND_GZIP_LEVEL if ondemand else GZIP_LEVEL, mtime=0)
+    if encoding == 'br':
+        return brotli.compress(data, quality=ONDEMAND_BROTLI_QUALITY if ondemand else BROTLI_QUALITY)
+    raise ValueError(f"不支持的压缩格式: {encoding}")
+
+
+def write_atomic(path: str, data: bytes):
+    """写入临时文件后重命名，替换是原子的
+
+    临时文件名带进程号和线程号，多个进程或线程同时写同一路径时各写各的临时文件。
+    """
+    tmp_path = f'{path}.tmp-{os.getpid()}-{threading.get_ident()}'
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_page(path: str, data: bytes, encodings=ENCODINGS) -> int:
+    """写出页面及 encodings 中各格式的压缩副本，返回写入的总字节数
+
+    先写页面再写副本，副本比页面旧时读取方不会使用它；
+    不在 encodings 中（或当前环境不支持）的格式的旧副本会被删除，避免返回过期内容。
+    """
+    write_atomic(path, data)
+    written = len(data)
+    for encoding, suffix in encodings:
+        body = compress(data, encoding)
+        write_atomic(path + suffix, body)
+        written += len(body)
+
+    available = {suffix for _, suffix in encodings}
+    for suffix in ALL_SUFFIXES:
+        if suffix not in available and os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    return written
+
+
+def _parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    qualities = {}
+    for item in (header or '').split(','):
+        name, _, params = item.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name] = quality
+    return qualities
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        # If-None-Match 使用弱比较，忽略 W/ 前缀
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class PageVariants:
+    """一个页面的原文和各压缩副本
+
+    ETag 由原文的哈希生成，不同编码的副本在其后加编码名，满足强校验的要求。
+    磁盘上没有的副本在第一次被协商选中时才以中等压缩率生成，只压缩客户端实际需要的编码。
+    缓存容量按已有副本的总字节数计算（len()），生成新副本后调用 on_grow（由 PageCache 设置）。
+    """
+
+    def __init__(self, bodies: Dict[str, bytes], digest: Optional[str] = None):
+        self.bodies = bodies
+        self.on_grow = None
+        self.digest = digest or hashlib.sha256(bodies['identity']).hexdigest()[:20]
+
+    @classmethod
+    def from_content(cls, data: bytes) -> 'PageVariants':
+        """从页面原文创建，压缩副本按需生成"""
+        return cls({'identity': data})
+
+    @classmethod
+    def load(cls, path: str) -> 'PageVariants':
+        """读取页面和磁盘上的压缩副本，缺少或过期的副本按需生成"""
+        with open(path, 'rb') as f:
+            data = f.read()
+        page_mtime = os.path.getmtime(path)
+
+        bodies = {'identity': data}
+        for encoding, suffix in ENCODINGS:
+            variant = path + suffix
+            try:
+                if os.path.getmtime(variant) >= page_mtime:
+                    with open(variant, 'rb') as f:
+                        bodies[encoding] = f.read()
+                    continue
+            except OSError:
+                pass
+        return cls(bodies)
+
+    def __len__(self) -> int:
+        return sum(len(body) for body in self.bodies.values())
+
+    def body(self, encoding: str) -> bytes:
+        """指定编码的正文，没有时现场压缩并保留"""
+        body = self.bodies.get(encoding)
+        if body is None:
+            # 并发请求可能重复压缩同一编码，结果相同，不加锁
+            body = self.bodies[encoding] = compress(self.bodies['identity'], encoding, ondemand=True)
+            if self.on_grow:
+                self.on_grow()
+        return body
+
+    def etag(self, encoding: str) -> str:
+        return f'"{self.digest}"' if encoding == 'identity' else f'"{self.digest}-{encoding}"'
+
+    def negotiate(self, accept_encoding: Optional[str]) -> str:
+        """按 Accept-Encoding 选择编码，质量值相同时优先压缩率高的，都不接受时返回原文"""
+        qualities = _parse_accept_encoding(accept_encoding)
+        best, best_quality = 'identity', 0.0
+        for encoding, _ in ENCODINGS:
+            quality = qualities.get(encoding, qualities.get('*', 0.0))
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def respond(self, accept_encoding: Optional[str],
+                if_none_match: Optional[str]) -> Tuple[int, bytes, Iterable[Tuple[str, str]]]:
+        """返回 (状态码, 正文, 响应头)，If-None-Match 匹配时返回304"""
+        encoding = self.negotiate(accept_encoding)
+        etag = self.etag(encoding)
+        headers = [('ETag', etag), ('Vary', 'Accept-Encoding'), ('Cache-Control', 'no-cache')]
+        if _etag_matches(if_none_match, etag):
+            return 304, b'', headers
+
+        body = self.body(encoding)
+        headers.append(('Content-Type', 'text/html; charset=utf-8'))
+        headers.append(('Content-Length', str(len(body))))
+        if encoding != 'identity':
+            headers.append(('Content-Encoding', encoding))
+        return 200, body, headers
+
+
+def page_response(variants: PageVariants):
+    """按当前请求的 Accept-Encoding 和 If-None-Match 生成 Flask 响应（采集应用和管理应用共用）"""
+    from flask import Response, request
+    status, body, headers = variants.respond(request.headers.get('Accept-Encoding'),
+                                             request.headers.get('If-None-Match'))
+    return Response(body, status=status, headers=headers)
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+相关文章索引：TF-IDF稀疏向量 + 倒排表 + 预计算的近邻表
+
+每篇文章把标题和正文按全文检索相同的规则切分（中文相邻两字、英文按单词），
+按 TF-IDF 权重只保留前 VECTOR_TERMS 个词并归一化，写入倒排表 related_terms。
+新文章写入时通过倒排表找出共享关键词的文章，在SQL中累加得到余弦相似度，
+记录它最相似的 TOP_K 篇文章，并把它插入这些文章的近邻表（比原有近邻更相似时）。
+展示推荐阅读只需按 article_id 读取 related_articles。
+
+IDF 使用写入时的文档频率，文章增多后早期文章的权重会有偏差，
+可用 manage.py rebuild-related 全量重算。装有 NumPy 时权重计算和选词向量化执行。
+文章删除、覆盖写入或重新提取时按 index_queue 记下的旧内容扣减文档频率（remove_document_terms）。
+"""
+
+import heapq
+import math
+import sqlite3
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+from search_index import tokenize
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+VECTOR_TERMS = 32           # 每篇文章保留的关键词数
+TOP_K = 15                  # 每篇文章保存的相关文章数
+TITLE_WEIGHT = 3            # 标题中的词按出现3次计
+MAX_CONTENT_CHARS = 5000    # 正文只取开头部分
+MAX_DF_RATIO = 0.2          # 超过20%的文章都包含的词不用来查找候选
+MIN_DF_DOCS = 50            # 文章数较少时不按比例过滤
+MIN_SCORE = 0.01
+DOC_COUNT_TERM = ''         # related_df 中记录已索引文章总数的行
+REBUILD_BATCH = 500
+
+RELATED_TABLES = [
+    '''
+    CREATE TABLE IF NOT EXISTS related_df (
+        term TEXT PRIMARY KEY,
+        df INTEGER NOT NULL
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS related_terms (
+        term TEXT NOT NULL,
+        article_id INTEGER NOT NULL,
+        weight REAL NOT NULL,
+        PRIMARY KEY (term, article_id)
+    ) WITHOUT ROWID
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_related_terms_article ON related_terms (article_id)',
+    '''
+    CREATE TABLE IF NOT EXISTS related_articles (
+        article_id INTEGER NOT NULL,
+        related_id INTEGER NOT NULL,
+        score REAL NOT NULL,
+        PRIMARY KEY (article_id, related_id)
+    ) WITHOUT ROWID
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_related_articles_related ON related_articles (related_id)',
+]
+
+RELATED_TRIGGERS = [
+    # 文章被删除（包括 INSERT OR REPLACE 覆盖）时清理它的向量和近邻关系
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_related_articles_delete AFTER DELETE ON articles BEGIN
+        DELETE FROM related_terms WHERE article_id = OLD.id;
+        DELETE FROM related_articles WHERE article_id = OLD.id;
+        DELETE FROM related_articles WHERE related_id = OLD.id;
+    END
+    ''',
+]
+
+# 旧版本调用 related_term_list() 维护文档频率的触发器，用其他连接写文章表时会报 no such function
+LEGACY_TRIGGERS = ['trg_related_df_delete', 'trg_related_df_update']
+
+DF_INCREMENT_SQL = '''
+    INSERT INTO related_df (term, df) VALUES (?, 1)
+    ON CONFLICT (term) DO UPDATE SET df = df + 1
+'''
+DF_DECREMENT_SQL = 'UPDATE related_df SET df = MAX(df - 1, 0) WHERE term = ?'
+
+
+def create_related_index(cursor: sqlite3.Cursor):
+    """创建相关文章索引的表和触发器（删除旧版本的触发器）"""
+    for sql in RELATED_TABLES + RELATED_TRIGGERS:
+        cursor.execute(sql)
+    for name in LEGACY_TRIGGERS:
+        cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+
+
+def term_counts(title: str, content: str) -> Counter:
+    """标题和正文的词频"""
+    counts = Counter(tokenize(content[:MAX_CONTENT_CHARS])) if content else Counter()
+    for term in tokenize(title or ''):
+        counts[term] += TITLE_WEIGHT
+    return counts
+
+
+def add_document_terms(cursor: sqlite3.Cursor, title, content, new_document: bool = True):
+    """累加文章的词的文档频率，新文章同时累加文档总数"""
+    terms = list(term_counts(title, content))
+    if new_document:
+        terms.insert(0, DOC_COUNT_TERM)
+    cursor.executemany(DF_INCREMENT_SQL, [(term,) for term in terms])
+
+
+def remove_document_terms(cursor: sqlite3.Cursor, title, content, removed_document: bool = True):
+    """按文章的旧内容扣减文档频率，降到0的词删除；文章被删除时同时扣减文档总数"""
+    terms = [(term,) for term in term_counts(title, content)]
+    cursor.executemany(DF_DECREMENT_SQL, terms)
+    cursor.executemany('DELETE FROM related_df WHERE term = ? AND df = 0', terms)
+    if removed_document:
+        cursor.execute(DF_DECREMENT_SQL, (DOC_COUNT_TERM,))
+
+
+def build_vector(counts: Counter, df: Dict[str, int], total_docs: int) -> Dict[str, float]:
+    """按 (1 + log tf) * idf 取权重最高的 VECTOR_TERMS 个词，L2归一化"""
+    if not counts:
+        return {}
+    terms = list(counts)
+
+    if np is not None:
+        tf = np.fromiter((counts[term] for term in terms), dtype=np.float64, count=len(terms))
+        doc_freq = np.fromiter((df.get(term, 1) for term in terms), dtype=np.float64, count=len(terms))
+        weights = (1 + np.log(tf)) * (np.log((total_docs + 1) / (doc_freq + 1)) + 1)
+        if len(terms) > VECTOR_TERMS:
+            top = np.argpartition(-weights, VECTOR_TERMS)[:VECTOR_TERMS]
+        else:
+            top = np.arange(len(terms))
+        norm = float(np.sqrt(np.sum(weights[top] ** 2)))
+        return {terms[i]: float(weights[i]) / norm for i in top} if norm else {}
+
+    weights = {
+        term: (1 + math.log(counts[term])) * (math.log((total_docs + 1) / (df.get(term, 1) + 1)) + 1)
+        for term in terms
+    }
+    top = heapq.nlargest(VECTOR_TERMS, weights.items(), key=lambda item: item[1])
+    norm = math.sqrt(sum(weight * weight for _, weight in top))
+    return {term: weight / norm for term, weight in top} if norm else {}
+
+
+def _fetch_df(cursor: sqlite3.Cursor, terms: Iterable[str]) -> Dict[str, int]:
+    terms = list(terms)
+    df = {}
+    for start in range(0, len(terms), 500):
+        chunk = terms[start:start + 500]
+        cursor.execute(f'''
+            SELECT term, df FROM related_df WHERE term IN ({','.join('?' * len(chunk))})
+        ''', chunk)
+        df.update(cursor.fetchall())
+    return df
+
+
+def _doc_count(cursor: sqlite3.Cursor) -> int:
+    row = cursor.execute('SELECT df FROM related_df WHERE term = ?', (DOC_COUNT_TERM,)).fetchone()
+    return row[0] if row else 0
+
+
+def _store_vector(cursor: sqlite3.Cursor, article_id: int, vector: Dict[str, float]):
+    cursor.execute('DELETE FROM related_terms WHERE article_id = ?', (article_id,))
+    cursor.executemany(
+        'INSERT INTO related_terms (term, article_id, weight) VALUES (?, ?, ?)',
+        ((term, article_id, weight) for term, weight in vector.items())
+    )
+
+
+def find_similar(cursor: sqlite3.Cursor, article_id: int, vector: Dict[str, float],
+                 df: Dict[str, int], total_docs: int, limit: int = TOP_K) -> List[Tuple[int, float]]:
+    """通过倒排表查找与向量最相似的文章，返回 [(文章id, 相似度)]"""
+    max_df = total_docs * MAX_DF_RATIO if total_docs >= MIN_DF_DOCS else None
+    query = [(term, weight) for term, weight in vector.items()
+             if max_df is None or df.get(term, 0) <= max_df]
+    if not query:
+        return []
+
+    # 查询向量作为临时表与倒排表连接，打分在SQLite内完成
+    cursor.execute(f'''
+        WITH q (term, weight) AS (VALUES {','.join(['(?, ?)'] * len(query))})
+        SELECT t.article_id, SUM(t.weight * q.weight) AS score
+        FROM q JOIN related_terms t ON t.term = q.term
+        WHERE t.article_id != ?
+        GROUP BY t.article_id
+        HAVING score >= ?
+        ORDER BY score DESC
+        LIMIT ?
+    ''', [value for pair in query for value in pair] + [article_id, MIN_SCORE, limit])
+    return cursor.fetchall()
+
+
+def _store_neighbors(cursor: sqlite3.Cursor, article_id: int, neighbors: List[Tuple[int, float]]):
+    cursor.execute('DELETE FROM related_articles WHERE article_id = ?', (article_id,))
+    cursor.executemany(
+        'INSERT INTO related_articles (article_id, related_id, score) VALUES (?, ?, ?)',
+        ((article_id, related_id, score) for related_id, score in neighbors)
+    )
+
+
+def index_article(cursor: sqlite3.Cursor, article_id: int, title: str, content: str, new_document: bool = True):
+    """索引一篇文章并更新近邻表（在调用方的事务内执行）
+
+    重新提取已有文章时传入 new_document=False，不重复累加文档频率。
+    """
+    counts = term_counts(title, content)
+    if new_document:
+        cursor.executemany(DF_INCREMENT_SQL, [(DOC_COUNT_TERM,)] + [(term,) for term in counts])
+    df = _fetch_df(cursor, counts)
+    total_docs = _doc_count(cursor)
+
+    vector = build_vector(counts, df, total_docs)
+    _store_vector(cursor, article_id, vector)
+    neighbors = find_similar(cursor, article_id, vector, df, total_docs)
+    _store_neighbors(cursor, article_id, neighbors)
+
+    # 新文章进入相似文章的近邻表，超出 TOP_K 的淘汰相似度最低的
+    for related_id, score in neighbors:
+        cursor.execute('''
+            INSERT OR REPLACE INTO related_articles (article_id, related_id, score) VALUES (?, ?, ?)
+        ''', (related_id, article_id, score))
+        cursor.execute('''
+            DELETE FROM related_articles WHERE article_id = ? AND related_id NOT IN (
+                SELECT related_id FROM related_articles WHERE article_id = ? ORDER BY score DESC LIMIT ?
+            )
+        ''', (related_id, related_id, TOP_K))
+
+
+def _iter_articles(conn: sqlite3.Connection):
+    cursor = conn.execute('SELECT id, title, content FROM articles ORDER BY id')
+    while True:
+        rows = cursor.fetchmany(REBUILD_BATCH)
+        if not rows:
+            break
+        yield from rows
+
+
+def rebuild_related_index(conn: sqlite3.Connection) -> int:
+    """按当前全部文章重新计算文档频率、向量和近邻表，返回索引的文章数"""
+    cursor = conn.cursor()
+    for table in ('related_df', 'related_terms', 'related_articles'):
+        cursor.execute(f'DELETE FROM {table}')
+
+    # 第一遍：文档频率
+    df = Counter()
+    total_docs = 0
+    for _, title, content in _iter_articles(conn):
+        df.update(term_counts(title, content).keys())
+        total_docs += 1
+    df[DOC_COUNT_TERM] = total_docs
+    cursor.executemany('INSERT INTO related_df (term, df) VALUES (?, ?)', df.items())
+
+    # 第二遍：向量写入倒排表
+    for article_id, title, content in _iter_articles(conn):
+        _store_vector(cursor, article_id, build_vector(term_counts(title, content), df, total_docs))
+
+    # 第三遍：每篇文章的近邻
+    for (article_id,) in conn.execute('SELECT id FROM articles ORDER BY id').fetchall():
+        vector = dict(cursor.execute(
+            'SELECT term, weight FROM related_terms WHERE article_id = ?', (article_id,)
+        ).fetchall())
+        _store_neighbors(cursor, article_id, find_similar(cursor, article_id, vector, df, total_docs))
+    return total_docs
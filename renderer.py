@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文章页面渲染：样式表作为带版本号的静态资源单独提供，页面只引用它
+"""
+
+import hashlib
+import os
+import types
+from typing import Dict, List, Optional
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+with open(os.path.join(STATIC_DIR, 'article.css'), 'rb') as _f:
+    STYLESHEET = _f.read()
+
+# 文件名带内容哈希，样式变化时地址随之变化，浏览器可以长期缓存
+STYLESHEET_VERSION = hashlib.sha256(STYLESHEET).hexdigest()[:12]
+STYLESHEET_URL = f'/assets/article.{STYLESHEET_VERSION}.css'
+STYLESHEET_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def register_stylesheet_route(app):
+    """在采集应用和管理应用上注册样式表路由：长期缓存，ETag 匹配时返回304"""
+    from flask import Response, request
+
+    def article_stylesheet(version):
+        response = Response(STYLESHEET, mimetype='text/css')
+        response.headers['Cache-Control'] = STYLESHEET_CACHE_CONTROL
+        response.set_etag(STYLESHEET_VERSION)
+        return response.make_conditional(request)
+
+    app.add_url_rule('/assets/article.<version>.css', 'article_stylesheet', article_stylesheet)
+
+RECOMMEND_OPEN = """
+        <div class="recommend-section">
+            <h3 class="recommend-title">📚 推荐阅读</h3>
+            <div class="recommend-list">
+"""
+RECOMMEND_CLOSE = """
+            </div>
+        </div>
+"""
+
+
+def _recommend_url(article: Dict) -> str:
+    if article.get('url_number'):
+        return f"new/{article['url_number']}"
+    return article.get('html_file', '#')
+
+
+def render_recommendations(articles: Optional[List[Dict]]) -> str:
+    """推荐阅读列表，各条目生成后一次性拼接"""
+    if not articles:
+        return ''
+
+    items = ''.join(f"""
+                <div class="recommend-item">
+                    <a href="{_recommend_url(article)}" class="recommend-link">
+                        <span class="recommend-title-text">{article['title']}</span>
+                        <span class="recommend-meta">{article['author']} · {article['scrape_time'][:10]}</span>
+                    </a>
+                </div>
+""" for article in articles)
+    return ''.join((RECOMMEND_OPEN, items, RECOMMEND_CLOSE))
+
+
+def render_article(data: Dict, recommended_articles: Optional[List[Dict]] = None) -> str:
+    """渲染文章页面，样式表通过 <link> 引用，不再内联到每个页面"""
+    return f"""
+<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{data['title']}</title>
+    <link rel="stylesheet" href="{STYLESHEET_URL}">
+</head>
+<body>
+    <div class="article-container">
+        <div class="article-header">
+            <h1 class="article-title">{data['title']}</h1>
+            <div class="article-meta">
+                <div>作者: {data['author']}</div>
+                <div>时间: {data['scrape_time']}</div>
+            </div>
+        </div>
+        
+        <div class="article-content">
+            <div class="content-text">{data['content']}</div>
+        </div>
+        
+        {render_recommendations(recommended_articles)}
+        
+        <div class="article-footer">
+            <div>采集时间: {data['scrape_time']}</div>
+            <div class="word-count">字数: {data['word_count']}</div>
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+
+def _template_text(*functions) -> str:
+    """渲染函数中模板字符串的文字部分（f-string 编译后的字符串常量，不含文档字符串）
+
+    只有模板本身变化时结果才变化，修改注释或其他辅助代码不会让全部页面重建。
+    """
+    parts = []
+    codes = [(function.__code__, function.__doc__) for function in functions]
+    while codes:
+        code, doc = codes.pop(0)
+        for const in code.co_consts:
+            if isinstance(const, str) and const != doc:
+                parts.append(const)
+            elif isinstance(const, types.CodeType):
+                codes.append((const, None))
+    return '\0'.join(parts)
+
+
+# 模板版本：页面模板或样式表变化后改变，静态页面重建据此判断是否需要重新生成
+TEMPLATE_VERSION = hashlib.sha256(
+    ''.join((RECOMMEND_OPEN, RECOMMEND_CLOSE, _template_text(render_recommendations, render_article))).encode('utf-8')
+    + STYLESHEET
+).hexdigest()[:12]
+
+
+RECOMMEND_COUNT = 15
+
+
+def select_recommendations(db, data: Dict, url_number: Optional[int] = None) -> Optional[List[Dict]]:
+    """为文章挑选推荐阅读：优先使用相关文章索引，没有相关文章时随机挑选"""
+    if not db:
+        return None
+    try:
+        if data.get('id'):
+            related = db.get_related_articles(data['id'], RECOMMEND_COUNT)
+            if related:
+                return related
+        articles = db.get_random_articles(RECOMMEND_COUNT, exclude_url_number=url_number)
+    except Exception as e:
+        print(f"获取推荐文章失败: {str(e)}")
+        return None
+
+    # 过滤掉当前文章（使用URL编号），没有编号时按标题过滤
+    if url_number:
+        return [article for article in articles if article.get('url_number') != url_number]
+    return [article for article in articles if article['title'] != data['title']]
+
+
+def render_stored_article(db, url_number: int) -> Optional[bytes]:
+    """按需渲染数据库中的文章，文章不存在时返回None"""
+    article = db.get_article_by_url_number(url_number, include_content=True)
+    if not article:
+        return None
+    return render_article(article, select_recommendations(db, article, url_number)).encode('utf-8')
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+原始响应归档：只追加的压缩段文件 + 按规范键的SQLite索引
+
+每条记录是一个独立的gzip成员，内容为类WARC格式的头部加响应正文，
+可以按索引中的偏移量单独解压读取，段文件也可以直接用 zcat 查看。
+每个进程写自己的段文件，多个进程同时采集不会交错写入。
+
+采集时读到正文和永久链接就停止下载，这样的记录只包含页面开头到正文区之后的部分，
+索引中标记为 truncated，记录头部带 WARC-Truncated，重新提取时据此提示。
+"""
+
+import gzip
+import os
+import sqlite3
+import threading
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, Iterator, Optional
+
+ARCHIVE_DIR = 'archive'
+SEGMENT_MAX_BYTES = 256 * 1024 * 1024   # 单个段文件超过256MB后新开一个
+COMPRESS_LEVEL = 6
+
+INDEX_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS responses (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        canonical_key TEXT NOT NULL,
+        url TEXT NOT NULL,
+        segment TEXT NOT NULL,
+        offset INTEGER NOT NULL,
+        length INTEGER NOT NULL,
+        encoding TEXT,
+        fetched_at TEXT NOT NULL,
+        truncated INTEGER NOT NULL DEFAULT 0
+    )
+'''
+INDEX_KEY_SQL = '''
+    CREATE INDEX IF NOT EXISTS idx_responses_key ON responses (canonical_key, id)
+'''
+
+
+def _record(url: str, content: bytes, encoding: Optional[str], fetched_at: str, truncated: bool = False) -> bytes:
+    header = (
+        'WARC/1.0\r\n'
+        'WARC-Type: response\r\n'
+        f'WARC-Target-URI: {url}\r\n'
+        f'WARC-Date: {fetched_at}\r\n'
+        + ('WARC-Truncated: unspecified\r\n' if truncated else '') +
+        f'Content-Type: text/html; charset={encoding or "utf-8"}\r\n'
+        f'Content-Length: {len(content)}\r\n'
+        '\r\n'
+    )
+    return header.encode('utf-8') + content + b'\r\n\r\n'
+
+
+def _parse_record(data: bytes) -> bytes:
+    header, _, rest = data.partition(b'\r\n\r\n')
+    for line in header.split(b'\r\n'):
+        name, _, value = line.partition(b':')
+        if name.strip().lower() == b'content-length':
+            return rest[:int(value)]
+    return rest
+
+
+class ResponseArchive:
+    """原始响应归档
+
+    进程在写入中途退出或段文件被截断时，损坏的记录在读取时跳过，不影响其他记录。
+    """
+
+    def __init__(self, directory: str = ARCHIVE_DIR, segment_max_bytes: int = SEGMENT_MAX_BYTES):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.segment = None
+        self.stored = 0
+        self.stored_bytes = 0
+        self.damaged = 0
+        self._file = None
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(directory, 'index.db'), check_same_thread=False,
+                                     timeout=5)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(INDEX_TABLE_SQL)
+        columns = [row[1] for row in self._conn.execute('PRAGMA table_info(responses)')]
+        if 'truncated' not in columns:
+            # 旧索引中的记录是否完整无从得知，按未截断处理
+            self._conn.execute('ALTER TABLE responses ADD COLUMN truncated INTEGER NOT NULL DEFAULT 0')
+        self._conn.execute(INDEX_KEY_SQL)
+        self._conn.commit()
+
+    def _open_segment(self):
+        if self._file:
+            self._file.close()
+        stamp = datetime.now().strftime('%Y%m%d%H%M%S')
+        self.segment = f'segment-{stamp}-{os.getpid()}.warc.gz'
+        self._file = open(os.path.join(self.directory, self.segment), 'ab')
+
+    def append(self, url: str, key: str, content: bytes, encoding: Optional[str] = None, truncated: bool = False):
+        """追加一条响应记录，truncated 表示正文没有读完（提前停止或超过大小上限）"""
+        fetched_at = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        compressed = gzip.compress(_record(url, content, encoding, fetched_at, truncated), COMPRESS_LEVEL)
+
+        with self._lock:
+            if self._file is None or self._file.tell() + len(compressed) > self.segment_max_bytes:
+                self._open_segment()
+            offset = self._file.tell()
+            self._file.write(compressed)
+            self._file.flush()
+
+            self._conn.execute('''
+                INSERT INTO responses (canonical_key, url, segment, offset, length, encoding, fetched_at, truncated)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (key, url, self.segment, offset, len(compressed), encoding, fetched_at, int(truncated)))
+            self._conn.commit()
+            self.stored += 1
+            self.stored_bytes += len(compressed)
+
+    def read(self, segment: str, offset: int, length: int) -> bytes:
+        """按位置读取一条记录的响应正文"""
+        with open(os.path.join(self.directory, segment), 'rb') as f:
+            f.seek(offset)
+            data = f.read(length)
+        return _parse_record(gzip.decompress(data))
+
+    def _read_or_skip(self, segment: str, offset: int, length: int) -> Optional[bytes]:
+        """读取一条记录，段文件缺失或gzip成员不完整时返回None"""
+        try:
+            return self.read(segment, offset, length)
+        except (OSError, EOFError, zlib.error) as e:
+            with self._lock:
+                self.damaged += 1
+            print(f"⚠️ 跳过损坏的归档记录 {segment}@{offset}: {e}")
+            return None
+
+    def latest(self, key: str) -> Optional[Dict]:
+        """某个规范键最近一次的响应"""
+        with self._lock:
+            row = self._conn.execute('''
+                SELECT url, segment, offset, length, encoding, fetched_at, truncated FROM responses
+                WHERE canonical_key = ? ORDER BY id DESC LIMIT 1
+            ''', (key,)).fetchone()
+        content = self._read_or_skip(row[1], row[2], row[3]) if row else None
+        if content is None:
+            return None
+        return {
+            'url': row[0],
+            'content': content,
+            'encoding': row[4],
+            'fetched_at': row[5],
+            'truncated': bool(row[6])
+        }
+
+    def iter_latest(self) -> Iterator[Dict]:
+        """按段文件顺序遍历每个规范键最近一次的响应"""
+        with self._lock:
+            rows = self._conn.execute('''
+                SELECT canonical_key, url, segment, offset, length, encoding, fetched_at, truncated FROM responses
+                WHERE id IN (SELECT MAX(id) FROM responses GROUP BY canonical_key)
+                ORDER BY segment, offset
+            ''').fetchall()
+
+        for key, url, segment, offset, length, encoding, fetched_at, truncated in rows:
+            content = self._read_or_skip(segment, offset, length)
+            if content is None:
+                continue
+            yield {
+                'canonical_key': key,
+                'url': url,
+                'content': content,
+                'encoding': encoding,
+                'fetched_at': fetched_at,
+                'truncated': bool(truncated)
+            }
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+            self._conn.close()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            records, keys, truncated = self._conn.execute(
+                'SELECT COUNT(*), COUNT(DISTINCT canonical_key), COALESCE(SUM(truncated), 0) FROM responses'
+            ).fetchone()
+        return {
+            'records': records,
+            'keys': keys,
+            'truncated': truncated,
+            'damaged_this_run': self.damaged,
+            'stored_this_run': self.stored,
+            'stored_bytes_this_run': self.stored_bytes
+        }
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def get_response_archive() -> ResponseArchive:
+    """获取进程内共享的归档"""
+    global _archive
+    if _archive is None:
+        with _archive_lock:
+            if _archive is None:
+                _archive = ResponseArchive()
+    return _archive
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文章全文检索（SQLite FTS5 + 中文二元切分）
+
+FTS5自带的unicode61分词器会把连续的中文当作一个词，无法按词检索。
+这里在写入索引前把中文切成相邻两字的二元组（"加拿大移民" -> "加拿 拿大 大移 移民"），
+英文和数字按单词保留，再交给unicode61按空格分词。
+文章写入、修改、删除时由 index_queue 中的触发器记下变更（只用内置SQL，任何连接都能写文章表），
+Database 在同一事务内按记录更新索引（add_to_search_index、remove_from_search_index）；
+其他连接写入的变更在下次打开数据库时补做。全量重建时 bigram_text() 注册为SQL函数批量切分。
+"""
+
+import re
+import sqlite3
+from typing import List
+
+# 中日韩文字（含扩展A区和兼容区）
+CJK_RUN = r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+'
+TOKEN_PATTERN = re.compile(rf'({CJK_RUN})|([0-9A-Za-z\u00c0-\u024f]+)')
+
+FTS_TABLE_SQL = '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+        title, author, content,
+        content='',
+        tokenize='unicode61'
+    )
+'''
+
+# 旧版本直接调用 bigram_text() 的触发器，用其他连接写文章表时会报 no such function
+LEGACY_TRIGGERS = ['trg_fts_articles_insert', 'trg_fts_articles_delete', 'trg_fts_articles_update']
+
+FTS_INSERT_SQL = 'INSERT INTO articles_fts (rowid, title, author, content) VALUES (?, ?, ?, ?)'
+# 无原文的FTS5表删除时要提供与写入时相同的内容
+FTS_DELETE_SQL = "INSERT INTO articles_fts (articles_fts, rowid, title, author, content) VALUES ('delete', ?, ?, ?, ?)"
+
+# 排序权重：标题 > 作者 > 正文
+BM25_WEIGHTS = (10.0, 5.0, 1.0)
+
+
+def tokenize(text: str) -> List[str]:
+    """切分为索引词：中文按相邻两字，英文和数字按单词"""
+    tokens = []
+    for cjk, word in TOKEN_PATTERN.findall(text.lower()):
+        if word:
+            tokens.append(word)
+        elif len(cjk) == 1:
+            tokens.append(cjk)
+        else:
+            tokens.extend(cjk[i:i + 2] for i in range(len(cjk) - 1))
+    return tokens
+
+
+def bigram_text(text) -> str:
+    """把文本切分为以空格分隔的索引词"""
+    if not text:
+        return ''
+    return ' '.join(tokenize(str(text)))
+
+
+def build_match_query(query: str) -> str:
+    """把用户输入转换为FTS5查询
+
+    每个以空格分隔的词切分后组成一个短语（要求相邻出现），多个词之间为AND；
+    单个汉字按前缀匹配。没有可检索内容时返回空字符串。
+    """
+    phrases = []
+    for term in query.split():
+        tokens = tokenize(term)
+        if not tokens:
+            continue
+        if len(tokens) == 1 and len(tokens[0]) == 1:
+            phrases.append(f'"{tokens[0]}"*')
+        else:
+            phrases.append('"' + ' '.join(tokens) + '"')
+    return ' '.join(phrases)
+
+
+def make_snippet(content: str, query: str, width: int = 60) -> str:
+    """截取正文中第一个命中词附近的片段"""
+    if not content:
+        return ''
+    positions = [content.find(term) for term in query.split()]
+    positions = [pos for pos in positions if pos >= 0]
+    start = max(0, min(positions) - width // 3) if positions else 0
+    snippet = content[start:start + width]
+    return ('…' if start > 0 else '') + snippet + ('…' if start + width < len(content) else '')
+
+
+def add_to_search_index(cursor: sqlite3.Cursor, article_id: int, title, author, content):
+    """把一篇文章写入全文索引"""
+    cursor.execute(FTS_INSERT_SQL, (article_id, bigram_text(title), bigram_text(author), bigram_text(content)))
+
+
+def remove_from_search_index(cursor: sqlite3.Cursor, article_id: int, title, author, content):
+    """从全文索引中删除一篇文章（传入它写入索引时的内容）"""
+    cursor.execute(FTS_DELETE_SQL, (article_id, bigram_text(title), bigram_text(author), bigram_text(content)))
+
+
+def register_functions(conn: sqlite3.Connection):
+    """在连接上注册全量重建用到的切分函数"""
+    conn.create_function('bigram_text', 1, bigram_text, deterministic=True)
+
+
+def create_search_index(cursor: sqlite3.Cursor) -> bool:
+    """创建全文索引（删除旧版本的触发器），SQLite未编译FTS5时返回False"""
+    try:
+        cursor.execute(FTS_TABLE_SQL)
+    except sqlite3.OperationalError as e:
+        print(f"⚠️ 当前SQLite不支持FTS5，全文检索不可用: {e}")
+        return False
+
+    for name in LEGACY_TRIGGERS:
+        cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+    return True
+
+
+def rebuild_search_index(cursor: sqlite3.Cursor) -> int:
+    """清空并重建全文索引，返回写入的文章数"""
+    cursor.execute("INSERT INTO articles_fts (articles_fts) VALUES ('delete-all')")
+    cursor.execute('''
+        INSERT INTO articles_fts (rowid, title, author, content)
+        SELECT id, bigram_text(title), bigram_text(author), bigram_text(content) FROM articles
+    ''')
+    count = cursor.rowcount
+    cursor.execute("INSERT INTO articles_fts (articles_fts) VALUES ('optimize')")
+    return count
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+静态页面重建：按批读取文章，在进程池中渲染，只重新生成输入有变化的页面
+
+每个页面的输入指纹（文章内容、模板版本、推荐文章列表）记录在 rendered_pages 表中，
+指纹未变且文件（含压缩副本）仍存在的页面直接跳过。页面先写入临时文件再重命名，
+重建过程中访问者不会读到写了一半的文件。
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from precompress import ENCODINGS, write_page
+from renderer import TEMPLATE_VERSION, render_article, select_recommendations
+
+REBUILD_BATCH = 500
+RENDER_CHUNKSIZE = 16   # 每次发给渲染进程的页面数，减少进程间通信次数
+
+RENDERED_PAGES_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS rendered_pages (
+        article_id INTEGER PRIMARY KEY,
+        html_file TEXT NOT NULL,
+        input_hash TEXT NOT NULL,
+        rendered_at TEXT NOT NULL
+    )
+'''
+
+# 影响页面内容的字段
+ARTICLE_FIELDS = ('title', 'author', 'content', 'scrape_time', 'word_count')
+RECOMMEND_FIELDS = ('title', 'author', 'scrape_time', 'url_number', 'html_file')
+
+
+def render_to_file(job: Tuple[str, Dict, Optional[List[Dict]]]) -> int:
+    """渲染并写出一个页面及其压缩副本，返回写入的字节数（在渲染进程中执行）"""
+    path, article, recommended = job
+    return write_page(path, render_article(article, recommended).encode('utf-8'))
+
+
+def input_hash(article: Dict, recommended: Optional[List[Dict]]) -> str:
+    """页面输入的指纹"""
+    payload = [
+        TEMPLATE_VERSION,
+        [article[field] for field in ARTICLE_FIELDS],
+        [[item.get(field) for field in RECOMMEND_FIELDS] for item in recommended or ()],
+    ]
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class SiteBuilder:
+    """重新生成采集时写出的静态HTML页面
+
+    推荐阅读来自相关文章索引；没有相关文章的页面使用随机推荐，
+    每次重建时输入都会变化，这部分页面总是重新生成。
+    """
+
+    def __init__(self, db, workers: int = 0, output_dir: str = '.', batch_size: int = REBUILD_BATCH,
+                 force: bool = False):
+        self.db = db
+        self.workers = workers
+        self.output_dir = output_dir
+        self.batch_size = batch_size
+        self.force = force
+
+        conn = self.db.pool.acquire()
+        try:
+            conn.execute(RENDERED_PAGES_TABLE_SQL)
+            conn.commit()
+        finally:
+            self.db.pool.release(conn)
+
+    def _iter_batches(self):
+        """按id顺序分批读取有HTML文件的文章"""
+        last_id = 0
+        while True:
+            conn = self.db.pool.acquire()
+            try:
+                rows = conn.execute('''
+                    SELECT a.id, a.title, a.author, a.content, a.scrape_time, a.word_count, a.html_file,
+                           a.url_number, p.input_hash
+                    FROM articles a LEFT JOIN rendered_pages p ON p.article_id = a.id
+                    WHERE a.id > ? AND a.html_file IS NOT NULL
+                    ORDER BY a.id
+                    LIMIT ?
+                ''', (last_id, self.batch_size)).fetchall()
+            finally:
+                self.db.pool.release(conn)
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            yield rows
+
+    def _plan(self, rows) -> Tuple[List[Tuple[str, Dict, Optional[List[Dict]]]], List[Tuple]]:
+        """找出需要重新生成的页面，返回 (渲染任务, 指纹记录)"""
+        jobs, records = [], []
+        for row in rows:
+            article = {
+                'id': row[0], 'title': row[1], 'author': row[2], 'content': row[3] or '',
+                'scrape_time': row[4], 'word_count': row[5], 'html_file': row[6], 'url_number': row[7]
+            }
+            recommended = select_recommendations(self.db, article, article['url_number'])
+            digest = input_hash(article, recommended)
+            path = os.path.join(self.output_dir, article['html_file'])
+            if (not self.force and digest == row[8] and os.path.exists(path)
+                    and all(os.path.exists(path + suffix) for _, suffix in ENCODINGS)):
+                continue
+            jobs.append((path, article, recommended))
+            records.append((article['id'], article['html_file'], digest))
+        return jobs, records
+
+    def _save_records(self, records: List[Tuple]):
+        rendered_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        conn = self.db.pool.acquire()
+        try:
+            conn.executemany('''
+                INSERT OR REPLACE INTO rendered_pages (article_id, html_file, input_hash, rendered_at)
+                VALUES (?, ?, ?, ?)
+            ''', [record + (rendered_at,) for record in records])
+            conn.commit()
+        finally:
+            self.db.pool.release(conn)
+
+    def rebuild(self) -> Dict:
+        """重建全部页面，返回统计"""
+        executor = None
+        if self.workers:
+            # 用spawn启动，与解析进程池一致
+            executor = ProcessPoolExecutor(max_workers=self.workers,
+                                           mp_context=multiprocessing.get_context('spawn'))
+
+        stats = {'scanned': 0, 'rendered': 0, 'skipped': 0, 'bytes': 0}
+        started = time.perf_counter()
+        try:
+            for rows in self._iter_batches():
+                jobs, records = self._plan(rows)
+                if executor:
+                    sizes = executor.map(render_to_file, jobs, chunksize=RENDER_CHUNKSIZE)
+                else:
+                    sizes = map(render_to_file, jobs)
+                stats['bytes'] += sum(sizes)
+                # 页面全部写出后才记录指纹，中途失败的页面下次会重新生成
+                self._save_records(records)
+
+                stats['scanned'] += len(rows)
+                stats['rendered'] += len(jobs)
+                stats['skipped'] += len(rows) - len(jobs)
+                elapsed = time.perf_counter() - started
+                print(f"  已检查 {stats['scanned']} 页，生成 {stats['rendered']}，跳过 {stats['skipped']}，"
+                      f"{stats['scanned'] / elapsed:.0f} 页/秒")
+        finally:
+            if executor:
+                executor.shutdown()
+
+        elapsed = time.perf_counter() - started
+        stats['seconds'] = round(elapsed, 2)
+        stats['pages_per_second'] = round(stats['scanned'] / elapsed, 1) if elapsed else 0.0
+        stats['rendered_per_second'] = round(stats['rendered'] / elapsed, 1) if elapsed else 0.0
+        return stats
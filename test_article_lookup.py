@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试按URL编号和链接查找文章
+"""
+
+import os
+import tempfile
+from database import Database
+from tests_util import make_article
+
+
+def test_article_lookup():
+    """测试比最新50篇更早的文章也能按编号查到，正文按需读取"""
+    print("🧪 测试按编号查找文章")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'test.db'))
+        articles = db.add_articles_bulk(
+            make_article(i, scrape_time=f'2025-01-01 08:{i // 60:02d}:{i % 60:02d}', html_file=f'lookup_{i}.html')
+            for i in range(80)
+        )
+
+        # 最早写入的文章不在最新一页中
+        oldest = articles[0]['url_number']
+        assert oldest not in [a['url_number'] for a in db.get_articles()]
+
+        found = db.get_article_by_url_number(oldest)
+        assert found['title'] == '测试文章0' and found['html_file'] == 'lookup_0.html'
+        assert 'content' not in found
+
+        found = db.get_article_by_url_number(oldest, include_content=True)
+        assert found['content'] == '测试内容0'
+        assert db.get_article_by_url_number(oldest + 1000) is None
+
+        # 按编号查找走 url_number 索引，不扫描全表
+        conn = db.pool.acquire()
+        try:
+            plan = ' '.join(row[3] for row in conn.execute(
+                'EXPLAIN QUERY PLAN SELECT id FROM articles WHERE url_number = ? LIMIT 1', (oldest,)))
+        finally:
+            db.pool.release(conn)
+        assert 'idx_articles_url_number' in plan, plan
+
+        # 按链接查找编号，同一文章的不同链接形式指向同一编号
+        assert db.get_url_number_by_url('https://mp.weixin.qq.com/s/test0') == oldest
+        assert db.get_url_number_by_url('https://mp.weixin.qq.com/s/test0#rd') == oldest
+        assert db.get_url_number_by_url('https://mp.weixin.qq.com/s/missing') is None
+        db.close()
+    print("✅ 按编号查找文章测试通过")
+
+
+if __name__ == "__main__":
+    test_article_lookup()
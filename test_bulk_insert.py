@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试文章批量写入（单次提交、编号分配、任务进度、批内去重）
+"""
+
+import json
+import os
+import tempfile
+from types import SimpleNamespace
+from auto_scraper import AutoScraper
+from database import Database
+from tests_util import make_article
+
+
+def saved_count(db: Database, task_id: int) -> int:
+    task = next(t for t in db.get_tasks() if t['id'] == task_id)
+    return json.loads(task['result'])['saved_count']
+
+
+def test_add_articles_bulk():
+    """测试整批一次提交、缺少编号时分配连续编号、累计任务进度、重复时保留最后一篇"""
+    print("🧪 测试文章批量写入")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'test.db'))
+        keyword_id = db.add_keyword('批量')
+        task_id = db.add_task(keyword_id, 'auto_scrape')
+
+        # 在同一线程持有连接，记录批量写入执行的语句
+        conn = db.pool.acquire()
+        statements = []
+        conn.set_trace_callback(statements.append)
+        try:
+            saved = db.add_articles_bulk([
+                make_article(0),
+                make_article(1, url_number=100),
+                make_article(2),
+                make_article(3, url='https://mp.weixin.qq.com/s/test0'),  # 与第一篇重复
+            ], keyword_id, task_id)
+        finally:
+            conn.set_trace_callback(None)
+            db.pool.release(conn)
+
+        commits = [s for s in statements if s.strip().upper() == 'COMMIT']
+        print(f"📊 执行 {len(statements)} 条语句，提交 {len(commits)} 次")
+        assert len(commits) == 1
+
+        # 重复的只保留最后一篇，顺序不变
+        assert [a['title'] for a in saved] == ['测试文章1', '测试文章2', '测试文章3']
+        assert all(a['id'] for a in saved)
+        assert len(db.list_articles()['articles']) == 3
+        assert db.get_article_by_url_number(saved[2]['url_number'])['url'] == 'https://mp.weixin.qq.com/s/test0'
+
+        # 已有编号保留，缺少编号的按顺序分配连续编号
+        assert saved[0]['url_number'] == 100
+        assert saved[1]['url_number'] + 1 == saved[2]['url_number']
+        assert db.get_next_url_number() == saved[2]['url_number'] + 1
+
+        # 任务进度按批累计
+        db.add_articles_bulk([make_article(4), make_article(5)], keyword_id, task_id)
+        assert saved_count(db, task_id) == 5
+
+        # 写入失败时整批回滚，编号也不前进
+        next_number = db.get_next_url_number() + 1
+        try:
+            db.add_articles_bulk([make_article(6), {'url': 'https://mp.weixin.qq.com/s/broken'}], keyword_id, task_id)
+        except KeyError:
+            pass
+        else:
+            raise AssertionError("缺少字段的文章没有报错")
+        assert len(db.list_articles()['articles']) == 5
+        assert db.get_next_url_number() == next_number
+        assert saved_count(db, task_id) == 5
+        db.close()
+    print("✅ 文章批量写入测试通过")
+
+
+def test_flush_articles_duplicates():
+    """测试批内重复的文章计为重复而不是失败"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'test.db'))
+        saved_pages = []
+        auto = SimpleNamespace(db=db, scraper=SimpleNamespace(
+            save_html=lambda data, filename, db, url_number: saved_pages.append(url_number)))
+
+        batch = [make_article(0, html_file='a.html'), make_article(1, html_file='b.html'),
+                 make_article(2, url='https://mp.weixin.qq.com/s/test0', html_file='c.html')]
+        assert AutoScraper.flush_articles(auto, batch, None) == (2, 1)
+        assert len(saved_pages) == 2
+        assert AutoScraper.flush_articles(auto, [], None) == (0, 0)
+        db.close()
+
+
+if __name__ == "__main__":
+    test_add_articles_bulk()
+    test_flush_articles_duplicates()
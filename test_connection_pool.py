@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试SQLite连接池（复用、嵌套获取、WAL模式）
+"""
+
+import os
+import tempfile
+import threading
+from database import Database
+
+
+def test_connection_pool():
+    """测试连接在调用之间复用、同一线程嵌套获取同一连接、未提交事务归还时回滚"""
+    print("🧪 测试连接池")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'test.db'))
+        pool = db.pool
+
+        conn = pool.acquire()
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert conn.execute('PRAGMA busy_timeout').fetchone()[0] == 5000
+
+        # 同一线程嵌套获取复用同一连接，最外层释放后才回到空闲池
+        assert pool.acquire() is conn
+        pool.release(conn)
+        assert conn not in pool._idle
+        pool.release(conn)
+        assert conn in pool._idle
+
+        # 之后的调用（包括其他线程）复用空闲连接，不再新建
+        db.add_keyword('连接池')
+        assert pool.acquire() is conn
+        pool.release(conn)
+        acquired = []
+
+        def other_thread():
+            acquired.append(pool.acquire())
+            pool.release(acquired[0])
+
+        thread = threading.Thread(target=other_thread)
+        thread.start()
+        thread.join()
+        assert acquired == [conn]
+
+        # 未提交的事务不会带回池中
+        conn = pool.acquire()
+        conn.execute("INSERT INTO keywords (keyword) VALUES ('未提交')")
+        pool.release(conn)
+        assert not conn.in_transaction
+        assert [k['keyword'] for k in db.get_keywords()] == ['连接池']
+
+        # 同时持有的连接超过池大小时，多出的连接归还后关闭
+        pool.pool_size = 1
+        conns = []
+        barrier = threading.Barrier(3)
+
+        def hold():
+            c = pool.acquire()
+            conns.append(c)
+            barrier.wait()
+            pool.release(c)
+
+        threads = [threading.Thread(target=hold) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(set(map(id, conns))) == 3
+        assert len(pool._idle) == 1
+        db.close()
+        assert pool._idle == []
+    print("✅ 连接池测试通过")
+
+
+if __name__ == "__main__":
+    test_connection_pool()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试文章正文提取
+"""
+
+import random
+
+from benchmark import legacy_extract
+from extractor import ContentCutoff, clean_text, extract_article, parse_page
+
+def test_extractor():
+    """测试字段优先级、回退和结尾清理"""
+    print("🧪 测试正文提取")
+    print("=" * 50)
+
+    html = '''
+    <html><head><title>页面标题</title><script>var a = "<div id='js_content'>";</script></head>
+    <body>
+        <h1>普通标题</h1>
+        <h1 class="rich_media_title" id="activity-name"> 文章标题 </h1>
+        <span class="rich_media_meta rich_media_meta_text">作者甲</span>
+        <div class="content">备用正文</div>
+        <div id="js_content" class="rich_media_content">
+            <p>第一段   内容</p>
+            <p>第二段</p>
+            <p>长按识别二维码关注</p>
+        </div>
+    </body></html>
+    '''
+    article = extract_article(html)
+    print(f"📄 {article}")
+    assert article == {'title': '文章标题', 'author': '作者甲', 'content': '第一段 内容 第二段'}
+
+    # 没有公众号专用节点时按通用选择器回退
+    article = extract_article('<html><head><title> 页面标题 </title></head><body><main>正文</main></body></html>')
+    assert article == {'title': '页面标题', 'author': '未知作者', 'content': '正文'}
+
+    # 响应头没有charset（requests 给出 ISO-8859-1）时按 meta 声明或UTF-8解码
+    page = '<html><head>{}</head><body><h1 id="activity-name">中文标题</h1></body></html>'
+    assert parse_page(page.format('<meta charset="gbk">').encode('gbk'), 'ISO-8859-1')['title'] == '中文标题'
+    assert parse_page(page.format('').encode('utf-8'), 'ISO-8859-1')['title'] == '中文标题'
+    assert parse_page(page.format('<meta charset="gbk">').encode('utf-8'), 'utf-8')['title'] == '中文标题'
+
+    assert clean_text('正文\n\n 扫码关注 更多 点击阅读原文') == '正文'
+    assert clean_text(None) == ''
+
+    print("✅ 正文提取测试通过")
+
+
+def test_fallback_selectors():
+    """测试各级回退选择器的提取结果与原来的 select_one 链一致"""
+    print("🧪 测试回退选择器")
+    print("=" * 50)
+
+    pages = [
+        # 标题只有 rich_media_title，作者用 .author，正文只有 rich_media_content
+        '<html><head><title>页面标题</title></head><body><h1>普通标题</h1>'
+        '<h1 class="rich_media_title"> 备用标题 </h1><p class="author">作者乙</p>'
+        '<div class="rich_media_content"><p>正文一</p><p>扫码关注</p></div></body></html>',
+        # 作者只有 data-author 属性，正文在 .content 中，标题取 <title>
+        '<html><head><title> 页面标题 </title></head><body><h1>普通标题</h1>'
+        '<span data-author="x">作者丙</span><div class="content">正文二\n\n第二行</div>'
+        '<article>文章节点</article></body></html>',
+        # 没有 <title>，标题取第一个 <h1>，正文在 <article> 中
+        '<html><body><h1 class="headline">第一个标题</h1><h1>第二个标题</h1>'
+        '<article><p>正文三</p><p>点击阅读原文</p></article><main>主体</main></body></html>',
+        # 只有 <main>，多个 class 中包含目标 class
+        '<html><head><title>标题四</title></head><body><div class="meta author">作者丁</div>'
+        '<main><section>正文四</section></main></body></html>',
+        # 什么都没有
+        '<html><body><div>无关内容</div></body></html>',
+    ]
+    for html in pages:
+        article = extract_article(html)
+        print(f"📄 {article}")
+        assert article == legacy_extract(html)
+
+    print("✅ 回退选择器测试通过")
+
+
+def feed_chunks(page: bytes, rng: random.Random):
+    """按随机分块喂给 ContentCutoff，返回 (停止时已读取的字节数, 识别的正文结束位置)"""
+    cutoff = ContentCutoff()
+    buffer = bytearray()
+    pos = 0
+    while pos < len(page):
+        step = rng.choice((1, 3, 7, 64, 512, 4096))
+        buffer += page[pos:pos + step]
+        pos += step
+        if cutoff(buffer):
+            return len(buffer), cutoff.content_end
+    return None, cutoff.content_end
+
+
+def test_content_cutoff():
+    """测试流式截止在任意分块下都在正文闭合、永久链接读到后停止"""
+    print("🧪 测试流式截止")
+    print("=" * 50)
+
+    msg_link = 'var msg_link = "http://mp.weixin.qq.com/s?__biz=MzA&amp;mid=1&amp;idx=1";'
+    content = (
+        '<div id="js_content" class="rich_media_content" style="visibility: hidden;">'
+        '<div><p>第一段</p></div>'
+        '<!-- 旧版本 </div></div> -->'
+        '<script>document.write("</div>");</script>'
+        '<style>.x:after { content: "</div>"; }</style>'
+        '<DIV class="inner"><p>' + '正文内容' * 300 + '</p></DIV>'
+        '</div>'
+    )
+    head = '<html><head><script>var tpl = "<div id=\'js_content\'>";</script></head><body>'
+    after = '<div class="recommend">' + '推荐' * 2000 + '</div>'
+
+    rng = random.Random(2025)
+    # 永久链接在正文之后：读到它即停止
+    page = (head + content + after + f'<script>{msg_link}</script>' + '尾部' * 5000).encode('utf-8')
+    content_end = page.index(content.encode('utf-8')) + len(content.encode('utf-8'))
+    link_end = page.index(msg_link.encode('utf-8')) + len(msg_link.encode('utf-8'))
+    for _ in range(50):
+        stopped, end = feed_chunks(page, rng)
+        assert end == content_end
+        assert stopped is not None and link_end <= stopped < link_end + 4096
+
+    # 永久链接在正文之前：正文闭合即停止
+    page = (head + f'<script>{msg_link}</script>' + content + after).encode('utf-8')
+    content_end = page.index(content.encode('utf-8')) + len(content.encode('utf-8'))
+    for _ in range(50):
+        stopped, end = feed_chunks(page, rng)
+        assert end == content_end
+        assert stopped is not None and content_end <= stopped < content_end + 4096
+
+    print("✅ 流式截止测试通过")
+
+
+if __name__ == "__main__":
+    test_extractor()
+    test_fallback_selectors()
+    test_content_cutoff()
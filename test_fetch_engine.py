@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试并发抓取引擎（使用假的抓取函数，不访问网络）
+"""
+
+import threading
+import time
+from fetch_engine import FetchEngine, TokenBucket
+from test_rate_limiter import FakeClock
+
+
+def test_fetch_engine_map():
+    """测试在途任务数有界、按需读取输入、异常时返回None"""
+    print("🧪 测试并发抓取引擎")
+    print("=" * 50)
+
+    workers = 3
+    lock = threading.Lock()
+    state = {'running': 0, 'peak': 0, 'taken': 0}
+
+    def urls():
+        for i in range(20):
+            with lock:
+                state['taken'] += 1
+            yield f'https://example.com/{i}'
+
+    def fetch(url):
+        with lock:
+            state['running'] += 1
+            state['peak'] = max(state['peak'], state['running'])
+        time.sleep(0.005)
+        with lock:
+            state['running'] -= 1
+        if url.endswith(('/3', '/7')):
+            raise RuntimeError('模拟抓取失败')
+        return url.upper()
+
+    results = {}
+    for url, result in FetchEngine(workers).map(fetch, urls()):
+        # 结果返回时，已从输入中取出的URL不超过 已完成数 + workers
+        assert state['taken'] <= len(results) + 1 + workers
+        results[url] = result
+
+    print(f"📊 最大并发 {state['peak']}")
+    assert state['peak'] <= workers
+    assert len(results) == 20
+    assert results['https://example.com/3'] is None and results['https://example.com/7'] is None
+    assert results['https://example.com/5'] == 'HTTPS://EXAMPLE.COM/5'
+
+    # 输入少于并发数、输入为空
+    assert dict(FetchEngine(8).map(str.upper, ['a', 'b'])) == {'a': 'A', 'b': 'B'}
+    assert list(FetchEngine(2).map(fetch, [])) == []
+    print("✅ 并发抓取引擎测试通过")
+
+
+def test_fetch_engine_idle():
+    """测试等待慢请求期间按间隔调用空闲回调（在调用方线程中）"""
+    calls = []
+
+    def slow(url):
+        time.sleep(0.2)
+        return url
+
+    results = list(FetchEngine(2).map(slow, ['a', 'b'], on_idle=lambda: calls.append(threading.get_ident()),
+                                      idle_interval=0.02))
+    assert sorted(results) == [('a', 'a'), ('b', 'b')]
+    assert len(calls) >= 3 and set(calls) == {threading.get_ident()}
+
+    # 回调异常不影响抓取结果
+    def broken():
+        raise RuntimeError('模拟回调失败')
+    assert dict(FetchEngine(1).map(slow, ['a'], on_idle=broken, idle_interval=0.02)) == {'a': 'a'}
+
+
+def test_token_bucket_rate():
+    """测试突发容量和补充速率"""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=0.5, capacity=3, clock=clock)
+
+    # 突发：连续3个请求不等待，第4个按 1/rate 排队
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.reserve() == 2.0
+
+    # 长时间空闲后令牌不超过容量
+    clock.advance(3600)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.reserve() == 2.0
+
+    # 按速率排队：每次预订依次多等一个间隔，时间推进后按速率补充
+    assert bucket.reserve() == 4.0
+    clock.advance(4.0)
+    assert bucket.reserve() == 2.0
+
+
+if __name__ == "__main__":
+    test_fetch_engine_map()
+    test_fetch_engine_idle()
+    test_token_bucket_rate()
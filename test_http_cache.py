@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试HTTP条件请求缓存
+"""
+
+import os
+import tempfile
+import threading
+from http_cache import HttpCache
+
+def test_http_cache():
+    """测试校验头、304命中和容量淘汰"""
+    print("🧪 测试HTTP条件请求缓存")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = HttpCache(os.path.join(tmp, 'cache'), max_bytes=25)
+
+        def revalidate(url):
+            # 模拟一次条件请求后服务器返回304
+            cache.conditional_headers(url)
+            return cache.load(url)
+
+        # 没有校验信息的响应不缓存
+        cache.store('https://example.com/plain', b'0123456789', None, None)
+        assert cache.conditional_headers('https://example.com/plain') == {}
+
+        cache.store('https://example.com/a', b'a' * 10, '"etag-a"', None, 'utf-8')
+        assert cache.conditional_headers('https://example.com/a') == {'If-None-Match': '"etag-a"'}
+        assert revalidate('https://example.com/a') == (b'a' * 10, 'utf-8', False)
+
+        # 超出容量时淘汰最久未使用的条目
+        cache.store('https://example.com/b', b'b' * 10, None, 'Mon, 01 Sep 2025 00:00:00 GMT')
+        revalidate('https://example.com/a')
+        cache.store('https://example.com/c', b'c' * 10, '"etag-c"', None)
+        assert revalidate('https://example.com/b') is None
+        assert revalidate('https://example.com/a') is not None
+
+        stats = cache.get_stats()
+        print(f"📊 {stats}")
+        assert stats['entries'] == 2
+        assert stats['total_bytes'] == 20
+        assert stats['evicted'] == 1
+        assert stats['bytes_saved'] == 30
+        assert stats['hit_ratio'] == 0.5
+
+        # 部分正文只为允许部分条目的请求生成条件头
+        cache.store('https://example.com/p', b'p' * 5, '"etag-p"', None, 'utf-8', partial=True)
+        assert cache.conditional_headers('https://example.com/p') == {}
+        assert cache.conditional_headers('https://example.com/p', allow_partial=True) == {'If-None-Match': '"etag-p"'}
+        assert cache.load('https://example.com/p') == (b'p' * 5, 'utf-8', True)
+        cache.close()
+
+    print("✅ HTTP条件请求缓存测试通过")
+
+
+def test_concurrent_store():
+    """多个线程同时保存同一URL时各写各的临时文件，不会互相覆盖或找不到文件"""
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, 'cache')
+        cache = HttpCache(directory)
+        url = 'https://example.com/same'
+        bodies = [bytes([65 + i]) * 200000 for i in range(8)]
+        errors = []
+        barrier = threading.Barrier(len(bodies))
+
+        def store(body):
+            barrier.wait()
+            try:
+                for _ in range(5):
+                    cache.store(url, body, '"etag"', None, 'utf-8')
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=store, args=(body,)) for body in bodies]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == [], errors
+        content, _, _ = cache.load(url)
+        assert content in bodies
+        assert [name for name in os.listdir(directory) if '.tmp' in name] == []
+        cache.close()
+
+
+if __name__ == "__main__":
+    test_http_cache()
+    test_concurrent_store()
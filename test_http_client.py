@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试共享HTTP客户端的流式下载
+"""
+
+import io
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from benchmark import build_article_page
+from extractor import ContentCutoff
+from http_client import HttpClient
+from fetch_engine import HostRateLimiter
+
+PAGE = b'<html><body><div id="js_content"><p>content</p></div>' + b'x' * 4000 + b'</body></html>'
+
+
+class FakeResponse:
+    """模拟 stream=True 的响应，按块返回正文"""
+
+    def __init__(self, status_code=200, body=b'', headers=None, url='https://mp.weixin.qq.com/s/page'):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.url = url
+        self.headers = headers or {}
+        self.encoding = 'utf-8'
+        self.raw = io.BytesIO()
+        self.body = body
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), 1000):
+            chunk = self.body[start:start + 1000]
+            self.raw.write(chunk)
+            yield chunk
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    """按顺序返回预设的响应，记录请求头"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.sent_headers = []
+
+    def request(self, method, url, headers=None, **kwargs):
+        self.sent_headers.append(dict(headers or {}))
+        return self.responses.pop(0)
+
+
+def test_streamed_cache():
+    """测试提前停止的部分正文不进入缓存，完整读取的正文304时返回"""
+    print("🧪 测试流式下载与缓存")
+    print("=" * 50)
+
+    url = 'https://mp.weixin.qq.com/s/page'
+    headers = {'Content-Type': 'text/html; charset=utf-8', 'ETag': '"v1"', 'Content-Length': str(len(PAGE))}
+    with tempfile.TemporaryDirectory() as tmp:
+        client = HttpClient(rate_limiter=HostRateLimiter(limits={}, default=(1000.0, 1000)),
+                            pool_sizes={}, cookie_file=None, cache_dir=os.path.join(tmp, 'cache'))
+
+        # 读到正文结束就停止：返回部分正文，标记为截断，只作为部分条目缓存
+        client.session = FakeSession([FakeResponse(body=PAGE, headers=headers)])
+        response, page = client.get_streamed(url, stop=lambda buffer: b'</div>' in buffer)
+        assert response.truncated and len(page) < len(PAGE)
+        assert client.stream_stats['early_stops'] == 1
+        assert client.cache.conditional_headers(url) == {}
+
+        # 完整读取后缓存，304时返回完整页面
+        client.session = FakeSession([FakeResponse(body=PAGE, headers=headers),
+                                      FakeResponse(status_code=304, headers=headers)])
+        response, page = client.get_streamed(url)
+        assert not response.truncated and page == PAGE
+        response, page = client.get_streamed(url, stop=lambda buffer: b'</div>' in buffer)
+        assert client.session.sent_headers[-1].get('If-None-Match') == '"v1"'
+        assert response.status_code == 304 and not response.truncated and page == PAGE
+
+        # 超过大小上限的正文也不缓存
+        client.session = FakeSession([FakeResponse(body=PAGE, headers=dict(headers, ETag='"v2"'),
+                                                   url=url + '2')])
+        response, page = client.get_streamed(url + '2', max_bytes=2000)
+        assert response.truncated and len(page) == 2000
+        assert client.cache.conditional_headers(url + '2') == {}
+        client.cache.close()
+
+    print("✅ 流式下载与缓存测试通过")
+
+
+def test_stop_on_last_chunk():
+    """测试停止条件在最后一块上成立时按完整读取处理"""
+    print("🧪 测试在最后一块停止")
+    print("=" * 50)
+
+    url = 'https://mp.weixin.qq.com/s/last'
+    with tempfile.TemporaryDirectory() as tmp:
+        client = HttpClient(rate_limiter=HostRateLimiter(limits={}, default=(1000.0, 1000)),
+                            pool_sizes={}, cookie_file=None, cache_dir=os.path.join(tmp, 'cache'))
+        at_end = lambda buffer: buffer.endswith(b'</html>')
+
+        # 有 Content-Length 时按已读字节数判断
+        headers = {'Content-Type': 'text/html', 'ETag': '"v1"', 'Content-Length': str(len(PAGE))}
+        client.session = FakeSession([FakeResponse(body=PAGE, headers=headers)])
+        response, page = client.get_streamed(url, stop=at_end)
+        assert not response.truncated and page == PAGE
+        assert client.stream_stats['early_stops'] == 0
+        assert client.cache.conditional_headers(url) == {'If-None-Match': '"v1"'}
+
+        # 分块传输时再取一块确认已读完；正文正好等于上限也不算截断
+        headers = {'Content-Type': 'text/html', 'ETag': '"v2"'}
+        client.session = FakeSession([FakeResponse(body=PAGE, headers=headers),
+                                      FakeResponse(body=PAGE, headers=headers),
+                                      FakeResponse(body=PAGE, headers=headers)])
+        response, page = client.get_streamed(url + '2', stop=at_end)
+        assert not response.truncated and page == PAGE
+        response, page = client.get_streamed(url + '3', max_bytes=len(PAGE))
+        assert not response.truncated and page == PAGE
+
+        # 还有未读取的正文时才是提前停止
+        response, page = client.get_streamed(url + '4', stop=lambda buffer: b'</div>' in buffer)
+        assert response.truncated and len(page) < len(PAGE)
+        assert client.stream_stats['early_stops'] == 1 and client.stream_stats['capped'] == 0
+        client.cache.close()
+
+    print("✅ 在最后一块停止测试通过")
+
+
+def test_cutoff_page_cached():
+    """测试被 ContentCutoff 提前停止的文章页在再次采集时命中缓存"""
+    print("🧪 测试提前停止页面的缓存")
+    print("=" * 50)
+
+    url = 'https://mp.weixin.qq.com/s/article'
+    page = build_article_page(200).encode('utf-8')
+    # 正文和永久链接之后还有大量内容，ContentCutoff 一定会提前停止
+    page = page.replace(b'</body>', b'<div class="footer">' + b'x' * 200000 + b'</div></body>')
+    headers = {'Content-Type': 'text/html; charset=utf-8', 'ETag': '"a1"', 'Content-Length': str(len(page))}
+    with tempfile.TemporaryDirectory() as tmp:
+        client = HttpClient(rate_limiter=HostRateLimiter(limits={}, default=(1000.0, 1000)),
+                            pool_sizes={}, cookie_file=None, cache_dir=os.path.join(tmp, 'cache'))
+        client.session = FakeSession([FakeResponse(body=page, headers=headers, url=url),
+                                      FakeResponse(status_code=304, headers=headers, url=url)])
+        response, first = client.get_streamed(url, stop=ContentCutoff())
+        assert response.truncated and len(first) < len(page)
+        assert client.stream_stats['early_stops'] == 1
+
+        # 第二次采集发送校验头，304时返回缓存的前缀
+        response, second = client.get_streamed(url, stop=ContentCutoff())
+        assert client.session.sent_headers[-1].get('If-None-Match') == '"a1"'
+        assert response.status_code == 304 and response.truncated and second == first
+        stats = client.cache.get_stats()
+        print(f"📊 {stats}")
+        assert stats['hits'] == 1
+        client.cache.close()
+
+    print("✅ 提前停止页面的缓存测试通过")
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    """HTTP/1.1 长连接响应，第一次请求时设置Cookie"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'<html>ok</html>'
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        if 'session=' not in (self.headers.get('Cookie') or ''):
+            self.send_header('Set-Cookie', 'session=abc; Path=/; Max-Age=3600')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_pool_and_cookies():
+    """测试按主机的连接池大小、连接复用统计和Cookie文件的保存与加载"""
+    print("🧪 测试连接池与Cookie持久化")
+    print("=" * 50)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host = f'127.0.0.1:{server.server_port}'
+    url = f'http://{host}/page'
+    limiter = HostRateLimiter(limits={}, default=(1000.0, 1000))
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            cookie_file = os.path.join(tmp, 'cookies.txt')
+            client = HttpClient(rate_limiter=limiter, pool_sizes={host: 3}, cookie_file=cookie_file, cache_dir=None)
+            assert client.session.get_adapter(url)._pool_maxsize == 3
+            assert client.session.get_adapter('http://other.example/')._pool_maxsize != 3
+
+            # 同一主机的请求复用同一个长连接
+            for _ in range(5):
+                assert client.get(url).status_code == 200
+            stats = client.get_stats()
+            print(f"📊 {stats['hosts']}")
+            assert stats['requests'] == 5
+            assert stats['hosts']['127.0.0.1'] == {'requests': 5, 'connections': 1, 'reuse_ratio': 0.8}
+
+            # Cookie 保存到文件，新的客户端加载后直接带上
+            client.save_cookies()
+            client.session.close()
+            reloaded = HttpClient(rate_limiter=limiter, pool_sizes={}, cookie_file=cookie_file, cache_dir=None)
+            assert reloaded.session.cookies.get('session') == 'abc'
+            reloaded.session.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    print("✅ 连接池与Cookie持久化测试通过")
+
+
+if __name__ == "__main__":
+    test_streamed_cache()
+    test_stop_on_last_chunk()
+    test_cutoff_page_cached()
+    test_pool_and_cookies()
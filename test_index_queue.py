@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试索引变更队列（用未注册自定义函数的连接写文章表）
+"""
+
+import os
+import sqlite3
+import tempfile
+from database import Database
+from tests_util import make_article
+
+
+def read_df(db: Database) -> dict:
+    conn = db.pool.acquire()
+    try:
+        return dict(conn.execute('SELECT term, df FROM related_df').fetchall())
+    finally:
+        db.pool.release(conn)
+
+
+def test_write_from_other_connection():
+    """其他连接写入、修改、删除、覆盖文章不报错，重新打开数据库时补做全文索引和文档频率"""
+    print("🧪 测试索引变更队列")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'test.db')
+        db = Database(db_path)
+        saved = db.add_articles_bulk([
+            make_article(0, title='加拿大移民政策', content='永久居民申请流程'),
+            make_article(1, title='股票市场周报', content='基金收益率上涨'),
+            make_article(2, title='火锅美食推荐', content='川菜餐厅'),
+        ])
+        db.close()
+
+        conn = sqlite3.connect(db_path)
+        triggers = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger'").fetchall()
+        assert not any('bigram_text' in sql or 'related_term_list' in sql for (sql,) in triggers)
+        conn.execute('PRAGMA recursive_triggers = ON')
+        conn.execute('''
+            INSERT INTO articles (title, author, content, url, url_number, scrape_time)
+            VALUES ('留学签证指南', '作者', '签证材料清单', 'https://mp.weixin.qq.com/s/new', 10, '2025-01-02 00:00:00')
+        ''')
+        conn.execute("UPDATE articles SET title = '股票市场月报', content = '基金收益率下跌' WHERE id = ?",
+                     (saved[1]['id'],))
+        conn.execute('DELETE FROM articles WHERE id = ?', (saved[2]['id'],))
+        conn.execute('''
+            INSERT OR REPLACE INTO articles (title, author, content, url, url_number, scrape_time)
+            VALUES ('加拿大移民新政', '作者', '永久居民申请更新', ?, 1, '2025-01-03 00:00:00')
+        ''', (saved[0]['url'],))
+        conn.commit()
+        pending = conn.execute('SELECT COUNT(*) FROM index_queue').fetchone()[0]
+        conn.close()
+        assert pending == 5
+
+        db = Database(db_path)
+        titles = lambda query: [r['title'] for r in db.search_articles(query)['results']]
+        assert titles('签证') == ['留学签证指南']
+        assert titles('月报') == ['股票市场月报'] and titles('周报') == []
+        assert titles('火锅') == []
+        assert titles('移民') == ['加拿大移民新政'] and titles('政策') == []
+
+        # 增量维护的文档频率与全量重算一致
+        incremental = read_df(db)
+        assert incremental[''] == 3
+        assert db.process_index_queue() == 0
+        assert db.rebuild_related_index() == 3
+        assert incremental == read_df(db)
+        db.close()
+    print("✅ 索引变更队列测试通过")
+
+
+if __name__ == "__main__":
+    test_write_from_other_connection()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试搜狗链接解析缓存
+"""
+
+import os
+import tempfile
+import link_cache
+from database import Database
+from link_cache import LinkResolveCache
+
+def test_link_cache():
+    """测试命中、过期和容量淘汰"""
+    print("🧪 测试链接解析缓存")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'test.db'))
+        cache = LinkResolveCache(db, max_entries=3)
+
+        assert cache.get('link-a') is None
+        cache.put('link-a', 'https://mp.weixin.qq.com/s/a', elapsed=4.0)
+        assert cache.get('link-a') == 'https://mp.weixin.qq.com/s/a'
+
+        # 重启后仍然有效
+        cache = LinkResolveCache(db, max_entries=3)
+        assert cache.get('link-a') == 'https://mp.weixin.qq.com/s/a'
+
+        # 过期条目视为未命中
+        expired = LinkResolveCache(db, ttl_seconds=-1)
+        assert expired.get('link-a') is None
+        assert expired.get_stats()['expired'] == 1
+
+        # 超出容量时淘汰最久未使用的条目
+        old_every = link_cache.EVICT_EVERY
+        link_cache.EVICT_EVERY = 1
+        try:
+            for name in 'bcde':
+                cache.put(f'link-{name}', f'https://mp.weixin.qq.com/s/{name}', elapsed=4.0)
+        finally:
+            link_cache.EVICT_EVERY = old_every
+        stats = cache.get_stats()
+        assert stats['entries'] == 3
+        assert cache.get('link-a') is None
+        assert cache.get('link-e') == 'https://mp.weixin.qq.com/s/e'
+
+        stats = cache.get_stats()
+        print(f"📊 {stats}")
+        assert stats['hits'] == 2
+        assert stats['saved_seconds'] == 8.0
+        db.close()
+
+    print("✅ 链接解析缓存测试通过")
+
+
+if __name__ == "__main__":
+    test_link_cache()
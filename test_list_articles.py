@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试文章列表的游标分页
+"""
+
+import base64
+import os
+import tempfile
+from database import Database, decode_cursor, encode_cursor
+from tests_util import make_article
+
+
+def read_all(db: Database, keyword_id=None, limit=3) -> list:
+    """按游标逐页读取全部文章"""
+    ids = []
+    cursor = None
+    while True:
+        page = db.list_articles(keyword_id, limit, cursor)
+        assert len(page['articles']) <= limit
+        ids.extend(a['id'] for a in page['articles'])
+        cursor = page['next_cursor']
+        if not cursor:
+            return ids
+
+
+def test_list_articles():
+    """测试相同抓取时间的文章分页不重复不遗漏、按关键词过滤、无效游标"""
+    print("🧪 测试文章列表分页")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'test.db'))
+        first = db.add_keyword('分页一')
+        second = db.add_keyword('分页二')
+
+        # 每4篇共用同一个抓取时间，页大小3会把同一时间的文章切到两页
+        for i in range(14):
+            db.add_article(make_article(i, scrape_time=f'2025-01-0{1 + i // 4} 08:00:00'), first if i % 2 else second)
+
+        pages = read_all(db)
+        expected = [a['id'] for a in db.list_articles(limit=100)['articles']]
+        print(f"📊 {len(pages)} 篇文章")
+        assert len(expected) == 14
+        assert pages == expected, "分页结果与一次读取不一致"
+
+        # 按关键词过滤
+        for keyword_id in (first, second):
+            ids = read_all(db, keyword_id, limit=2)
+            assert len(ids) == 7 and len(set(ids)) == 7
+            assert all(a['keyword_id'] == keyword_id
+                       for a in db.list_articles(keyword_id, 100)['articles'])
+
+        # 正好取完时最后一页为空
+        page = db.list_articles(limit=14)
+        assert page['next_cursor']
+        assert db.list_articles(limit=14, cursor=page['next_cursor']) == {'articles': [], 'next_cursor': None}
+
+        # 无效游标
+        assert decode_cursor(encode_cursor('2025-01-01 08:00:00', 5)) == ('2025-01-01 08:00:00', 5)
+        bad_cursors = ['not-base64!', base64.urlsafe_b64encode(b'{"a": 1}').decode('ascii'),
+                       base64.urlsafe_b64encode(b'["2025-01-01", "x"]').decode('ascii')]
+        for bad in bad_cursors:
+            for parse in (decode_cursor, lambda c: db.list_articles(cursor=c)):
+                try:
+                    parse(bad)
+                except ValueError:
+                    pass
+                else:
+                    raise AssertionError(f"无效游标没有报错: {bad}")
+        db.close()
+    print("✅ 文章列表分页测试通过")
+
+
+if __name__ == "__main__":
+    test_list_articles()
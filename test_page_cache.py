@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试页面缓存的过期和并发未命中合并
+"""
+
+import threading
+import time
+from page_cache import PageCache
+from precompress import PageVariants
+
+def test_page_cache():
+    """测试版本失效、TTL过期和单次渲染"""
+    print("🧪 测试页面缓存")
+    print("=" * 50)
+
+    cache = PageCache(max_bytes=1024, ttl_seconds=0.05)
+    cache.put(1, b'page', version='v1')
+    assert cache.get(1, 'v1') == b'page'
+    assert cache.get(1, 'v2') is None
+
+    cache.put(1, b'page', version='v1')
+    time.sleep(0.06)
+    assert cache.get(1, 'v1') is None
+    assert cache.get_stats()['expired'] == 1
+
+    # 8个线程同时请求同一个未缓存的页面，只渲染一次
+    calls = []
+    started = threading.Event()
+
+    def render():
+        calls.append(1)
+        started.set()
+        time.sleep(0.05)
+        return b'rendered'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_render(2, 'v1', render)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [b'rendered'] * 8
+    assert len(calls) == 1
+    stats = cache.get_stats()
+    assert stats['renders'] == 1 and stats['coalesced'] + stats['renders'] <= 8
+    print(f"📊 渲染 {stats['renders']} 次，合并 {stats['coalesced']} 次")
+
+    # 页面不存在时不缓存
+    assert cache.get_or_render(3, 'v1', lambda: None) is None
+    assert cache.get(3, 'v1') is None
+    # 在本次未命中之后、取得渲染权之前已被写入缓存的页面不再重新渲染
+    cache.put(4, b'cached', version='v1')
+    cache.get = lambda key, version: None
+    assert cache.get_or_render(4, 'v1', lambda: b'rendered again') == b'cached'
+    del cache.get
+    print("✅ 页面缓存测试通过")
+
+def test_page_variants_growth():
+    """测试按需生成的压缩副本计入缓存容量，超出时淘汰"""
+    page = ''.join(f'<p>第{i}段</p>' for i in range(2000)).encode('utf-8')
+    variants = PageVariants.from_content(page)
+    cache = PageCache(max_bytes=len(page) * 3 // 2 + 10)
+    cache.put(1, b'x' * (len(page) // 2))
+    cache.put(2, variants)
+    assert cache.get_stats()['bytes'] == len(page) + len(page) // 2
+
+    # 第一次请求gzip时生成副本，缓存总量随之增加并淘汰最久未使用的条目
+    status, body, _ = variants.respond('gzip', None)
+    assert status == 200 and len(variants) == len(page) + len(body)
+    assert cache.get_stats()['bytes'] == len(variants)
+    assert cache.get(1) is None and cache.get(2) is variants
+
+    # 被替换的旧对象再生成副本不影响缓存大小
+    cache.put(2, b'new')
+    del variants.bodies['gzip']
+    variants.body('gzip')
+    assert cache.get_stats()['bytes'] == 3
+    print("✅ 压缩副本计入缓存容量")
+
+if __name__ == "__main__":
+    test_page_cache()
+    test_page_variants_growth()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试解析进程池（线程内解析、在途上限、map顺序、解析中调整进程数）
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from parse_pool import PENDING_PER_WORKER, ParsePool
+
+
+def page(i: int):
+    html = f'<html><body><h1 id="activity-name">标题{i}</h1><div id="js_content"><p>正文{i}</p></div></body></html>'
+    return html.encode('utf-8'), 'utf-8'
+
+
+class SlowExecutor:
+    """在线程中慢速执行任务，记录同时在途的任务数"""
+
+    def __init__(self):
+        self.threads = ThreadPoolExecutor(max_workers=32)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def submit(self, func, *args):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        def run():
+            time.sleep(0.02)
+            try:
+                return func(*args)
+            finally:
+                with self.lock:
+                    self.in_flight -= 1
+
+        return self.threads.submit(run)
+
+    def shutdown(self, wait=True):
+        self.threads.shutdown(wait=wait)
+
+
+def test_inline_parse():
+    """workers为0时在调用线程解析，不启动进程池"""
+    pool = ParsePool(0)
+    assert pool.current is None
+    assert pool.parse(*page(1))['title'] == '标题1'
+    assert [a['content'] for a in pool.map(page(i) for i in range(3))] == ['正文0', '正文1', '正文2']
+    assert pool.get_stats() == {'workers': 0, 'parsed': 4}
+
+
+def test_in_flight_cap():
+    """并发调用 parse 和批量 map 时在途页面数不超过 workers * PENDING_PER_WORKER"""
+    print("🧪 测试解析在途上限")
+    print("=" * 50)
+
+    pool = ParsePool(2)
+    limit = 2 * PENDING_PER_WORKER
+    assert pool.current.limit == limit
+    pool.current.executor.shutdown()
+    pool.current.executor = slow = SlowExecutor()
+
+    threads = [threading.Thread(target=pool.parse, args=page(i)) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"📊 parse 最多同时在途 {slow.max_in_flight}")
+    assert slow.max_in_flight == limit
+
+    slow.max_in_flight = 0
+    titles = [a['title'] for a in pool.map(page(i) for i in range(20))]
+    assert titles == [f'标题{i}' for i in range(20)], "map 结果没有按输入顺序返回"
+    assert slow.max_in_flight == limit
+    assert pool.get_stats()['parsed'] == 40
+    pool.shutdown()
+    print("✅ 解析在途上限测试通过")
+
+
+def test_resize_while_parsing():
+    """解析进行中调整进程数，阻塞在配额上的线程和进行中的 map 都能完成"""
+    print("🧪 测试解析中调整进程数")
+    print("=" * 50)
+
+    pool = ParsePool(1)
+    results, errors = {}, []
+
+    def parse(i):
+        try:
+            results[i] = pool.parse(*page(i))['title']
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=parse, args=(i,)) for i in range(12)]
+    for thread in threads:
+        thread.start()
+    batch = pool.map(page(i) for i in range(12))
+    first = next(batch)
+
+    # 旧进程池还有线程在排队，调整后由最后一个使用者关闭
+    old = pool.current
+    pool.resize(2)
+    pool.resize(0)
+    rest = list(batch)
+    for thread in threads:
+        thread.join()
+
+    assert errors == [], errors
+    assert results == {i: f'标题{i}' for i in range(12)}
+    assert [a['title'] for a in [first] + rest] == [f'标题{i}' for i in range(12)]
+    assert old.retired and old.users == 0
+    assert pool.current is None and pool.parse(*page(0))['title'] == '标题0'
+    print("✅ 解析中调整进程数测试通过")
+
+
+if __name__ == "__main__":
+    test_inline_parse()
+    test_in_flight_cap()
+    test_resize_while_parsing()
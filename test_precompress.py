@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试预压缩页面
+"""
+
+import gzip
+import os
+import tempfile
+import time
+from page_cache import PageCache
+from precompress import PageVariants, write_page
+
+def test_precompress():
+    """测试压缩副本写出、编码协商、ETag和过期副本"""
+    print("🧪 测试预压缩页面")
+    print("=" * 50)
+
+    page = ('<html><body>' + '推荐阅读' * 200 + '</body></html>').encode('utf-8')
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'page.html')
+        write_page(path, page)
+        assert os.path.exists(path + '.gz')
+
+        variants = PageVariants.load(path)
+        status, body, headers = variants.respond('gzip, deflate', None)
+        headers = dict(headers)
+        assert status == 200 and headers['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(body) == page
+        assert headers['Content-Length'] == str(len(body))
+        assert headers['ETag'] == variants.etag('gzip') != variants.etag('identity')
+
+        status, body, headers = variants.respond(None, None)
+        assert status == 200 and body == page and 'Content-Encoding' not in dict(headers)
+        assert variants.negotiate('gzip;q=0') == 'identity'
+
+        # 同一编码的ETag匹配时返回304，不同编码的ETag不匹配
+        assert variants.respond('gzip', variants.etag('gzip'))[0] == 304
+        assert variants.respond('gzip', f'W/{variants.etag("gzip")}, "other"')[0] == 304
+        assert variants.respond('gzip', variants.etag('identity'))[0] == 200
+
+        # 比页面旧的副本不使用
+        time.sleep(0.01)
+        new_page = page.replace('推荐'.encode('utf-8'), '相关'.encode('utf-8'))
+        with open(path, 'wb') as f:
+            f.write(new_page)
+        os.utime(path + '.gz', (0, 0))
+        status, body, _ = PageVariants.load(path).respond('gzip', None)
+        assert gzip.decompress(body) == new_page
+        # 只写页面不写副本时删除旧副本，读取时缺少的副本现场压缩
+        write_page(path, page, ())
+        assert not os.path.exists(path + '.gz')
+        status, body, _ = PageVariants.load(path).respond('gzip', None)
+        assert gzip.decompress(body) == page
+        # 没有磁盘副本的页面只在协商选中时现场压缩
+        cache = PageCache(max_bytes=1024 * 1024)
+        variants = PageVariants.from_content(new_page)
+        cache.put('page', variants)
+        assert set(variants.bodies) == {'identity'}
+        status, body, _ = variants.respond('gzip', None)
+        assert gzip.decompress(body) == new_page and set(variants.bodies) == {'identity', 'gzip'}
+        cache.invalidate('page')
+        assert cache.get_stats()['bytes'] == 0
+        print(f"📊 原文 {len(page)} 字节，gzip {len(variants.bodies['gzip'])} 字节")
+    print("✅ 预压缩页面测试通过")
+
+if __name__ == "__main__":
+    test_precompress()
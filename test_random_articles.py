@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试随机推荐抽样（id区间有空洞时的rowid探测和小区间全量抽样）
+"""
+
+import os
+import random
+import tempfile
+from database import Database
+from tests_util import make_article
+
+
+def test_random_articles_with_gaps():
+    """测试删除大段文章后仍能抽满、不重复、只返回现存文章并排除当前文章"""
+    print("🧪 测试随机推荐抽样")
+    print("=" * 50)
+
+    random.seed(2025)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'test.db'))
+        saved = db.add_articles_bulk(make_article(i) for i in range(400))
+
+        # 删掉大部分文章，留下几段不连续的id
+        kept = saved[:20] + saved[200:210] + saved[-20:]
+        removed = [a['id'] for a in saved if a not in kept]
+        conn = db.pool.acquire()
+        try:
+            conn.executemany('DELETE FROM articles WHERE id = ?', [(i,) for i in removed])
+            conn.commit()
+        finally:
+            db.pool.release(conn)
+        kept_ids = {a['id'] for a in kept}
+
+        # id区间远大于 limit*4，走rowid探测
+        exclude = kept[0]['url_number']
+        for _ in range(20):
+            articles = db.get_random_articles(10, exclude_url_number=exclude)
+            ids = [a['id'] for a in articles]
+            assert len(ids) == 10 and len(set(ids)) == 10
+            assert set(ids) <= kept_ids
+            assert exclude not in [a['url_number'] for a in articles]
+            assert 'content' not in articles[0]
+
+        # 探测会偏向空洞之后的文章，但每篇文章都有机会被抽到
+        seen = set()
+        for _ in range(200):
+            seen.update(a['id'] for a in db.get_random_articles(10))
+        assert seen == kept_ids
+
+        # 要求的数量超过现存文章时走全量抽样，返回全部
+        articles = db.get_random_articles(len(kept_ids) + 5, exclude_url_number=exclude)
+        assert {a['id'] for a in articles} == kept_ids - {kept[0]['id']}
+        assert db.get_random_articles(0) == []
+        db.close()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'test.db'))
+        assert db.get_random_articles(5) == []
+        db.close()
+    print("✅ 随机推荐抽样测试通过")
+
+
+def test_random_articles_sequential_fill():
+    """探测大多落在同一篇文章时，用一次区间查询补足，跳过已抽到的文章"""
+    random.seed(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'test.db'))
+        saved = db.add_articles_bulk(make_article(i) for i in range(11))
+        conn = db.pool.acquire()
+        try:
+            # 前10篇集中在开头，最后一篇之前留下很大的空洞
+            conn.execute('UPDATE articles SET id = 100000 WHERE id = ?', (saved[-1]['id'],))
+            conn.commit()
+        finally:
+            db.pool.release(conn)
+
+        statements = []
+        conn = db.pool.acquire()
+        conn.set_trace_callback(statements.append)
+        try:
+            articles = db.get_random_articles(10, exclude_url_number=saved[0]['url_number'])
+        finally:
+            conn.set_trace_callback(None)
+            db.pool.release(conn)
+
+        ids = [a['id'] for a in articles]
+        assert len(ids) == 10 and len(set(ids)) == 10
+        assert saved[0]['id'] not in ids
+        assert len([sql for sql in statements if 'UNION ALL' in sql]) == 1
+        db.close()
+
+
+if __name__ == "__main__":
+    test_random_articles_with_gaps()
+    test_random_articles_sequential_fill()
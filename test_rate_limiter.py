@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试令牌桶和主机自适应限速（使用可控的时钟）
+"""
+
+from types import SimpleNamespace
+from fetch_engine import BLOCK_PAUSE_SECONDS, INCREASE_STEP, MAX_PAUSE_SECONDS, HostRateLimiter, TokenBucket
+from http_client import HttpClient, is_blocked
+
+
+class FakeClock:
+    """手动推进的时钟"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+def test_token_bucket():
+    """测试预订等待时间、调整速率和暂停"""
+    print("🧪 测试令牌桶")
+    print("=" * 50)
+
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2.0, capacity=3, clock=clock)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.reserve() == 0.5          # 突发配额用完后按速率排队
+    clock.advance(0.5)
+    assert bucket.reserve() == 0.5
+
+    # 调整速率前按旧速率结算已经过的时间
+    bucket = TokenBucket(rate=1.0, capacity=1, clock=clock)
+    assert bucket.reserve() == 0.0
+    clock.advance(0.5)
+    bucket.set_rate(4.0)
+    assert bucket.reserve() == 0.125
+
+    # 暂停：取消突发配额，下一个请求在正常间隔之外再等待暂停时间
+    bucket = TokenBucket(rate=1.0, capacity=5, clock=clock)
+    bucket.pause(10)
+    assert bucket.reserve() == 10.0
+    clock.advance(10)
+    assert bucket.reserve() == 1.0
+
+    print("✅ 令牌桶测试通过")
+
+
+def test_host_rate_limiter():
+    """测试AIMD速率范围、连续拦截时暂停翻倍和恢复后重置"""
+    print("🧪 测试主机自适应限速")
+    print("=" * 50)
+
+    clock = FakeClock()
+    url = 'https://example.com/page'
+    limiter = HostRateLimiter(limits={'example.com': (0.5, 1)}, bounds={'example.com': (0.1, 0.6)}, clock=clock)
+    bucket = limiter.bucket('example.com')
+    assert bucket.clock is clock
+
+    # 正常响应加性提速，不超过上限
+    limiter.record_success(url)
+    assert abs(bucket.rate - (0.5 + INCREASE_STEP)) < 1e-9
+    for _ in range(100):
+        limiter.record_success(url)
+    assert bucket.rate == 0.6
+
+    # 连续拦截：速率减半（不低于下限），暂停 30 -> 60 -> ... 最长600秒
+    pauses = [limiter.record_blocked(url) for _ in range(7)]
+    assert pauses == [30, 60, 120, 240, 480, 600, 600]
+    assert BLOCK_PAUSE_SECONDS == 30 and MAX_PAUSE_SECONDS == 600
+    assert bucket.rate == 0.1
+
+    # 暂停期间请求需要等待，时间推进后恢复
+    assert bucket.reserve() > 600
+    clock.advance(10000)
+    assert bucket.reserve() == 0.0
+
+    # 恢复正常后连续拦截计数清零，下次拦截重新从30秒开始
+    limiter.record_success(url)
+    assert limiter.record_blocked(url) == 30
+
+    stats = limiter.get_stats()['hosts']['example.com']
+    print(f"📊 {stats}")
+    assert stats['blocked'] == 8 and stats['consecutive_blocks'] == 1
+
+    # 其他主机不受影响
+    assert limiter.bucket('other.com').rate == limiter.default[0]
+    print("✅ 主机自适应限速测试通过")
+
+
+def test_is_blocked():
+    """测试拦截信号的识别"""
+    page = 'https://mp.weixin.qq.com/s/page'
+    assert is_blocked(SimpleNamespace(status_code=429, url=page))
+    assert is_blocked(SimpleNamespace(status_code=503, url=page))
+    assert is_blocked(SimpleNamespace(status_code=200, url='https://weixin.sogou.com/antispider/?from=x'))
+    assert is_blocked(SimpleNamespace(status_code=200, url='https://mp.weixin.qq.com/mp/wappoc_appmsgcaptcha?x=1'))
+    assert not is_blocked(SimpleNamespace(status_code=200, url=page))
+    assert not is_blocked(SimpleNamespace(status_code=404, url=page))
+
+    # 搜索页原地返回的验证码页面按文字识别，文章页不检查文字
+    search = 'https://weixin.sogou.com/weixin?type=2&query=x'
+    assert is_blocked(SimpleNamespace(status_code=200, url=search, text='<p>请输入验证码</p>'))
+    assert not is_blocked(SimpleNamespace(status_code=200, url=search, text='<p>请输入验证码</p>'), check_text=False)
+    assert not is_blocked(SimpleNamespace(status_code=200, url=search, text='<p>搜索结果</p>'))
+    assert not is_blocked(SimpleNamespace(status_code=200, url=page, text='<p>如何找回验证码</p>'))
+
+
+def test_repeated_captcha_pages():
+    """测试连续的验证码页面每次只记一次拦截，暂停时间逐次翻倍"""
+    print("🧪 测试连续验证码页面")
+    print("=" * 50)
+
+    clock = FakeClock()
+    search = 'https://weixin.sogou.com/weixin?type=2&query=x'
+    limiter = HostRateLimiter(limits={'weixin.sogou.com': (0.2, 1)}, clock=clock)
+    pauses = []
+    record_blocked = limiter.record_blocked
+    limiter.record_blocked = lambda url: pauses.append(record_blocked(url))
+
+    captcha = SimpleNamespace(status_code=200, ok=True, url=search, text='<p>请输入验证码</p>')
+    antispider = SimpleNamespace(status_code=200, ok=True, text='<p>请输入验证码</p>',
+                                 url='https://weixin.sogou.com/antispider/?from=x')
+    responses = [captcha, captcha, captcha, antispider]
+    client = HttpClient(rate_limiter=limiter, pool_sizes={}, cookie_file=None, cache_dir=None)
+    client.session = SimpleNamespace(request=lambda method, url, **kwargs: responses.pop(0))
+
+    for _ in range(4):
+        clock.advance(10000)   # 跳过暂停，请求不实际等待
+        assert is_blocked(client.get(search))
+
+    stats = limiter.get_stats()['hosts']['weixin.sogou.com']
+    print(f"📊 {stats}")
+    assert pauses == [30, 60, 120, 240]
+    assert stats['consecutive_blocks'] == 4 and stats['blocked'] == 4
+    print("✅ 连续验证码页面测试通过")
+
+
+if __name__ == "__main__":
+    test_token_bucket()
+    test_host_rate_limiter()
+    test_is_blocked()
+    test_repeated_captcha_pages()
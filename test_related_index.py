@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试相关文章索引
+"""
+
+import os
+import tempfile
+from database import Database
+from url_canonical import canonical_key
+
+def read_df(db: Database) -> dict:
+    conn = db.pool.acquire()
+    try:
+        return dict(conn.execute('SELECT term, df FROM related_df').fetchall())
+    finally:
+        db.pool.release(conn)
+
+def test_related_index():
+    """测试增量索引、覆盖写入清理和全量重算"""
+    print("🧪 测试相关文章索引")
+    print("=" * 50)
+
+    topics = {
+        '移民': '加拿大移民政策签证申请永久居民身份',
+        '股票': '股票市场投资基金收益率上涨下跌',
+        '美食': '美食餐厅菜谱烹饪火锅川菜',
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'test.db'))
+        articles = [
+            {
+                'title': f'{topic}{i}', 'author': '作者', 'content': text * 3 + f'第{i}篇',
+                'url': f'https://mp.weixin.qq.com/s/{topic}{i}', 'word_count': 50,
+                'scrape_time': '2025-01-01 00:00:00'
+            }
+            for topic, text in topics.items() for i in range(4)
+        ]
+        saved = db.add_articles_bulk(articles)
+
+        # 每篇文章最相似的三篇都属于同一话题，新文章也进入了早先文章的近邻表
+        for article in saved:
+            related = db.get_related_articles(article['id'], 3)
+            assert [a['title'][:2] for a in related] == [article['title'][:2]] * 3, related
+        assert saved[-1]['id'] in [a['id'] for a in db.get_related_articles(saved[-4]['id'], 3)]
+
+        # 覆盖写入（重新采集）后旧id从近邻表中清除
+        old_id = saved[0]['id']
+        new_id = db.add_article(dict(articles[0], url_number=saved[0]['url_number']))
+        assert new_id != old_id
+        assert all(old_id not in [a['id'] for a in db.get_related_articles(article['id'], 15)]
+                   for article in saved[1:])
+        assert [a['title'][:2] for a in db.get_related_articles(new_id, 3)] == ['移民'] * 3
+
+        # 覆盖写入、重新提取、删除后，增量维护的文档频率与全量重算一致
+        db.update_extracted_articles([{
+            'canonical_key': canonical_key(articles[9]['url']),
+            'title': '美食新标题', 'author': '作者', 'content': '完全不同的正文内容火锅'
+        }])
+        conn = db.pool.acquire()
+        try:
+            conn.execute('DELETE FROM articles WHERE id = ?', (saved[10]['id'],))
+            conn.commit()
+        finally:
+            db.pool.release(conn)
+        assert db.process_index_queue() == 1
+        incremental = read_df(db)
+        assert incremental[''] == len(articles) - 1
+        assert db.rebuild_related_index() == len(articles) - 1
+        assert incremental == read_df(db)
+
+        db.add_article(articles[10])
+        assert db.rebuild_related_index() == len(articles)
+        related = db.get_related_articles(saved[5]['id'], 3)
+        assert [a['title'][:2] for a in related] == ['股票'] * 3
+        db.close()
+    print("✅ 相关文章索引测试通过")
+
+if __name__ == "__main__":
+    test_related_index()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试原始响应归档和离线重新提取
+"""
+
+import os
+import tempfile
+from types import SimpleNamespace
+from database import Database
+from manage import reextract
+from response_archive import ResponseArchive
+from tests_util import make_article
+
+PAGE = ('<html><head><meta charset="utf-8"></head><body><h1 id="activity-name">{title}</h1>'
+        '<span class="rich_media_meta_text">作者</span><div id="js_content"><p>{content}</p></div></body></html>')
+
+
+def test_response_archive():
+    """测试写入后按规范键读回、截断标记、段文件末尾不完整的记录被跳过"""
+    print("🧪 测试原始响应归档")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, 'archive')
+        archive = ResponseArchive(directory)
+        archive.append('https://mp.weixin.qq.com/s/a', 'k:a', b'<html>old</html>', 'utf-8')
+        archive.append('https://mp.weixin.qq.com/s/b', 'k:b', '<html>页面</html>'.encode('gbk'), 'gbk', truncated=True)
+        archive.append('https://mp.weixin.qq.com/s/a', 'k:a', b'<html>new</html>', 'utf-8')
+        archive.append('https://mp.weixin.qq.com/s/c', 'k:c', b'<html>c</html>' * 100, 'utf-8')
+
+        # 同一规范键读取最近一次
+        latest = archive.latest('k:a')
+        assert latest['content'] == b'<html>new</html>' and not latest['truncated']
+        latest = archive.latest('k:b')
+        assert latest['content'].decode('gbk') == '<html>页面</html>' and latest['encoding'] == 'gbk'
+        assert latest['truncated']
+        assert archive.latest('k:missing') is None
+
+        # 模拟写入中途退出：最后一条记录的gzip成员只剩一半
+        path = os.path.join(directory, archive.segment)
+        archive.close()
+        with open(path, 'r+b') as f:
+            f.truncate(os.path.getsize(path) - 40)
+
+        archive = ResponseArchive(directory)
+        entries = list(archive.iter_latest())
+        assert [e['canonical_key'] for e in entries] == ['k:b', 'k:a']
+        assert archive.latest('k:c') is None
+        stats = archive.get_stats()
+        print(f"📊 {stats}")
+        assert stats['records'] == 4 and stats['keys'] == 3 and stats['truncated'] == 1
+        assert stats['damaged_this_run'] == 2
+        archive.close()
+
+    print("✅ 原始响应归档测试通过")
+
+
+def test_reextract():
+    """测试 reextract 用归档页面原地更新文章（编号不变）并重新生成HTML"""
+    print("🧪 测试离线重新提取")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'test.db'))
+        html_file = os.path.join(tmp, 'page_0.html')
+        saved = db.add_articles_bulk([
+            make_article(0, canonical_key='k:0', html_file=html_file, content='旧的提取结果'),
+            make_article(1, canonical_key='k:1', title='标题1', author='作者', content='未变化'),
+        ])
+
+        archive = ResponseArchive(os.path.join(tmp, 'archive'))
+        archive.append('https://mp.weixin.qq.com/s/test0', 'k:0',
+                       PAGE.format(title='新标题', content='新的正文').encode('utf-8'), 'utf-8', truncated=True)
+        archive.append('https://mp.weixin.qq.com/s/test1', 'k:1',
+                       PAGE.format(title='标题1', content='未变化').encode('utf-8'), 'utf-8')
+        archive.close()
+
+        reextract(db, SimpleNamespace(archive=os.path.join(tmp, 'archive'), workers=0))
+
+        article = db.get_article_by_url_number(saved[0]['url_number'], include_content=True)
+        assert article['id'] == saved[0]['id']
+        assert (article['title'], article['content'], article['revision']) == ('新标题', '新的正文', 1)
+        with open(html_file, encoding='utf-8') as f:
+            assert '新的正文' in f.read()
+
+        # 内容没有变化的文章不更新
+        assert db.get_article_by_url_number(saved[1]['url_number'])['revision'] == 0
+        assert len(db.list_articles()['articles']) == 2
+        db.close()
+
+    print("✅ 离线重新提取测试通过")
+
+
+if __name__ == "__main__":
+    test_response_archive()
+    test_reextract()
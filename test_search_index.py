@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试全文索引（含从旧版数据库升级）
+"""
+
+import os
+import sqlite3
+import tempfile
+from database import Database
+from url_canonical import canonical_key
+
+# 升级前的表结构（没有规范键、统计计数和全文索引）
+LEGACY_SCHEMA = '''
+    CREATE TABLE keywords (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        keyword TEXT UNIQUE NOT NULL,
+        status TEXT DEFAULT 'active',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE articles (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        author TEXT,
+        content TEXT,
+        url TEXT UNIQUE NOT NULL,
+        keyword_id INTEGER,
+        scrape_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        word_count INTEGER DEFAULT 0,
+        html_file TEXT,
+        url_number INTEGER,
+        status TEXT DEFAULT 'scraped'
+    );
+    CREATE TABLE tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        keyword_id INTEGER,
+        task_type TEXT DEFAULT 'search',
+        status TEXT DEFAULT 'pending',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        started_at TIMESTAMP,
+        completed_at TIMESTAMP,
+        result TEXT,
+        error_message TEXT
+    );
+    CREATE TABLE url_counter (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        current_count INTEGER DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    INSERT INTO url_counter (current_count) VALUES (2);
+'''
+
+def test_search_index_upgrade():
+    """旧库升级后可检索已有文章，重新采集同一篇文章不会破坏索引"""
+    print("🧪 测试全文索引升级")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'legacy.db')
+        conn = sqlite3.connect(db_path)
+        conn.executescript(LEGACY_SCHEMA)
+        conn.executemany('''
+            INSERT INTO articles (title, author, content, url, word_count, url_number, scrape_time)
+            VALUES (?, ?, ?, ?, ?, ?, '2025-01-01 00:00:00')
+        ''', [
+            ('加拿大移民政策解读', '作者甲', '永久居民申请流程', 'https://mp.weixin.qq.com/s/o0', 8, 1),
+            ('股票市场周报', '作者乙', '基金收益率上涨', 'https://mp.weixin.qq.com/s/o1', 7, 2),
+        ])
+        conn.commit()
+        conn.close()
+
+        db = Database(db_path)
+        assert [r['title'] for r in db.search_articles('移民')['results']] == ['加拿大移民政策解读']
+
+        # 重新采集（INSERT OR REPLACE 触发删除旧索引行）
+        db.add_article({
+            'title': '加拿大移民新政', 'author': '作者甲', 'content': '永久居民申请流程更新',
+            'url': 'https://mp.weixin.qq.com/s/o0', 'word_count': 10, 'url_number': 1,
+            'scrape_time': '2025-02-01 00:00:00'
+        })
+        results = db.search_articles('移民')['results']
+        assert [r['title'] for r in results] == ['加拿大移民新政'], results
+        assert db.search_articles('政策解读')['total'] == 0
+
+        # 重新提取触发更新
+        db.update_extracted_articles([{
+            'canonical_key': canonical_key('https://mp.weixin.qq.com/s/o1'),
+            'title': '股票市场月报', 'author': '作者乙', 'content': '基金收益率下跌'
+        }])
+        assert [r['title'] for r in db.search_articles('月报')['results']] == ['股票市场月报']
+        assert db.search_articles('周报')['total'] == 0
+        db.close()
+    print("✅ 全文索引升级测试通过")
+
+if __name__ == "__main__":
+    test_search_index_upgrade()
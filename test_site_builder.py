@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试静态页面重建
+"""
+
+import os
+import tempfile
+import site_builder
+from database import Database
+from precompress import ENCODINGS, write_page
+from site_builder import SiteBuilder
+from url_canonical import canonical_key
+
+def test_site_builder():
+    """测试首次生成、跳过未变化页面和内容变化后重新生成"""
+    print("🧪 测试静态页面重建")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'test.db'))
+        db.add_articles_bulk([
+            {
+                'title': f'股票基金{i}', 'author': '作者', 'content': '股票市场投资基金收益' * 3,
+                'url': f'https://mp.weixin.qq.com/s/site{i}', 'word_count': 30,
+                'scrape_time': '2025-01-01 00:00:00', 'html_file': f'page_{i}.html'
+            }
+            for i in range(3)
+        ])
+        builder = SiteBuilder(db, output_dir=tmp)
+
+        stats = builder.rebuild()
+        assert stats['rendered'] == 3
+        with open(os.path.join(tmp, 'page_0.html'), encoding='utf-8') as f:
+            page = f.read()
+        assert '股票基金0' in page and '股票基金1' in page
+
+        assert builder.rebuild()['skipped'] == 3
+
+        # 采集时只写了页面、没有压缩副本的文件，重建时补齐副本
+        write_page(os.path.join(tmp, 'page_0.html'), page.encode('utf-8'), ())
+        assert builder.rebuild()['rendered'] == 1
+        assert all(os.path.exists(os.path.join(tmp, 'page_0.html' + suffix)) for _, suffix in ENCODINGS)
+
+        # 被删除的文件和内容变化的文章重新生成
+        os.remove(os.path.join(tmp, 'page_1.html'))
+        db.update_extracted_articles([{
+            'canonical_key': canonical_key('https://mp.weixin.qq.com/s/site2'), 'title': '股票基金2', 'author': '新作者', 'content': '股票市场投资基金收益'
+        }])
+        stats = builder.rebuild()
+        assert stats['rendered'] >= 2 and os.path.exists(os.path.join(tmp, 'page_1.html')), stats
+
+        # 模板版本变化后全部重新生成
+        original_version = site_builder.TEMPLATE_VERSION
+        site_builder.TEMPLATE_VERSION = 'changed'
+        try:
+            assert builder.rebuild()['rendered'] == 3
+        finally:
+            site_builder.TEMPLATE_VERSION = original_version
+        assert not [name for name in os.listdir(tmp) if '.tmp-' in name]
+        db.close()
+    print("✅ 静态页面重建测试通过")
+
+if __name__ == "__main__":
+    test_site_builder()
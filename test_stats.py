@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试触发器维护的统计计数
+"""
+
+import os
+import tempfile
+from datetime import datetime
+from database import Database
+from tests_util import make_article
+
+
+def test_stats():
+    """测试写入、覆盖写入、任务状态变化后计数与全量重算一致"""
+    print("🧪 测试统计计数")
+    print("=" * 50)
+
+    today = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'test.db'))
+
+        keyword_id = db.add_keyword('统计')
+        db.add_keyword('统计')  # 重复关键词不计数
+        db.add_article(make_article(0, scrape_time='2025-01-01 08:00:00'), keyword_id)
+        db.add_articles_bulk([make_article(1, scrape_time=today), make_article(2, scrape_time=today)], keyword_id)
+
+        # 覆盖写入同一篇文章：总数不变，时间分桶从旧日期移到今天
+        db.add_article(make_article(0, scrape_time=today), keyword_id)
+
+        running = db.add_task(keyword_id, 'auto_scrape')
+        db.update_task_status(running, 'running')
+        done = db.add_task(keyword_id, 'auto_scrape')
+        db.update_task_status(done, 'running')
+        db.update_task_status(done, 'completed', '{}')
+        failed = db.add_task(keyword_id)
+        db.update_task_status(failed, 'failed', error='测试失败')
+
+        stats = db.get_stats()
+        print(f"📊 {stats}")
+        assert stats['keyword_count'] == 1
+        assert stats['article_count'] == 3
+        assert stats['today_articles'] == 3
+        assert stats['task_stats'] == {'running': 1, 'completed': 1, 'failed': 1}
+        assert {'bucket': '2025-01-01', 'count': 1} not in db.get_article_time_buckets('day')
+
+        # 触发器维护的计数与全量重算一致
+        assert db.rebuild_stats() == {}
+        db.close()
+    print("✅ 统计计数测试通过")
+
+if __name__ == "__main__":
+    test_stats()
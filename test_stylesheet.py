@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试带版本号的文章样式表路由和模板版本
+"""
+
+import os
+import tempfile
+from renderer import STYLESHEET, STYLESHEET_URL, STYLESHEET_VERSION, _template_text
+from tests_util import import_web_app, make_article
+
+
+def test_stylesheet_route():
+    """测试两个Web应用的样式表地址：长期缓存、ETag、304，页面引用带版本号的地址"""
+    print("🧪 测试样式表路由")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ('app', 'admin_app'):
+            module, db = import_web_app(name, os.path.join(tmp, f'{name}.db'))
+            client = module.app.test_client()
+
+            response = client.get(STYLESHEET_URL)
+            assert response.status_code == 200 and response.data == STYLESHEET
+            assert response.mimetype == 'text/css'
+            assert 'immutable' in response.headers['Cache-Control']
+            assert response.headers['ETag'] == f'"{STYLESHEET_VERSION}"'
+
+            response = client.get(STYLESHEET_URL, headers={'If-None-Match': f'"{STYLESHEET_VERSION}"'})
+            assert response.status_code == 304 and response.data == b''
+            db.close()
+            print(f"✅ {name}: {STYLESHEET_URL}")
+
+        # 按需渲染的文章页引用带版本号的样式表，不再内联样式
+        app, db = import_web_app('app', os.path.join(tmp, 'page.db'))
+        url_number = db.add_articles_bulk([make_article(0)])[0]['url_number']
+        page = app.app.test_client().get(f'/new/{url_number}').get_data(as_text=True)
+        assert f'<link rel="stylesheet" href="{STYLESHEET_URL}">' in page
+        assert '<style>' not in page
+        db.close()
+
+    print("✅ 样式表路由测试通过")
+
+
+def test_template_version():
+    """测试模板版本只取决于模板文字，不受文档字符串和注释影响"""
+    def render_a(data):
+        """说明一"""
+        return f"<h1>{data['title']}</h1>"
+
+    def render_b(data):
+        """说明二，修改了文档字符串"""
+        # 增加了注释
+        return f"<h1>{data['title']}</h1>"
+
+    def render_c(data):
+        """说明一"""
+        return f"<h2>{data['title']}</h2>"
+
+    assert _template_text(render_a) == _template_text(render_b)
+    assert _template_text(render_a) != _template_text(render_c)
+
+
+if __name__ == "__main__":
+    test_stylesheet_route()
+    test_template_version()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试URL规范化
+"""
+
+import os
+import tempfile
+from types import SimpleNamespace
+import scraper
+from tests_util import import_web_app, make_article
+from url_canonical import canonical_key, extract_permanent_link
+
+def test_canonical_key():
+    """测试同一文章的不同链接得到同一个规范键"""
+    print("🧪 测试URL规范化")
+    print("=" * 50)
+
+    # __biz/mid/idx 形式，忽略sn、分享参数和协议
+    a = 'https://mp.weixin.qq.com/s?__biz=MzA3MTI0OTgwMQ==&mid=2650&idx=1&sn=abc&chksm=1&scene=21#wechat_redirect'
+    b = 'http://mp.weixin.qq.com/s?__biz=MzA3MTI0OTgwMQ%3D%3D&mid=2650&idx=1&sn=abc'
+    assert canonical_key(a) == canonical_key(b)
+    assert canonical_key(a) != canonical_key(a.replace('idx=1', 'idx=2'))
+
+    # /s/<id> 短链接
+    assert canonical_key('https://mp.weixin.qq.com/s/AbC_d-1') == canonical_key('https://mp.weixin.qq.com/s/AbC_d-1?scene=1')
+
+    # 搜狗临时链接，只有时间戳不同
+    t1 = 'https://mp.weixin.qq.com/s?src=11&timestamp=1757648270&ver=6231&signature=xyz&new=1'
+    t2 = 'https://mp.weixin.qq.com/s?src=11&timestamp=1757649999&ver=6232&signature=xyz&new=1'
+    assert canonical_key(t1) == canonical_key(t2)
+    print(f"✅ 规范键: {canonical_key(a)}")
+
+    # 从页面提取永久链接
+    html = 'var msg_link = "http://mp.weixin.qq.com/s?__biz=MzA3MTI0OTgwMQ==&amp;mid=2650&amp;idx=1&amp;sn=abc#rd";'
+    assert canonical_key(extract_permanent_link(html)) == canonical_key(a)
+    assert extract_permanent_link('<html></html>') is None
+    print("✅ 永久链接提取正常")
+
+def test_rescrape_temporary_link():
+    """测试临时链接重新采集到已有文章时，旧编号按永久链接的规范键找到并被释放"""
+    permanent = 'http://mp.weixin.qq.com/s?__biz=MzA3MTI0OTgwMQ==&mid=2650&idx=1&sn=abc'
+    temporary = 'https://mp.weixin.qq.com/s?src=11&timestamp=1757648270&signature=temp'
+    with tempfile.TemporaryDirectory() as tmp:
+        app, db = import_web_app('app', os.path.join(tmp, 'test.db'))
+        old = db.add_articles_bulk([make_article(0, url=permanent)])[0]['url_number']
+        app.page_cache.put(old, app.PageVariants.from_content('<html>旧页面</html>'.encode('utf-8')), version=None)
+
+        result = make_article(1, url=temporary, canonical_key=canonical_key(permanent))
+        scraper._scraper = SimpleNamespace(scrape_article=lambda url: dict(result),
+                                           save_html=lambda *args: None)
+        try:
+            app.scrape_article_async(temporary)
+        finally:
+            scraper._scraper = None
+
+        new = app.scraping_status['url_number']
+        assert app.scraping_status['error'] is None and new != old
+        assert db.get_article_by_url_number(old) is None
+        assert db.get_article_by_url_number(new)['url'] == temporary
+        assert app.page_cache.get(old, None) is None
+        db.close()
+    print("✅ 临时链接重新采集时释放旧编号")
+
+if __name__ == "__main__":
+    test_canonical_key()
+    test_rescrape_temporary_link()
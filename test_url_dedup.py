@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试URL去重索引
+"""
+
+import os
+import tempfile
+from database import Database
+from tests_util import make_article
+
+def test_url_dedup():
+    """测试布隆过滤器去重"""
+    print("🧪 测试URL去重索引")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'test.db'), dedup_memory_bytes=16 * 1024)
+
+        db.add_article(make_article(0, url='https://mp.weixin.qq.com/s/exists'))
+
+        # 加载后新写入的文章也能被识别
+        assert db.is_article_exists('https://mp.weixin.qq.com/s/exists')
+        db.add_articles_bulk([make_article(1, url='https://mp.weixin.qq.com/s/bulk')])
+        assert db.is_article_exists('https://mp.weixin.qq.com/s/bulk')
+
+        # 同一批中两个临时链接解析到同一篇文章时只写入一篇，编号与id一一对应
+        saved = db.add_articles_bulk([
+            make_article(i, url=f'https://mp.weixin.qq.com/s?src=11&timestamp={i}&signature=temp{i}',
+                         canonical_key='b:duplicate')
+            for i in (2, 3)
+        ])
+        assert len(saved) == 1 and saved[0]['title'] == '测试文章3'
+        stored = db.get_article_by_url_number(saved[0]['url_number'])
+        assert stored['id'] == saved[0]['id'] and stored['title'] == '测试文章3'
+
+        # 搜狗链接别名：保存时记录 url 参数，再次搜索到同一链接时无需解析跳转
+        sogou_key = 'http://mp.weixin.qq.com/s?src=11&timestamp=1&signature=sogou'
+        db.add_articles_bulk([make_article(4, url='https://mp.weixin.qq.com/s?src=11&timestamp=2&signature=sogou',
+                                           canonical_key='b:sogou', link_key=sogou_key)])
+        assert db.is_link_stored(sogou_key)
+        assert not db.is_link_stored('http://mp.weixin.qq.com/s?src=11&timestamp=1&signature=other')
+
+        # 不存在的URL不会被误判为已存在
+        for i in range(1000):
+            assert not db.is_article_exists(f'https://mp.weixin.qq.com/s/new{i}')
+
+        stats = db.url_index.get_stats()
+        print(f"✅ 去重统计: {stats}")
+        assert stats['definitely_new'] + stats['false_positives'] == 1000
+
+        db.close()
+
+if __name__ == "__main__":
+    test_url_dedup()
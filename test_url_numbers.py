@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试URL编号的并发预留（多线程、多进程、旧版SQLite回退分支）
+"""
+
+import multiprocessing
+import os
+import tempfile
+import threading
+import database
+from database import Database
+
+THREADS = 8
+ROUNDS = 25
+BLOCK = 3
+
+
+def reserve_numbers(db: Database, worker: int) -> list:
+    """交替按块预留和逐个获取编号，返回得到的全部编号区间"""
+    ranges = []
+    for i in range(ROUNDS):
+        if (worker + i) % 2:
+            ranges.append(db.reserve_url_numbers(BLOCK))
+        else:
+            number = db.get_next_url_number()
+            ranges.append(range(number, number + 1))
+    return ranges
+
+
+def process_worker(args) -> list:
+    """在子进程中打开同一个数据库文件预留编号"""
+    db_path, worker, returning = args
+    database.HAS_RETURNING = returning
+    db = Database(db_path)
+    try:
+        return [(r.start, r.stop) for r in reserve_numbers(db, worker)]
+    finally:
+        db.close()
+
+
+def assert_contiguous(ranges, workers: int):
+    """各区间互不重叠，合起来正好是从1开始的连续编号"""
+    assert len(ranges) == workers * ROUNDS
+    for r in ranges:
+        assert r.step == 1 and len(r) in (1, BLOCK)
+    numbers = sorted(n for r in ranges for n in r)
+    assert len(numbers) == len(set(numbers)), "编号重复"
+    assert numbers == list(range(1, len(numbers) + 1)), "编号不连续"
+
+
+def run_threads(db_path: str):
+    db = Database(db_path)
+    results = [None] * THREADS
+
+    def run(worker):
+        results[worker] = reserve_numbers(db, worker)
+
+    threads = [threading.Thread(target=run, args=(worker,)) for worker in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    db.close()
+    return [r for ranges in results for r in ranges]
+
+
+def test_url_numbers_threads():
+    """多线程并发预留，分别测试 RETURNING 和旧版SQLite的回退分支"""
+    print("🧪 测试URL编号并发预留")
+    print("=" * 50)
+
+    original = database.HAS_RETURNING
+    try:
+        for returning in (original, False):
+            database.HAS_RETURNING = returning
+            with tempfile.TemporaryDirectory() as tmp:
+                ranges = run_threads(os.path.join(tmp, 'test.db'))
+                assert_contiguous(ranges, THREADS)
+                print(f"✅ RETURNING={returning}: {len(ranges)} 次预留，编号 1-{max(r.stop for r in ranges) - 1}")
+    finally:
+        database.HAS_RETURNING = original
+
+
+def test_url_numbers_processes():
+    """多个进程同时对同一个数据库文件预留编号"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'test.db')
+        Database(db_path).close()
+
+        ctx = multiprocessing.get_context('spawn')
+        for returning in (database.HAS_RETURNING, False):
+            with ctx.Pool(3) as pool:
+                results = pool.map(process_worker, [(db_path, worker, returning) for worker in range(3)])
+            ranges = [range(start, stop) for result in results for start, stop in result]
+            base = min(r.start for r in ranges) - 1
+            assert_contiguous([range(r.start - base, r.stop - base) for r in ranges], 3)
+    print("✅ 多进程预留编号不重复且连续")
+
+
+if __name__ == "__main__":
+    test_url_numbers_threads()
+    test_url_numbers_processes()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试共享的User-Agent池和采集器
+"""
+
+import subprocess
+import sys
+import threading
+import scraper
+import user_agents
+
+
+def run_threads(func, count: int = 8) -> list:
+    """多个线程同时调用 func，返回各自的结果"""
+    results = [None] * count
+    barrier = threading.Barrier(count)
+
+    def run(i):
+        barrier.wait()
+        results[i] = func()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_user_agent_pool():
+    """测试导入时不加载数据集，并发第一次取用时只加载一次并共享"""
+    print("🧪 测试User-Agent池")
+    print("=" * 50)
+
+    # 在新进程中导入，确认没有加载 fake_useragent 也没有构建列表
+    code = ('import sys, user_agents, scraper; '
+            'print(user_agents._agents is None, "fake_useragent" in sys.modules)')
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    assert output.split() == ['True', 'False'], output
+
+    loads = []
+    original_agents, original_load = user_agents._agents, user_agents._load
+    user_agents._agents = None
+    user_agents._load = lambda: loads.append(1) or ('agent-a', 'agent-b')
+    try:
+        pools = run_threads(user_agents.get_user_agents)
+        assert len(loads) == 1
+        assert all(pool is pools[0] for pool in pools)
+        assert user_agents.random_user_agent() in ('agent-a', 'agent-b')
+        assert len(loads) == 1
+    finally:
+        user_agents._agents, user_agents._load = original_agents, original_load
+    print("✅ User-Agent池测试通过")
+
+
+def test_shared_scraper():
+    """测试 get_scraper() 在各线程返回同一个采集器"""
+    original = scraper._scraper
+    scraper._scraper = None
+    try:
+        scrapers = run_threads(scraper.get_scraper)
+        assert all(s is scrapers[0] for s in scrapers)
+        assert scraper.get_scraper() is scrapers[0]
+    finally:
+        scraper._scraper = original
+
+
+if __name__ == "__main__":
+    test_user_agent_pool()
+    test_shared_scraper()
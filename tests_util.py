@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试共用的辅助函数
+"""
+
+import importlib
+import os
+import sys
+import tempfile
+from database import Database
+
+
+def make_article(i: int, **fields) -> dict:
+    """第i篇测试文章，链接互不相同；fields 覆盖或补充字段"""
+    article = {
+        'title': f'测试文章{i}',
+        'author': '测试作者',
+        'content': f'测试内容{i}',
+        'url': f'https://mp.weixin.qq.com/s/test{i}',
+        'scrape_time': '2025-01-01 08:00:00',
+        'word_count': 6
+    }
+    article.update(fields)
+    return article
+
+
+def import_web_app(name: str, db_path: str):
+    """导入Web应用模块（app 或 admin_app），把它的数据库换成 db_path
+
+    应用在导入时于当前目录打开 articles.db，这里在临时目录中导入，不在仓库中留下文件。
+    """
+    module = sys.modules.get(name)
+    if module is None:
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                module = importlib.import_module(name)
+            finally:
+                os.chdir(cwd)
+
+    db = Database(db_path)
+    if hasattr(module, 'auto_scraper'):
+        module.auto_scraper.db = db
+    else:
+        module.db = db
+    return module, db
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+微信文章URL规范化
+"""
+
+import hashlib
+import re
+import urllib.parse
+from typing import Optional
+
+# 分享、统计等与文章身份无关的参数
+VOLATILE_PARAMS = {
+    'timestamp', 'ver', 'new', 'chksm', 'scene', 'srcid', 'from', 'isappinstalled',
+    'sharer_sharetime', 'sharer_shareid', 'clicktime', 'enterid', 'ascene', 'subscene',
+    'devicetype', 'version', 'lang', 'nettype', 'pass_ticket', 'wx_header', 'exportkey',
+    'key', 'uin', 'abtest_cookie', 'sessionid', 'poc_token', 'countrycode', 'rd2werd',
+}
+
+SHORT_LINK_PATTERN = re.compile(r'^/s/([A-Za-z0-9_-]+)/?$')
+MSG_LINK_PATTERN = re.compile(r'var\s+msg_link\s*=\s*"([^"]+)"')
+
+
+def _digest(kind: str, *parts: str) -> str:
+    raw = '\x1f'.join(parts).encode('utf-8')
+    return f"{kind}:{hashlib.blake2b(raw, digest_size=12).hexdigest()}"
+
+
+def _first(query: dict, *names: str) -> Optional[str]:
+    for name in names:
+        values = query.get(name)
+        if values and values[0]:
+            return values[0]
+    return None
+
+
+def canonical_key(url: str) -> str:
+    """计算文章的规范键
+
+    - ``__biz/mid/idx`` 形式：按 __biz+mid+idx 计算，与sn、分享参数无关
+    - ``/s/<id>`` 短链接：按id计算
+    - 其他链接（如搜狗临时链接 ``?src=11&timestamp=...&signature=...``）：
+      去掉时间戳等易变参数后计算，同一签名的链接得到同一个键
+    """
+    parsed = urllib.parse.urlsplit(url.strip())
+    host = parsed.netloc.lower()
+    query = urllib.parse.parse_qs(parsed.query)
+
+    if host.endswith('weixin.qq.com'):
+        biz = _first(query, '__biz')
+        mid = _first(query, 'mid', 'appmsgid')
+        if biz and mid:
+            idx = _first(query, 'idx', 'itemidx') or '1'
+            return _digest('b', biz, mid, idx)
+
+        match = SHORT_LINK_PATTERN.match(parsed.path)
+        if match:
+            return _digest('s', match.group(1))
+
+    kept = sorted(
+        (name, value)
+        for name, values in query.items() if name not in VOLATILE_PARAMS
+        for value in values
+    )
+    return _digest('u', host, parsed.path.rstrip('/'), urllib.parse.urlencode(kept))
+
+
+def extract_permanent_link(html: str) -> Optional[str]:
+    """从文章页面中提取永久链接（msg_link），没有时返回None"""
+    match = MSG_LINK_PATTERN.search(html)
+    if not match:
+        return None
+    link = match.group(1).replace('&amp;', '&').replace('\\x26amp;', '&').replace('\\x26', '&')
+    return link if '__biz=' in link else None
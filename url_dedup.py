@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+URL去重索引（布隆过滤器 + 数据库精确校验）
+"""
+
+import hashlib
+import math
+import threading
+from typing import Callable, Dict, Iterable
+
+DEFAULT_MEMORY_BYTES = 4 * 1024 * 1024   # 默认4MB，约3300万位
+MIN_CAPACITY = 100000                    # 按至少10万条估算哈希函数个数
+MAX_HASHES = 12                          # 内存充裕时限制哈希次数，误判率已足够低
+
+
+class BloomFilter:
+    """定长布隆过滤器，使用双重哈希生成k个位置"""
+
+    def __init__(self, memory_bytes: int, capacity: int):
+        self.num_bits = max(8, memory_bytes * 8)
+        self.num_hashes = min(MAX_HASHES, max(1, round(self.num_bits / max(1, capacity) * math.log(2))))
+        self.count = 0
+        self._bits = bytearray(self.num_bits // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def estimated_fp_rate(self) -> float:
+        """按当前元素数估算的误判率"""
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+
+class UrlDedupIndex:
+    """文章URL去重索引（以规范键为单位）
+
+    布隆过滤器判定"不存在"时直接返回，不访问数据库；
+    判定"可能存在"时再调用 verify 做精确校验。
+    索引在第一次查询时从数据库加载，之后随文章写入增量更新。
+    其他进程写入的URL不会同步到本进程，最坏情况只是多采集一次后被覆盖写入。
+    """
+
+    def __init__(self, load_keys: Callable[[], Iterable[str]], count_keys: Callable[[], int],
+                 verify: Callable[[str], bool], memory_bytes: int = DEFAULT_MEMORY_BYTES):
+        self.load_keys = load_keys
+        self.count_keys = count_keys
+        self.verify = verify
+        self.memory_bytes = memory_bytes
+        self.bloom = None
+        self.definitely_new = 0
+        self.verified_hits = 0
+        self.false_positives = 0
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self) -> BloomFilter:
+        if self.bloom is not None:
+            return self.bloom
+
+        with self._lock:
+            if self.bloom is None:
+                capacity = max(MIN_CAPACITY, self.count_keys() * 2)
+                bloom = BloomFilter(self.memory_bytes, capacity)
+                for key in self.load_keys():
+                    bloom.add(key)
+                print(f"🧮 URL去重索引已加载: {bloom.count} 条, "
+                      f"{self.memory_bytes // 1024} KB, k={bloom.num_hashes}")
+                self.bloom = bloom
+        return self.bloom
+
+    def add(self, key: str):
+        """记录新写入的键"""
+        if self.bloom is None:
+            return
+        with self._lock:
+            self.bloom.add(key)
+
+    def contains(self, key: str) -> bool:
+        """判断键是否已存在"""
+        bloom = self._ensure_loaded()
+        if key not in bloom:
+            self.definitely_new += 1
+            return False
+
+        if self.verify(key):
+            self.verified_hits += 1
+            return True
+
+        self.false_positives += 1
+        return False
+
+    def get_stats(self) -> Dict:
+        """获取去重统计"""
+        absent = self.definitely_new + self.false_positives
+        return {
+            'loaded': self.bloom is not None,
+            'keys': self.bloom.count if self.bloom else 0,
+            'memory_bytes': self.memory_bytes,
+            'num_hashes': self.bloom.num_hashes if self.bloom else 0,
+            'definitely_new': self.definitely_new,
+            'verified_hits': self.verified_hits,
+            'false_positives': self.false_positives,
+            'observed_fp_rate': self.false_positives / absent if absent else 0.0,
+            'estimated_fp_rate': self.bloom.estimated_fp_rate() if self.bloom else 0.0
+        }
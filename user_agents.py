@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+进程内共享的User-Agent池
+
+fake_useragent 每次实例化都要加载并解析整份数据集，这里在第一次取用时加载一次，
+之后从内存中的字符串元组随机选取。
+"""
+
+import random
+import threading
+from typing import Tuple
+
+# 数据集加载失败时使用
+FALLBACK_USER_AGENTS = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+    'Chrome/139.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) '
+    'Chrome/139.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) '
+    'Version/18.5 Safari/605.1.15',
+)
+
+_agents = None
+_agents_lock = threading.Lock()
+
+
+def _load() -> Tuple[str, ...]:
+    try:
+        from fake_useragent import UserAgent
+        agents = tuple(dict.fromkeys(item['useragent'] for item in UserAgent().data_browsers))
+    except Exception as e:
+        print(f"⚠️ 加载User-Agent数据失败，使用内置列表: {e}")
+        agents = ()
+    return agents or FALLBACK_USER_AGENTS
+
+
+def get_user_agents() -> Tuple[str, ...]:
+    """全部可用的User-Agent（第一次调用时加载）"""
+    global _agents
+    if _agents is None:
+        with _agents_lock:
+            if _agents is None:
+                _agents = _load()
+    return _agents
+
+
+def random_user_agent() -> str:
+    """随机选取一个User-Agent"""
+    return random.choice(get_user_agents())